@@ -0,0 +1,134 @@
+import json
+import os
+from typing import Any, Callable, Optional, Union
+
+# Backend escolhido pela variável de ambiente JSON_BACKEND ("orjson" ou "json").
+# Sem a variável, usa orjson quando estiver instalado e o json da biblioteca padrão caso contrário.
+BACKENDS = ("orjson", "json")
+
+_nome: Optional[str] = None
+_loads: Optional[Callable[[Union[str, bytes]], Any]] = None
+_dumps_compacto: Optional[Callable[[Any], bytes]] = None
+_dumps_canonico: Optional[Callable[[Any], bytes]] = None
+
+# O orjson converte em float os inteiros que não cabem em 64 bits (a partir de 19 dígitos); entradas com
+# 19 dígitos seguidos, mesmo dentro de strings, são decodificadas pelo json para manter o valor exato.
+# A busca troca cada dígito por "0" (translate) e procura a sequência com find, sem regex.
+_DIGITOS = "0123456789"
+_SO_DIGITOS = bytes(0x30 if chr(i) in _DIGITOS else 0x20 for i in range(256))
+_SO_DIGITOS_TEXTO = str.maketrans(dict.fromkeys(_DIGITOS[1:], "0"))
+_DIGITOS_LONGOS = 19
+
+
+def _tem_digitos_longos(dados: Union[str, bytes]) -> bool:
+    if isinstance(dados, str):
+        return dados.translate(_SO_DIGITOS_TEXTO).find("0" * _DIGITOS_LONGOS) >= 0
+    return dados.translate(_SO_DIGITOS).find(b"0" * _DIGITOS_LONGOS) >= 0
+
+
+def _loads_json(dados: Union[str, bytes]) -> Any:
+    return json.loads(dados)
+
+
+def _dumps_compacto_json(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _dumps_canonico_json(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+
+def _carregar(nome: Optional[str] = None) -> None:
+    """
+    Resolve o backend na primeira utilização, importando o orjson só nesse momento.
+    """
+    global _nome, _loads, _dumps_compacto, _dumps_canonico
+
+    nome = nome or os.environ.get("JSON_BACKEND")
+    if nome not in (None, *BACKENDS):
+        raise ValueError(f"Backend JSON desconhecido: {nome}")
+
+    if nome in (None, "orjson"):
+        try:
+            import orjson
+        except ImportError:
+            if nome == "orjson":
+                raise
+        else:
+            def loads_orjson(dados: Union[str, bytes]) -> Any:
+                if not _tem_digitos_longos(dados):
+                    try:
+                        return orjson.loads(dados)
+                    except orjson.JSONDecodeError:
+                        # NaN e Infinity, que o json aceita; JSON inválido falha de novo no json, abaixo
+                        pass
+                return _loads_json(dados)
+
+            def dumps_compacto_orjson(obj: Any) -> bytes:
+                try:
+                    return orjson.dumps(obj)
+                except orjson.JSONEncodeError:
+                    # Inteiros acima de 64 bits e tipos que o orjson não serializa
+                    return _dumps_compacto_json(obj)
+
+            def dumps_canonico_orjson(obj: Any) -> bytes:
+                try:
+                    return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+                except orjson.JSONEncodeError:
+                    return _dumps_canonico_json(obj)
+
+            _nome, _loads, _dumps_compacto, _dumps_canonico = (
+                "orjson", loads_orjson, dumps_compacto_orjson, dumps_canonico_orjson)
+            return
+
+    _nome, _loads, _dumps_compacto, _dumps_canonico = "json", _loads_json, _dumps_compacto_json, _dumps_canonico_json
+
+
+def usar(nome: Optional[str] = None) -> str:
+    """
+    Força um backend ("orjson" ou "json"); sem argumento, volta à escolha automática.
+    Retorna o nome do backend em uso.
+    """
+    _carregar(nome)
+    return _nome
+
+
+def nome_backend() -> str:
+    """
+    Retorna o nome do backend em uso.
+    """
+    if _nome is None:
+        _carregar()
+    return _nome
+
+
+def loads(dados: Union[str, bytes]) -> Any:
+    """
+    Decodifica JSON com o backend em uso. Erros são json.JSONDecodeError em ambos os backends.
+    O resultado também é o mesmo: com orjson, inteiros acima de 64 bits e NaN/Infinity, que ele
+    não representa, são decodificados pelo json.
+    """
+    if _loads is None:
+        _carregar()
+    return _loads(dados)
+
+
+def dumps_compacto(obj: Any) -> bytes:
+    """
+    Codifica em JSON compacto UTF-8, sem espaços. A saída é idêntica nos dois backends para
+    strings, inteiros, booleanos e None (o caso dos contratos e dos CSVs); floats em notação
+    exponencial diferem na formatação do expoente.
+    """
+    if _dumps_compacto is None:
+        _carregar()
+    return _dumps_compacto(obj)
+
+
+def dumps_canonico(obj: Any) -> bytes:
+    """
+    Como `dumps_compacto`, mas com as chaves dos objetos em ordem: o mesmo valor gera sempre
+    os mesmos bytes, qualquer que seja a formatação ou a ordem das chaves do JSON de origem.
+    """
+    if _dumps_canonico is None:
+        _carregar()
+    return _dumps_canonico(obj)
@@ -0,0 +1,179 @@
+"""
+Mede cada conversor sobre contratos sintéticos (gerador_contratos): vazão, pico de memória
+(RSS) e tamanho da saída. Cada medida roda num processo Python novo, para que o pico de
+memória seja só o da conversão.
+
+Os resultados são acrescentados a um arquivo JSON Lines; cada execução é comparada com a
+anterior de mesmo conversor e mesma configuração, marcando regressões acima da tolerância.
+
+Uso: python benchmark.py [--contratos 20000] [--conversores lambda_csv3 lambda_csv2]
+                         [--resultados benchmark_resultados.jsonl] [--rotulo v1.2]
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from gerador_contratos import ConfiguracaoGerador, escrever_json
+
+DIRETORIO = Path(__file__).resolve().parent
+
+CONVERSORES = ("lambda_csv3", "lambda_csv2", "converterToJson")
+
+RESULTADOS = DIRETORIO / "benchmark_resultados.jsonl"
+
+# Piora relativa (tempo ou memória) a partir da qual a medida é marcada como regressão
+TOLERANCIA = 0.10
+
+# Executado no processo filho: converte e imprime tempo, pico de RSS e tamanho da saída
+_SCRIPT_MEDIDA = """
+import json, resource, sys, time
+from pathlib import Path
+conversor, entrada, saida = sys.argv[1:4]
+inicio = time.perf_counter()
+if conversor == "converterToJson":
+    from converterToJson import converter_csv_para_json
+    converter_csv_para_json(entrada, saida)
+    linhas = None
+else:
+    import importlib
+    from leitor_contratos import ler_contratos
+    modulo = importlib.import_module(conversor)
+    linhas = modulo.escrever_csv(Path(saida), ler_contratos(entrada))["linhas_escritas"]
+segundos = time.perf_counter() - inicio
+pico_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    "segundos": segundos, "pico_rss_kb": pico_kb, "linhas": linhas, "bytes_saida": Path(saida).stat().st_size,
+}))
+"""
+
+
+def _rotulo_padrao() -> str:
+    """
+    Commit atual do repositório, quando houver; senão "local".
+    """
+    try:
+        resultado = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=DIRETORIO,
+                                   capture_output=True, text=True, check=True)
+        return resultado.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "local"
+
+
+def medir(conversor: str, entrada: Path, saida: Path) -> Dict:
+    """
+    Executa uma conversão num processo novo e retorna as medidas.
+    """
+    resultado = subprocess.run(
+        [sys.executable, "-c", _SCRIPT_MEDIDA, conversor, str(entrada), str(saida)],
+        cwd=DIRETORIO, capture_output=True, text=True,
+    )
+    if resultado.returncode:
+        raise RuntimeError(f"{conversor} falhou:\n{resultado.stderr}")
+    return json.loads(resultado.stdout)
+
+
+def carregar_resultados(caminho: Path) -> List[Dict]:
+    if not caminho.exists():
+        return []
+    with caminho.open(encoding="utf-8") as arquivo:
+        return [json.loads(linha) for linha in arquivo if linha.strip()]
+
+
+def anterior(resultados: List[Dict], registro: Dict) -> Optional[Dict]:
+    """
+    Último resultado registrado do mesmo conversor com a mesma configuração.
+    """
+    for candidato in reversed(resultados):
+        if candidato["conversor"] == registro["conversor"] and candidato["configuracao"] == registro["configuracao"]:
+            return candidato
+    return None
+
+
+def comparar(registro: Dict, referencia: Optional[Dict], tolerancia: float) -> str:
+    """
+    Descreve a variação de tempo e memória em relação à referência.
+    """
+    if referencia is None:
+        return "sem referência"
+    partes = []
+    regressao = False
+    for campo, nome in (("segundos", "tempo"), ("pico_rss_mb", "memória")):
+        variacao = registro[campo] / referencia[campo] - 1 if referencia[campo] else 0.0
+        regressao = regressao or variacao > tolerancia
+        partes.append(f"{nome} {variacao:+.1%}")
+    situacao = "REGRESSÃO" if regressao else "ok"
+    return f"{situacao} vs {referencia['rotulo']} ({', '.join(partes)})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contratos", type=int, default=20000)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--conversores", nargs="+", choices=CONVERSORES, default=list(CONVERSORES))
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--resultados", type=Path, default=RESULTADOS)
+    parser.add_argument("--rotulo", default=None, help="versão medida (padrão: commit atual)")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    args = parser.parse_args()
+
+    config = ConfiguracaoGerador(contratos=args.contratos, semente=args.semente)
+    rotulo = args.rotulo or _rotulo_padrao()
+    historico = carregar_resultados(args.resultados)
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        diretorio = Path(diretorio)
+        entrada = diretorio / "contratos.json"
+        bytes_entrada = escrever_json(entrada, config)
+        csv_referencia = None
+        print(f"{args.contratos} contratos, {bytes_entrada / 1e6:.1f} MB de entrada, rótulo {rotulo}")
+
+        novos = []
+        for conversor in args.conversores:
+            if conversor == "converterToJson":
+                # Converte o CSV gerado por lambda_csv3 de volta para JSON
+                if csv_referencia is None:
+                    csv_referencia = diretorio / "referencia.csv"
+                    medir("lambda_csv3", entrada, csv_referencia)
+                origem, saida = csv_referencia, diretorio / "saida.json"
+            else:
+                origem, saida = entrada, diretorio / f"{conversor}.csv"
+
+            medidas = [medir(conversor, origem, saida) for _ in range(args.repeticoes)]
+            segundos = statistics.median(m["segundos"] for m in medidas)
+            registro = {
+                "rotulo": rotulo,
+                "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "conversor": conversor,
+                # Como fica depois de gravado (faixas viram listas), para comparar com o histórico
+                "configuracao": json.loads(json.dumps(config._asdict())),
+                "segundos": round(segundos, 4),
+                "contratos_por_s": round(args.contratos / segundos, 1),
+                "linhas": medidas[0]["linhas"],
+                "linhas_por_s": round(medidas[0]["linhas"] / segundos, 1) if medidas[0]["linhas"] else None,
+                "mb_entrada_por_s": round(origem.stat().st_size / 1e6 / segundos, 2),
+                "pico_rss_mb": round(max(m["pico_rss_kb"] for m in medidas) / 1024, 1),
+                "bytes_saida": medidas[0]["bytes_saida"],
+            }
+            print(
+                f"{conversor:<16} {segundos:8.2f} s  {registro['contratos_por_s']:>10,.0f} contratos/s  "
+                f"pico {registro['pico_rss_mb']:7.1f} MB  saída {registro['bytes_saida'] / 1e6:8.1f} MB  "
+                f"{comparar(registro, anterior(historico, registro), args.tolerancia)}"
+            )
+            novos.append(registro)
+
+    with args.resultados.open("a", encoding="utf-8") as arquivo:
+        for registro in novos:
+            arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    print(f"resultados acrescentados a {args.resultados}")
+
+
+if __name__ == "__main__":
+    main()
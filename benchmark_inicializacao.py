@@ -0,0 +1,102 @@
+"""
+Mede o custo de inicialização (cold start): tempo de import de cada módulo e latência
+da primeira invocação do handler contra um S3 local, comparada às invocações seguintes.
+
+Cada medida roda num processo Python novo, como numa inicialização da Lambda.
+Também confere que importar os módulos não cria arquivos (imports sem efeitos colaterais).
+
+Uso: python benchmark_inicializacao.py [--repeticoes 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+MODULOS = [
+    "converterToJson", "lambda_csv", "lambda_csv2", "lambda_csv3",
+    "leitor_contratos", "saida_csv", "paralelo", "handler",
+]
+
+DIRETORIO = Path(__file__).resolve().parent
+
+_SCRIPT_INVOCACAO = """
+import json, os, sys, time
+inicio = time.perf_counter()
+import handler
+importado = time.perf_counter()
+evento = {"Records": [{"s3": {"bucket": {"name": "entrada"}, "object": {"key": "contratos.json"}}}]}
+handler.handler(evento, None)
+primeira = time.perf_counter()
+handler.handler(evento, None)
+segunda = time.perf_counter()
+print(json.dumps({"import": importado - inicio, "primeira": primeira - importado, "segunda": segunda - primeira}))
+"""
+
+
+def _ambiente(**extra) -> dict:
+    ambiente = dict(os.environ, PYTHONPATH=str(DIRETORIO), PYTHONDONTWRITEBYTECODE="1", **extra)
+    return ambiente
+
+
+def medir_import(modulo: str, cwd: str) -> float:
+    """
+    Retorna o tempo cumulativo de import do módulo, em milissegundos, segundo `-X importtime`.
+    """
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=cwd, env=_ambiente(), capture_output=True, text=True, check=True,
+    )
+    for linha in resultado.stderr.splitlines():
+        partes = [p.strip() for p in linha.split("|")]
+        if len(partes) == 3 and partes[2] == modulo:
+            return int(partes[1]) / 1000
+    raise RuntimeError(f"Tempo de import de {modulo} não encontrado")
+
+
+def medir_invocacao(raiz_s3: str) -> dict:
+    """
+    Mede import do handler, primeira e segunda invocação num processo novo.
+    """
+    resultado = subprocess.run(
+        [sys.executable, "-c", _SCRIPT_INVOCACAO],
+        cwd=raiz_s3, env=_ambiente(S3_LOCAL_DIR=raiz_s3), capture_output=True, text=True, check=True,
+    )
+    return json.loads(resultado.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as vazio:
+        print(f"{'módulo':<18} {'import (ms)':>12}")
+        for modulo in MODULOS:
+            tempos = [medir_import(modulo, vazio) for _ in range(args.repeticoes)]
+            print(f"{modulo:<18} {statistics.median(tempos):>12.2f}")
+
+        criados = os.listdir(vazio)
+        print(f"arquivos criados pelos imports: {criados or 'nenhum'}")
+
+    with tempfile.TemporaryDirectory() as raiz_s3:
+        sys.path.insert(0, str(DIRETORIO))
+        from gerador_contratos import gerar_contrato
+
+        entrada = Path(raiz_s3) / "entrada"
+        entrada.mkdir()
+        with (entrada / "contratos.json").open("w", encoding="utf-8") as f:
+            json.dump({"dados": {"contratos": [gerar_contrato(i) for i in range(100)]}}, f)
+
+        medidas = [medir_invocacao(raiz_s3) for _ in range(args.repeticoes)]
+        print()
+        for etapa in ("import", "primeira", "segunda"):
+            valor = statistics.median(m[etapa] for m in medidas) * 1000
+            print(f"handler {etapa:<10} {valor:>10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Compara os backends JSON (orjson e json da biblioteca padrão) sobre contratos sintéticos:
+decodificação do documento inteiro, decodificação contrato a contrato (como faz o
+leitor_contratos) e codificação compacta. Confere que os resultados são idênticos.
+
+Uso: python benchmark_json.py [--contratos 20000]
+"""
+import argparse
+import time
+
+import backend_json
+from backend_json import dumps_compacto, loads
+from gerador_contratos import gerar_contrato
+from leitor_contratos import ler_contratos
+
+
+def cronometrar(funcao, repeticoes: int = 3) -> float:
+    """
+    Retorna o menor tempo, em segundos, entre as repetições.
+    """
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--contratos", type=int, default=20000)
+    args = parser.parse_args()
+
+    contratos = [gerar_contrato(i) for i in range(args.contratos)]
+    documento = b'{"dados":{"contratos":[' + b",".join(dumps_compacto(c) for c in contratos) + b"]}}"
+    print(f"{args.contratos} contratos, {len(documento) / 1e6:.1f} MB")
+
+    resultados = {}
+    for nome in backend_json.BACKENDS:
+        try:
+            backend_json.usar(nome)
+        except ImportError:
+            print(f"{nome:<8} não instalado")
+            continue
+
+        tempos = {
+            "documento": cronometrar(lambda: loads(documento)),
+            "streaming": cronometrar(lambda: list(ler_contratos(documento))),
+            "codificar": cronometrar(lambda: [dumps_compacto(c) for c in contratos]),
+        }
+        resultados[nome] = (
+            loads(documento),
+            list(ler_contratos(documento)),
+            [dumps_compacto(c) for c in contratos],
+        )
+        print(f"{nome:<8} " + "  ".join(f"{etapa} {segundos * 1000:8.1f} ms" for etapa, segundos in tempos.items()))
+
+    if len(resultados) == 2:
+        print(f"resultados idênticos: {'sim' if resultados['orjson'] == resultados['json'] else 'NÃO'}")
+    backend_json.usar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Compara linhas/segundo do escrever_csv de lambda_csv3 antes e depois do
+planejamento por contrato, sobre um arquivo sintético.
+
+Uso: python benchmark_lambda_csv3.py [--contratos 100000]
+"""
+import argparse
+import csv
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+import lambda_csv3
+from gerador_contratos import gerar_contrato
+from leitor_contratos import ler_contratos
+
+
+def escrever_csv_original(nome_arquivo: Path, contratos: Iterable[Dict]) -> None:
+    """
+    Versão anterior de lambda_csv3.escrever_csv, que remonta os campos fixos a cada linha.
+    """
+    with nome_arquivo.open(mode="w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file, delimiter=";")
+        writer.writerow(lambda_csv3.CABECALHO)
+
+        for contrato in contratos:
+            lambda_csv3.obter_maior_parcela(contrato["parcelas"])
+            lambda_csv3.obter_maior_saldo(contrato["dados_historicos_saldo_devedor"])
+            lambda_csv3.obter_historico_atual(contrato.get("dados_historicos_marcacao_contrato", []))
+
+            pagamentos = contrato.get("pagamentos_realizados", [])
+            amortizacoes = contrato.get("amortizacoes", [])
+
+            eventos = [
+                          ("Pagamento", p["data_pagamento"], p["valor_pago"]) for p in pagamentos
+                      ] + [
+                          ("Amortização", a["data_amortizacao"], a["valor_amortizado"]) for a in amortizacoes
+                      ]
+
+            for taxa in contrato.get("dados_historicos_taxa", []):
+                data_referencia_taxa = taxa.get("data_referencia", "")
+                for valor in contrato.get("dados_historicos_valor", []):
+                    data_referencia_valor = valor.get("data_referencia", "")
+
+                    if not eventos:
+                        eventos.append(("", "", ""))
+
+                    regime_apropriacao = contrato["dados_da_operacao"]["regime_apropriacao"]
+                    if regime_apropriacao == "Competencia":
+                        regime_apropriacao = "00001"
+                    else:
+                        regime_apropriacao = "     ".ljust(5)
+
+                    motivo_baixa_contrato = contrato["dados_da_operacao"]["motivo_baixa_contrato"]
+                    motivos = {
+                        "1": "00001",
+                        "5": "00001",
+                        "2": "00002",
+                        "3": "00002",
+                        "4": "00003",
+                    }
+                    motivo_baixa_contrato = motivos.get(motivo_baixa_contrato, motivo_baixa_contrato)
+
+                    cod_tipo_copo_finn = "00000"
+                    cod_copo_finn = "00001"
+                    cod_situ_copo_cntr = "00001"
+                    cod_form_efet_copo = "00002"
+                    cod_moti_isen_copo_finn = "00002"
+                    cod_regm_cpit_jrnm = "00001"
+                    cod_tipo_efet_copo_finn = "00001"
+                    codi_tipo_parp_pess_opcr = "00002"
+
+                    for cod_fscr_opcr in contrato.get("dados_historicos_marcacao_contrato", []):
+                        marcacao_contrato = {
+                            "1": "00010", "2": "XXXXX", "3": "00072"
+                        }.get(cod_fscr_opcr.get("marcacao", ""), "")
+                        for tipo, data, valor in eventos:
+                            writer.writerow([
+                                contrato["data_hora-processamento_dados"][:10],
+                                contrato["sigla"],
+                                contrato["dados_do_produto"]["cprodlin"],
+                                contrato["cod_contrato"],
+                                contrato["dados_do_produto"]["cprodlin"],
+                                cod_situ_copo_cntr,
+                                cod_copo_finn,
+                                cod_form_efet_copo,
+                                marcacao_contrato,
+                                cod_moti_isen_copo_finn,
+                                cod_regm_cpit_jrnm,
+                                regime_apropriacao,
+                                motivo_baixa_contrato,
+                                cod_tipo_copo_finn,
+                                cod_tipo_efet_copo_finn,
+                                codi_tipo_parp_pess_opcr,
+                                contrato["dados_da_operacao"]["data_implantacao"],
+                                contrato["dados_da_operacao"]["data_liquidacao"],
+                                contrato["dados_da_operacao"]["data_ulitma_atualizacao"],
+                                contrato.get("dados_historicos_marcacao_contrato", [{}])[0].get("data_referencia", ""),
+                                data_referencia_taxa,
+                                data_referencia_valor
+                            ])
+
+
+def medir(nome: str, funcao, destino: Path, contratos: List[Dict]) -> float:
+    """
+    Executa a função de escrita e imprime as linhas por segundo.
+    """
+    inicio = time.perf_counter()
+    funcao(destino, contratos)
+    duracao = time.perf_counter() - inicio
+
+    with destino.open("rb") as f:
+        linhas = sum(1 for _ in f) - 1
+
+    print(f"{nome:<10} {linhas:>10} linhas  {duracao:8.2f} s  {linhas / duracao:>12,.0f} linhas/s")
+    return duracao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--contratos", type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        diretorio = Path(diretorio)
+        entrada = diretorio / "contratos.json"
+        with entrada.open("w", encoding="utf-8") as f:
+            json.dump({"dados": {"contratos": [gerar_contrato(i) for i in range(args.contratos)]}}, f)
+
+        contratos = list(ler_contratos(entrada))
+
+        antes = medir("antes", escrever_csv_original, diretorio / "antes.csv", contratos)
+        depois = medir("depois", lambda_csv3.escrever_csv, diretorio / "depois.csv", contratos)
+
+        iguais = (diretorio / "antes.csv").read_bytes() == (diretorio / "depois.csv").read_bytes()
+        print(f"ganho: {antes / depois:.2f}x  saída idêntica: {'sim' if iguais else 'NÃO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import gzip
+from pathlib import Path
+from typing import BinaryIO, Optional, Union
+
+# Codecs aceitos e a extensão que identifica cada um
+EXTENSOES = {".gz": "gzip", ".zst": "zstd"}
+CODECS = tuple(EXTENSOES.values())
+
+# Níveis padrão: o 6 do gzip e o 3 do zstd são os equilíbrios usuais entre tempo e tamanho
+NIVEL_PADRAO = {"gzip": 6, "zstd": 3}
+
+# Threads do compressor zstd (0 = na própria thread; -1 = uma por CPU). O gzip não tem modo multithread.
+THREADS_ZSTD = 0
+
+# Bytes lidos da fonte compactada a cada vez
+TAMANHO_LEITURA = 1 << 20
+
+Caminho = Union[str, Path]
+
+
+def codec_do_caminho(caminho: Caminho) -> Optional[str]:
+    """
+    Retorna o codec indicado pela extensão do arquivo ("dados.json.gz" -> "gzip") ou None.
+    """
+    return EXTENSOES.get(Path(caminho).suffix.lower())
+
+
+def sem_extensao(caminho: Caminho) -> str:
+    """
+    Remove a extensão de compressão, se houver ("saida.csv.zst" -> "saida.csv").
+    """
+    caminho = str(caminho)
+    if codec_do_caminho(caminho):
+        return caminho[:-len(Path(caminho).suffix)]
+    return caminho
+
+
+def extensao(codec: Optional[str]) -> str:
+    """
+    Extensão acrescentada aos arquivos gravados com o codec ("" sem compressão).
+    """
+    if codec is None:
+        return ""
+    _validar(codec)
+    return next(ext for ext, nome in EXTENSOES.items() if nome == codec)
+
+
+def _validar(codec: str) -> None:
+    if codec not in CODECS:
+        raise ValueError(f"Compressão desconhecida: {codec}")
+
+
+def _importar_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("A compressão zstd precisa do pacote zstandard (pip install zstandard)")
+    return zstandard
+
+
+def compactar(destino: BinaryIO, codec: str, nivel: Optional[int] = None, threads: int = THREADS_ZSTD,
+              fechar_destino: bool = False) -> BinaryIO:
+    """
+    Envolve um fluxo binário de escrita num compressor. Fechar o compressor grava o final do
+    formato; o destino só é fechado junto com `fechar_destino`.
+    """
+    _validar(codec)
+    nivel = NIVEL_PADRAO[codec] if nivel is None else nivel
+    if codec == "gzip":
+        # mtime=0 deixa a saída determinística: o mesmo CSV gera sempre os mesmos bytes
+        fluxo = gzip.GzipFile(fileobj=destino, mode="wb", compresslevel=nivel, mtime=0)
+        if fechar_destino:
+            # Como em gzip.open: o GzipFile fecha o arquivo que abriu
+            fluxo.myfileobj = destino
+        return fluxo
+
+    zstandard = _importar_zstandard()
+    compressor = zstandard.ZstdCompressor(level=nivel, threads=threads)
+    return compressor.stream_writer(destino, closefd=fechar_destino)
+
+
+def descompactar(fonte: BinaryIO, codec: str, fechar_fonte: bool = False) -> BinaryIO:
+    """
+    Envolve um fluxo binário de leitura num descompressor. Lê também arquivos com vários
+    membros gzip ou quadros zstd concatenados.
+    """
+    _validar(codec)
+    if codec == "gzip":
+        fluxo = gzip.GzipFile(fileobj=fonte, mode="rb")
+        if fechar_fonte:
+            fluxo.myfileobj = fonte
+        return fluxo
+
+    zstandard = _importar_zstandard()
+    return zstandard.ZstdDecompressor().stream_reader(
+        fonte, read_size=TAMANHO_LEITURA, read_across_frames=True, closefd=fechar_fonte,
+    )
+
+
+def abrir_entrada(caminho: Caminho, codec: Optional[str] = None) -> BinaryIO:
+    """
+    Abre um arquivo para leitura, descompactando quando o codec é informado ou indicado pela extensão.
+    """
+    codec = codec or codec_do_caminho(caminho)
+    arquivo = open(caminho, "rb")
+    if codec is None:
+        return arquivo
+    return descompactar(arquivo, codec, fechar_fonte=True)
+
+
+def abrir_saida(caminho: Caminho, codec: Optional[str] = None, nivel: Optional[int] = None,
+                tamanho_buffer: int = -1, acrescentar: bool = False) -> BinaryIO:
+    """
+    Abre um arquivo para escrita, compactando quando o codec é informado ou indicado pela extensão.
+    Com `acrescentar`, grava ao final do arquivo existente (num novo membro gzip ou quadro zstd).
+    """
+    codec = codec or codec_do_caminho(caminho)
+    arquivo = open(caminho, "ab" if acrescentar else "wb", buffering=tamanho_buffer)
+    if codec is None:
+        return arquivo
+    return compactar(arquivo, codec, nivel, fechar_destino=True)
@@ -1,24 +1,44 @@
 import csv
 import json
 
-import csv
-import json
+from backend_json import dumps_compacto
+
+FORMATOS = ("json", "ndjson")
+
+# Tamanho do buffer do arquivo de saída, em bytes
+TAMANHO_BUFFER = 1 << 20
+
 
+def converter_csv_para_json(arquivo_csv: str, arquivo_json: str, formato: str = "json"):
+    """
+    Converte o CSV em JSON lendo e gravando um registro por vez, com memória constante.
 
-def converter_csv_para_json(arquivo_csv: str, arquivo_json: str):
-    dados = []
+    formato="json" grava uma lista indentada, idêntica à de json.dump(..., indent=4);
+    formato="ndjson" grava um objeto compacto por linha, que pode ser lido em paralelo.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconhecido: {formato}")
 
-    with open(arquivo_csv, 'r', encoding='utf-8') as csvfile:
+    with open(arquivo_csv, 'r', encoding='utf-8', newline='') as csvfile:
         csvreader = csv.DictReader(csvfile, delimiter=';')  # Definir delimitador correto
 
-        for row in csvreader:
-            dados.append(row)
+        if formato == "ndjson":
+            with open(arquivo_json, 'wb', buffering=TAMANHO_BUFFER) as jsonfile:
+                for row in csvreader:
+                    jsonfile.write(dumps_compacto(row) + b"\n")
+            return
 
-    with open(arquivo_json, 'w', encoding='utf-8') as jsonfile:
-        json.dump(dados, jsonfile, ensure_ascii=False, indent=4)
+        with open(arquivo_json, 'w', encoding='utf-8', buffering=TAMANHO_BUFFER) as jsonfile:
+            separador = "[\n    "
+            for row in csvreader:
+                jsonfile.write(separador)
+                jsonfile.write(json.dumps(row, ensure_ascii=False, indent=4).replace("\n", "\n    "))
+                separador = ",\n    "
+            jsonfile.write("[]" if separador == "[\n    " else "\n]")
 
 
 # Exemplo de uso:
-converter_csv_para_json("contratos.csv", "saida.json")
+if __name__ == "__main__":
+    converter_csv_para_json("contratos.csv", "saida.json")
 
-print(f"Conversão concluída! O arquivo saida_json foi gerado.")
\ No newline at end of file
+    print(f"Conversão concluída! O arquivo saida_json foi gerado.")
@@ -0,0 +1,257 @@
+"""
+Divisão de entradas grandes em faixas de bytes, para distribuir a conversão entre várias
+execuções independentes (processos, Lambdas).
+
+1. `indexar` percorre o arquivo uma vez, sem decodificar os contratos, e grava ao lado dele
+   um índice pequeno (<entrada>.indice.json) com um marco a cada `passo` contratos.
+2. `planejar` usa o índice para cortar a entrada em N itens de trabalho de tamanho parecido,
+   sempre entre dois contratos.
+3. `converter_faixa` converte um item: mapeia a entrada e lê só do início ao fim da faixa,
+   gravando uma parte CSV sem cabeçalho.
+4. `juntar` grava o cabeçalho e as partes, na ordem, no CSV final.
+
+Uso: python faixas.py planejar entrada.json --itens 8
+     python faixas.py trabalhar item.json parte.csv [--layout lambda_csv3]
+     python faixas.py simular entrada.json saida.csv --itens 8 [--processos 4] [--passo 1000]
+"""
+import argparse
+import importlib
+import json
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Union
+
+import backend_json
+from compressao import abrir_saida, codec_do_caminho
+from leitor_contratos import CAMINHO_CONTRATOS, LeitorContratos, LeitorMapeado, mapear
+from retomada import FonteArquivo
+from saida_csv import TAMANHO_BUFFER, Destino, EscritorLotes
+
+# Contratos entre dois marcos do índice: o índice de um arquivo com N contratos tem N / PASSO_INDICE marcos
+PASSO_INDICE = 1000
+
+SUFIXO_INDICE = ".indice.json"
+
+VERSAO_INDICE = 1
+
+Caminho = Union[str, Path]
+
+
+class ItemTrabalho(NamedTuple):
+    """
+    Faixa de bytes da entrada: `inicio` é o offset do primeiro contrato e `fim`, o offset logo
+    após o último. Serializável com _asdict() para ser enviado a outro processo ou Lambda.
+    """
+    numero: int
+    fonte: str
+    inicio: int
+    fim: int
+    primeiro_contrato: int
+    contratos: int
+
+
+def caminho_indice(entrada: Caminho) -> Path:
+    return Path(f"{entrada}{SUFIXO_INDICE}")
+
+
+def _exigir_sem_compressao(entrada: Caminho) -> None:
+    if codec_do_caminho(entrada):
+        raise ValueError("A divisão em faixas precisa de entrada sem compressão (offsets de arquivos "
+                         "compactados não permitem posicionar a leitura)")
+
+
+def indexar(entrada: Caminho, passo: int = PASSO_INDICE, caminho: Sequence[str] = CAMINHO_CONTRATOS) -> Dict:
+    """
+    Percorre a entrada uma vez e grava o índice ao lado dela. Cada marco é
+    [offset do contrato, número do contrato, offset logo após o contrato anterior].
+    """
+    _exigir_sem_compressao(entrada)
+    marcos: List[List[int]] = []
+    contratos = 0
+    fim_anterior = 0
+    with mapear(entrada) as buffer:
+        for inicio, fim, _ in LeitorMapeado(buffer, caminho).fragmentos():
+            if contratos % passo == 0:
+                marcos.append([inicio, contratos, fim_anterior])
+            contratos += 1
+            fim_anterior = fim
+
+    indice = {
+        "versao": VERSAO_INDICE,
+        "fonte": FonteArquivo(entrada).identificacao,
+        "caminho": list(caminho),
+        "passo": passo,
+        "contratos": contratos,
+        "fim": fim_anterior,
+        "marcos": marcos,
+    }
+    caminho_indice(entrada).write_text(json.dumps(indice), encoding="utf-8")
+    return indice
+
+
+def carregar_indice(entrada: Caminho, passo: int = PASSO_INDICE,
+                    caminho: Sequence[str] = CAMINHO_CONTRATOS) -> Dict:
+    """
+    Lê o índice da entrada, refazendo-o se não existir, se a entrada mudou depois dele ou se foi
+    gravado com outro `passo`.
+    """
+    arquivo = caminho_indice(entrada)
+    if arquivo.exists():
+        indice = json.loads(arquivo.read_text(encoding="utf-8"))
+        if (indice.get("versao") == VERSAO_INDICE and indice["fonte"] == FonteArquivo(entrada).identificacao
+                and indice["caminho"] == list(caminho) and indice.get("passo") == passo):
+            return indice
+    return indexar(entrada, passo, caminho)
+
+
+def planejar(entrada: Caminho, itens: int, passo: int = PASSO_INDICE,
+             caminho: Sequence[str] = CAMINHO_CONTRATOS) -> List[ItemTrabalho]:
+    """
+    Divide a entrada em até `itens` faixas de bytes parecidas, cortando nos marcos do índice
+    mais próximos das divisões exatas. Entradas com poucos marcos geram menos itens.
+    """
+    if itens < 1:
+        raise ValueError("itens precisa ser pelo menos 1")
+    indice = carregar_indice(entrada, passo, caminho)
+    marcos = indice["marcos"]
+    if not marcos:
+        return []
+
+    primeiro = marcos[0][0]
+    tamanho = indice["fim"] - primeiro
+    cortes = [0]
+    for k in range(1, itens):
+        alvo = primeiro + tamanho * k / itens
+        melhor = min(range(len(marcos)), key=lambda i: abs(marcos[i][0] - alvo))
+        if melhor > cortes[-1]:
+            cortes.append(melhor)
+
+    resultado = []
+    fonte = str(Path(entrada).resolve())
+    for numero, (corte, proximo) in enumerate(zip(cortes, cortes[1:] + [None]), start=1):
+        inicio, primeiro_contrato, _ = marcos[corte]
+        if proximo is None:
+            fim, ultimo = indice["fim"], indice["contratos"]
+        else:
+            _, ultimo, fim = marcos[proximo]
+        resultado.append(ItemTrabalho(numero, fonte, inicio, fim, primeiro_contrato, ultimo - primeiro_contrato))
+    return resultado
+
+
+def ler_faixa(leitor: LeitorContratos, item: ItemTrabalho) -> Iterator[Dict]:
+    """
+    Gera os contratos da faixa. O leitor começa em `item.inicio` e não passa do fim da faixa:
+    para um objeto do S3, basta um fluxo com GET e Range; no disco, um LeitorMapeado.
+    """
+    if item.contratos == 0:
+        return
+    for inicio, fim, bruto in leitor.fragmentos():
+        try:
+            yield backend_json.loads(bruto)
+        except ValueError as e:
+            raise ValueError(f"Erro ao carregar JSON na posição {inicio}: {e}")
+        if fim >= item.fim:
+            if fim > item.fim:
+                raise ValueError(f"Item {item.numero}: a faixa não termina entre contratos (índice desatualizado?)")
+            return
+    raise ValueError(f"Item {item.numero}: a entrada terminou antes do fim da faixa (índice desatualizado?)")
+
+
+def converter_faixa(item: Union[ItemTrabalho, Dict], destino: Destino, layout: str = "lambda_csv3") -> Dict[str, int]:
+    """
+    Converte os contratos de um item numa parte CSV sem cabeçalho (ver `juntar`).
+    """
+    if isinstance(item, dict):
+        item = ItemTrabalho(**item)
+    gerar_linhas = importlib.import_module(layout).gerar_linhas
+
+    contratos = 0
+    with mapear(item.fonte) as buffer, EscritorLotes(destino) as escritor:
+        for contrato in ler_faixa(LeitorMapeado(buffer, inicio=item.inicio), item):
+            escritor.escrever_varias(gerar_linhas(contrato))
+            contratos += 1
+
+    if contratos != item.contratos:
+        raise ValueError(f"Item {item.numero}: {contratos} contratos lidos, {item.contratos} esperados")
+    return {"item": item.numero, "contratos": contratos, **escritor.estatisticas()}
+
+
+def juntar(destino: Caminho, partes: Sequence[Caminho], layout: str = "lambda_csv3") -> int:
+    """
+    Grava o cabeçalho do layout e as partes, na ordem, no CSV final (compactado conforme a
+    extensão). Retorna os bytes gravados, sem compressão.
+    """
+    with abrir_saida(destino, tamanho_buffer=TAMANHO_BUFFER) as saida:
+        with EscritorLotes(saida, importlib.import_module(layout).CABECALHO) as cabecalho:
+            pass
+        total = cabecalho.bytes_escritos
+        for parte in partes:
+            with open(parte, "rb") as arquivo:
+                shutil.copyfileobj(arquivo, saida, TAMANHO_BUFFER)
+            total += Path(parte).stat().st_size
+    return total
+
+
+def simular(entrada: Caminho, destino: Caminho, itens: int, processos: Optional[int] = None,
+            layout: str = "lambda_csv3", passo: int = PASSO_INDICE) -> Dict:
+    """
+    Simula a distribuição localmente: cada item é convertido num processo separado, que recebe
+    só o item serializado, e as partes são juntadas ao final.
+    """
+    plano = planejar(entrada, itens, passo)
+    with tempfile.TemporaryDirectory(prefix="faixas-", dir=Path(destino).parent) as diretorio:
+        partes = [Path(diretorio) / f"parte-{item.numero:05d}.csv" for item in plano]
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            resultados = list(executor.map(
+                converter_faixa, [item._asdict() for item in plano], [str(p) for p in partes], [layout] * len(plano)))
+        bytes_escritos = juntar(destino, partes, layout)
+
+    return {
+        "itens": len(plano),
+        "contratos": sum(r["contratos"] for r in resultados),
+        "linhas_escritas": sum(r["linhas_escritas"] for r in resultados),
+        "bytes_escritos": bytes_escritos,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    p = comandos.add_parser("planejar", help="indexa a entrada e imprime os itens de trabalho (JSON Lines)")
+    p.add_argument("entrada")
+    p.add_argument("--itens", type=int, required=True)
+    p.add_argument("--passo", type=int, default=PASSO_INDICE)
+
+    p = comandos.add_parser("trabalhar", help="converte um item de trabalho numa parte sem cabeçalho")
+    p.add_argument("item", help="arquivo JSON com o item, ou - para a entrada padrão")
+    p.add_argument("parte")
+    p.add_argument("--layout", default="lambda_csv3")
+
+    p = comandos.add_parser("simular", help="planeja, converte cada item num processo e junta as partes")
+    p.add_argument("entrada")
+    p.add_argument("saida")
+    p.add_argument("--itens", type=int, required=True)
+    p.add_argument("--processos", type=int, default=None)
+    p.add_argument("--layout", default="lambda_csv3")
+    p.add_argument("--passo", type=int, default=PASSO_INDICE)
+
+    args = parser.parse_args()
+    if args.comando == "planejar":
+        for item in planejar(args.entrada, args.itens, args.passo):
+            print(json.dumps(item._asdict(), ensure_ascii=False))
+    elif args.comando == "trabalhar":
+        texto = sys.stdin.read() if args.item == "-" else Path(args.item).read_text(encoding="utf-8")
+        print(converter_faixa(json.loads(texto), args.parte, args.layout))
+    else:
+        inicio = time.perf_counter()
+        resultado = simular(args.entrada, args.saida, args.itens, args.processos, args.layout, args.passo)
+        print(f"{resultado} em {time.perf_counter() - inicio:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Gera contratos sintéticos no formato de `dados.contratos` usado por lambda_csv3, com escala e
+tamanho dos históricos configuráveis. A mesma semente gera sempre os mesmos contratos.
+
+Uso: python gerador_contratos.py saida.json [--contratos 100000] [--taxas 1 3] [--semente 0] ...
+"""
+import argparse
+import random
+from datetime import date, timedelta
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, NamedTuple, Tuple, Union
+
+from backend_json import dumps_compacto
+
+# Faixa (mínimo, máximo) de registros de cada histórico
+Faixa = Tuple[int, int]
+
+DATA_BASE = date(2024, 1, 28)
+
+
+class ConfiguracaoGerador(NamedTuple):
+    """
+    Escala e formato dos contratos gerados. Cada histórico tem entre o mínimo e o máximo
+    da sua faixa de registros, sorteado por contrato.
+    """
+    contratos: int = 1000
+    taxas: Faixa = (1, 3)
+    valores: Faixa = (1, 2)
+    marcacoes: Faixa = (1, 3)
+    parcelas: Faixa = (1, 12)
+    saldos: Faixa = (1, 3)
+    pagamentos: Faixa = (0, 3)
+    amortizacoes: Faixa = (0, 1)
+    # Fração dos contratos com uma única marcação gravada como objeto em vez de lista
+    fracao_marcacao_objeto: float = 0.1
+    semente: int = 0
+
+
+def gerar_contrato(indice: int) -> Dict:
+    """
+    Gera um contrato sintético de formato fixo no formato usado por lambda_csv3.
+    """
+    return {
+        "dados_historicos_marcacao_contrato": [
+            {"marcacao": str(1 + (indice + i) % 3), "data_referencia": f"2024-0{1 + i}-28", "hist_atual": "false"}
+            for i in range(3)
+        ],
+        "dados_historicos_taxa": [
+            {"tipo": str(i), "data_referencia": f"2024-0{1 + i}-28", "taxa_pre_nominal": "6.79", "hist_atual": "false"}
+            for i in range(3)
+        ],
+        "dados_historicos_valor": [
+            {"tipo": "3", "data_referencia": "2024-05-28", "valor_incorporado_parcelas": "0.00", "dias_atraso": "1"}
+        ],
+        "parcelas": [
+            {"num_parcela": str(i + 1), "data_vencimento": "2024-03-28", "valor_incorporacao_parcelas": "70321"}
+            for i in range(3)
+        ],
+        "dados_historicos_saldo_devedor": [
+            {"data_referencia": "2024-03-28", "valor_saldo_devedor": "5674.48"},
+            {"data_referencia": "2024-04-28", "valor_saldo_devedor": "1024.00"},
+        ],
+        "pagamentos_realizados": [
+            {"data_pagamento": "2024-06-10", "valor_pago": "50"}
+            for _ in range(indice % 3)
+        ],
+        "cod_contrato": str(100000 + indice),
+        "sigla": "OD",
+        "data_hora-processamento_dados": "2024-06-28 17:20:15",
+        "dados_do_produto": {"cprodlin": str(70000 + indice % 500)},
+        "dados_da_operacao": {
+            "data_implantacao": "2008-01-04",
+            "regime_apropriacao": "Competencia" if indice % 4 else "Caixa",
+            "motivo_baixa_contrato": str(1 + indice % 6),
+            "data_liquidacao": "2024-06-28",
+            "data_ulitma_atualizacao": "2024-08-28",
+        },
+    }
+
+
+def _data(aleatorio: random.Random) -> str:
+    return (DATA_BASE + timedelta(days=aleatorio.randrange(365))).isoformat()
+
+
+def _valor(aleatorio: random.Random, maximo: int) -> str:
+    return f"{aleatorio.randrange(maximo * 100) / 100:.2f}"
+
+
+def _quantidade(aleatorio: random.Random, faixa: Faixa) -> int:
+    return aleatorio.randint(*faixa)
+
+
+def _historicos(aleatorio: random.Random, faixa: Faixa, criar) -> list:
+    return [criar(i) for i in range(_quantidade(aleatorio, faixa))]
+
+
+def gerar_contratos(config: ConfiguracaoGerador = ConfiguracaoGerador()) -> Iterator[Dict]:
+    """
+    Gera os contratos um a um, conforme a configuração.
+    """
+    aleatorio = random.Random(config.semente)
+    for indice in range(config.contratos):
+        marcacoes = _historicos(aleatorio, config.marcacoes, lambda i: {
+            "marcacao": str(aleatorio.randint(1, 4)),
+            "data_referencia": _data(aleatorio),
+            "hist_atual": "false",
+        })
+        if marcacoes:
+            marcacoes[-1]["hist_atual"] = "true"
+            if len(marcacoes) == 1 and aleatorio.random() < config.fracao_marcacao_objeto:
+                marcacoes = marcacoes[0]
+
+        yield {
+            "dados_historicos_marcacao_contrato": marcacoes,
+            "dados_historicos_taxa": _historicos(aleatorio, config.taxas, lambda i: {
+                "tipo": str(i), "data_referencia": _data(aleatorio),
+                "taxa_pre_nominal": _valor(aleatorio, 20), "hist_atual": "false",
+            }),
+            "dados_historicos_valor": _historicos(aleatorio, config.valores, lambda i: {
+                "tipo": "3", "data_referencia": _data(aleatorio),
+                "valor_incorporado_parcelas": _valor(aleatorio, 1000), "dias_atraso": str(aleatorio.randrange(90)),
+            }),
+            "parcelas": _historicos(aleatorio, config.parcelas, lambda i: {
+                "num_parcela": str(i + 1), "data_vencimento": _data(aleatorio),
+                "valor_incorporacao_parcelas": str(aleatorio.randrange(1, 100000)),
+            }),
+            "dados_historicos_saldo_devedor": _historicos(aleatorio, config.saldos, lambda i: {
+                "data_referencia": _data(aleatorio), "valor_saldo_devedor": _valor(aleatorio, 100000),
+            }),
+            "pagamentos_realizados": _historicos(aleatorio, config.pagamentos, lambda i: {
+                "data_pagamento": _data(aleatorio), "valor_pago": _valor(aleatorio, 1000),
+            }),
+            "amortizacoes": _historicos(aleatorio, config.amortizacoes, lambda i: {
+                "data_amortizacao": _data(aleatorio), "valor_amortizado": _valor(aleatorio, 5000),
+            }),
+            "cod_contrato": str(100000 + indice),
+            "sigla": aleatorio.choice(("OD", "CG", "FI")),
+            "data_hora-processamento_dados": "2024-06-28 17:20:15",
+            "dados_do_produto": {"cprodlin": str(70000 + aleatorio.randrange(500))},
+            "dados_da_operacao": {
+                "data_implantacao": "2008-01-04",
+                "regime_apropriacao": aleatorio.choice(("Competencia", "Caixa")),
+                "motivo_baixa_contrato": str(aleatorio.randint(1, 6)),
+                "data_liquidacao": _data(aleatorio),
+                "data_ulitma_atualizacao": _data(aleatorio),
+            },
+        }
+
+
+def escrever_json(destino: Union[str, Path, BinaryIO], config: ConfiguracaoGerador = ConfiguracaoGerador()) -> int:
+    """
+    Grava o documento {"dados": {"contratos": [...]}} contrato a contrato, sem montá-lo em memória.
+    Retorna a quantidade de bytes gravados.
+    """
+    if isinstance(destino, (str, Path)):
+        with open(destino, "wb") as arquivo:
+            return escrever_json(arquivo, config)
+
+    total = destino.write(b'{"dados":{"contratos":[')
+    for indice, contrato in enumerate(gerar_contratos(config)):
+        if indice:
+            total += destino.write(b",\n")
+        total += destino.write(dumps_compacto(contrato))
+    total += destino.write(b"]}}\n")
+    return total
+
+
+def main():
+    padrao = ConfiguracaoGerador()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("saida")
+    parser.add_argument("--contratos", type=int, default=padrao.contratos)
+    for historico in ("taxas", "valores", "marcacoes", "parcelas", "saldos", "pagamentos", "amortizacoes"):
+        parser.add_argument(f"--{historico}", type=int, nargs=2, metavar=("MIN", "MAX"),
+                            default=getattr(padrao, historico))
+    parser.add_argument("--fracao-marcacao-objeto", type=float, default=padrao.fracao_marcacao_objeto)
+    parser.add_argument("--semente", type=int, default=padrao.semente)
+    args = parser.parse_args()
+
+    config = ConfiguracaoGerador(**{
+        campo: tuple(valor) if isinstance(valor, list) else valor
+        for campo, valor in vars(args).items() if campo != "saida"
+    })
+    print(f"{escrever_json(args.saida, config) / 1e6:.1f} MB gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
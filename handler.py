@@ -0,0 +1,214 @@
+import importlib
+import io
+import json
+import os
+import time
+from typing import Dict, List, Optional
+from urllib.parse import unquote_plus
+
+import instrumentacao
+from compressao import THREADS_ZSTD, codec_do_caminho, compactar, extensao, sem_extensao
+from leitor_contratos import ler_contratos
+from retomada import ArmazenamentoS3, ConversaoIncompleta, FonteS3, converter_retomavel
+from upload_s3 import UploadMultipart
+from validacao import Quarentena
+
+# Configuração por variáveis de ambiente da função:
+#   LAYOUT         módulo que gera as linhas (lambda_csv2 ou lambda_csv3)
+#   BUCKET_SAIDA   bucket de destino do CSV (padrão: o mesmo da entrada)
+#   PREFIXO_SAIDA  prefixo acrescentado à chave do CSV
+#   S3_LOCAL_DIR   se definido, usa um S3 em disco nesse diretório em vez do boto3
+#   COMPRESSAO_SAIDA  "gzip" ou "zstd" para enviar o CSV compactado (padrão: sem compressão)
+#   NIVEL_COMPRESSAO  nível do codec de saída (padrão: compressao.NIVEL_PADRAO)
+#   THREADS_COMPRESSAO threads do compressor zstd (0 = na própria thread; -1 = uma por CPU)
+#   INSTRUMENTACAO se "1", mede as etapas de cada objeto e registra as métricas em formato EMF no log
+#   QUARENTENA     se "1", valida cada contrato e envia os inválidos, com o motivo, para <saída>.quarentena.ndjson
+#   RETOMAVEL      se "1", grava a saída em partes sob <saída>/ com ponto de controle (ver retomada); perto do
+#                  limite de tempo, a função invoca a si mesma (assíncrona, com os objetos que faltam) e a nova
+#                  execução continua do ponto de controle. Requer lambda:InvokeFunction sobre a própria função
+#   MARGEM_RETOMADA segundos reservados antes do limite de tempo da Lambda para concluir a parte atual
+#                  (no máximo metade do tempo restante, para que cada execução ainda grave alguma parte)
+#   MAX_CONTINUACOES  quantas vezes um evento pode ser continuado assim (padrão: MAX_CONTINUACOES); depois
+#                  disso a execução falha com ConversaoIncompleta. As novas tentativas da Lambda ainda retomam
+#                  do ponto de controle, mas são só 2 antes de o evento ir para a fila de falhas (DLQ)
+LAYOUT_PADRAO = "lambda_csv3"
+
+MARGEM_RETOMADA = 60
+
+MAX_CONTINUACOES = 100
+
+_cliente = None
+_cliente_lambda = None
+
+
+def cliente_s3():
+    """
+    Retorna o cliente S3, criado na primeira chamada.
+    """
+    global _cliente
+    if _cliente is None:
+        raiz_local = os.environ.get("S3_LOCAL_DIR")
+        if raiz_local:
+            from s3_local import S3Local
+            _cliente = S3Local(raiz_local)
+        else:
+            import boto3
+            _cliente = boto3.client("s3")
+    return _cliente
+
+
+def cliente_lambda():
+    """
+    Retorna o cliente Lambda, usado para continuar conversões retomáveis, criado na primeira chamada.
+    """
+    global _cliente_lambda
+    if _cliente_lambda is None:
+        import boto3
+        _cliente_lambda = boto3.client("lambda")
+    return _cliente_lambda
+
+
+def _base_saida(chave: str) -> str:
+    base = sem_extensao(chave)
+    base = base[:-len(".json")] if base.endswith(".json") else base
+    return os.environ.get("PREFIXO_SAIDA", "") + base
+
+
+def chave_saida(chave: str, codec: Optional[str] = None) -> str:
+    """
+    Monta a chave do CSV a partir da chave do JSON de entrada (compactado ou não).
+    """
+    return _base_saida(chave) + ".csv" + extensao(codec)
+
+
+def chave_quarentena(chave: str) -> str:
+    """
+    Chave do arquivo de contratos rejeitados, ao lado do CSV.
+    """
+    return _base_saida(chave) + ".quarentena.ndjson"
+
+
+def processar_objeto(bucket: str, chave: str, cliente=None, layout: Optional[str] = None) -> Dict:
+    """
+    Lê o JSON do S3 como fluxo e envia o CSV em partes enquanto as linhas são geradas,
+    sem cópia local da entrada nem da saída.
+    """
+    cliente = cliente or cliente_s3()
+    layout = layout or os.environ.get("LAYOUT", LAYOUT_PADRAO)
+    modulo = importlib.import_module(layout)
+    bucket_saida = os.environ.get("BUCKET_SAIDA", bucket)
+    medicao = instrumentacao.ativar() if instrumentacao.ativada_no_ambiente() else None
+
+    codec_saida = os.environ.get("COMPRESSAO_SAIDA") or None
+    nivel = os.environ.get("NIVEL_COMPRESSAO")
+    # Os contratos rejeitados ficam em memória: são poucos e só vão para o S3 se houver algum
+    rejeitados = io.BytesIO()
+    quarentena = Quarentena(rejeitados) if os.environ.get("QUARENTENA") == "1" else None
+
+    corpo = cliente.get_object(Bucket=bucket, Key=chave)["Body"]
+    try:
+        with UploadMultipart(cliente, bucket_saida, chave_saida(chave, codec_saida)) as destino:
+            # A entrada é descompactada e a saída compactada em fluxo, sem arquivos intermediários
+            contratos = ler_contratos(corpo, compressao=codec_do_caminho(chave))
+            if codec_saida is None:
+                estatisticas = modulo.escrever_csv(destino, contratos, quarentena=quarentena)
+            else:
+                threads = int(os.environ.get("THREADS_COMPRESSAO", THREADS_ZSTD))
+                with compactar(destino, codec_saida, int(nivel) if nivel else None, threads) as compactado:
+                    estatisticas = modulo.escrever_csv(compactado, contratos, quarentena=quarentena)
+    finally:
+        corpo.close()
+        if medicao is not None:
+            instrumentacao.desativar()
+
+    resultado = {"bucket": destino.bucket, "chave": destino.chave, **estatisticas}
+    if quarentena is not None and quarentena.contratos:
+        resultado["chave_quarentena"] = chave_quarentena(chave)
+        cliente.put_object(Bucket=bucket_saida, Key=resultado["chave_quarentena"],
+                           Body=rejeitados.getvalue())
+    if medicao is not None:
+        print(medicao.linha_emf({"Layout": layout}))
+        resultado["instrumentacao"] = medicao.relatorio()
+    return resultado
+
+
+def processar_objeto_retomavel(bucket: str, chave: str, cliente=None, layout: Optional[str] = None,
+                               prazo: Optional[float] = None) -> Dict:
+    """
+    Converte o objeto em partes sob o prefixo <saída>/, continuando do ponto de controle de
+    uma execução anterior. Com `prazo` (instante de time.monotonic()), para ao atingi-lo.
+    Compressão, quarentena e instrumentação seguem as mesmas variáveis de `processar_objeto`;
+    os contratos rejeitados ficam em part-NNNNN.quarentena.ndjson, ao lado de cada parte.
+    """
+    cliente = cliente or cliente_s3()
+    layout = layout or os.environ.get("LAYOUT", LAYOUT_PADRAO)
+    bucket_saida = os.environ.get("BUCKET_SAIDA", bucket)
+    medicao = instrumentacao.ativar() if instrumentacao.ativada_no_ambiente() else None
+    nivel = os.environ.get("NIVEL_COMPRESSAO")
+
+    armazenamento = ArmazenamentoS3(cliente, bucket_saida, _base_saida(chave))
+    try:
+        estado = converter_retomavel(
+            FonteS3(cliente, bucket, chave), armazenamento, layout, prazo=prazo,
+            compressao=os.environ.get("COMPRESSAO_SAIDA") or None, nivel=int(nivel) if nivel else None,
+            threads=int(os.environ.get("THREADS_COMPRESSAO", THREADS_ZSTD)),
+            quarentena=os.environ.get("QUARENTENA") == "1",
+        )
+    finally:
+        if medicao is not None:
+            instrumentacao.desativar()
+
+    resultado = {"bucket": bucket_saida, "prefixo": armazenamento.prefixo, **estado}
+    if medicao is not None:
+        print(medicao.linha_emf({"Layout": layout}))
+        resultado["instrumentacao"] = medicao.relatorio()
+    return resultado
+
+
+def invocar_continuacao(event: Dict, registros: List[Dict], context, cliente=None) -> int:
+    """
+    Invoca a própria função, de forma assíncrona, com os registros que faltam (o primeiro é o
+    interrompido, que continua do ponto de controle). Não depende das novas tentativas da Lambda,
+    que são só 2. Retorna o número desta continuação; acima de MAX_CONTINUACOES, levanta ConversaoIncompleta.
+    """
+    continuacao = event.get("continuacao", 0) + 1
+    limite = int(os.environ.get("MAX_CONTINUACOES", MAX_CONTINUACOES))
+    if continuacao > limite:
+        raise ConversaoIncompleta(f"Conversão não concluída depois de {limite} continuações")
+
+    cliente = cliente or cliente_lambda()
+    cliente.invoke(FunctionName=context.invoked_function_arn, InvocationType="Event",
+                   Payload=json.dumps({"Records": registros, "continuacao": continuacao}).encode("utf-8"))
+    return continuacao
+
+
+def handler(event: Dict, context) -> Dict:
+    """
+    Ponto de entrada da Lambda: processa cada objeto do evento S3.
+    No modo retomável, uma conversão interrompida pelo prazo segue numa nova invocação
+    (ver `invocar_continuacao`), e esta termina com sucesso.
+    """
+    retomavel = os.environ.get("RETOMAVEL") == "1"
+    prazo = None
+    if retomavel and context is not None:
+        restante = context.get_remaining_time_in_millis() / 1000
+        margem = min(float(os.environ.get("MARGEM_RETOMADA", MARGEM_RETOMADA)), restante / 2)
+        prazo = time.monotonic() + restante - margem
+
+    arquivos = []
+    registros = event.get("Records", [])
+    for posicao, registro in enumerate(registros):
+        bucket = registro["s3"]["bucket"]["name"]
+        chave = unquote_plus(registro["s3"]["object"]["key"])
+        if not retomavel:
+            arquivos.append(processar_objeto(bucket, chave))
+            continue
+
+        resultado = processar_objeto_retomavel(bucket, chave, prazo=prazo)
+        if not resultado["concluido"]:
+            resultado["continuacao"] = invocar_continuacao(event, registros[posicao:], context)
+            arquivos.append(resultado)
+            break
+        arquivos.append(resultado)
+
+    return {"arquivos": arquivos}
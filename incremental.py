@@ -0,0 +1,204 @@
+"""
+Processamento incremental: gera linhas apenas para contratos novos ou alterados desde a
+execução anterior e lista os contratos que deixaram de aparecer na entrada.
+
+O estado fica num índice SQLite local, de cod_contrato para o hash do contrato. Por padrão o
+hash cobre só as chaves que o layout lê (SECOES_CONTRATO do módulo), em forma canônica: mudanças
+de formatação, de ordem das chaves ou em campos que não vão para o CSV não reprocessam o contrato.
+
+Uso: python incremental.py entrada.json saida.csv --indice estado.sqlite [--removidos removidos.csv]
+                           [--layout lambda_csv3] [--secoes sigla,parcelas,... | --contrato-inteiro]
+"""
+import argparse
+import hashlib
+import importlib
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+import backend_json
+from leitor_contratos import CAMINHO_CONTRATOS, Fonte, LeitorContratos, abrir_fluxo
+from saida_csv import Destino
+
+# Tamanho, em bytes, do hash guardado para cada contrato
+TAMANHO_HASH = 16
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS contratos (
+    cod_contrato TEXT PRIMARY KEY,
+    hash BLOB NOT NULL
+) WITHOUT ROWID
+"""
+
+
+def hash_contrato(contrato: Dict, secoes: Optional[Sequence[str]] = None) -> bytes:
+    """
+    Hash da forma canônica do contrato inteiro ou, com `secoes`, apenas dessas chaves
+    (assim campos que não vão para o CSV não marcam o contrato como alterado).
+    """
+    valor = contrato if secoes is None else [contrato.get(secao) for secao in secoes]
+    return hashlib.blake2b(backend_json.dumps_canonico(valor), digest_size=TAMANHO_HASH).digest()
+
+
+class IndiceEstado:
+    """
+    Índice em disco (SQLite) de cod_contrato para o hash do contrato na última execução.
+    """
+
+    def __init__(self, caminho: Union[str, Path]):
+        self._conexao = sqlite3.connect(str(caminho))
+        self._conexao.execute(_ESQUEMA)
+        self._conexao.commit()
+
+    def carregar(self) -> Dict[str, bytes]:
+        """
+        Lê o índice inteiro para a memória.
+        """
+        return dict(self._conexao.execute("SELECT cod_contrato, hash FROM contratos"))
+
+    def registrar(self, alterados: Dict[str, bytes], removidos: Sequence[str]) -> None:
+        """
+        Grava os contratos novos ou alterados e apaga os removidos, numa única transação.
+        """
+        with self._conexao:
+            self._conexao.executemany(
+                "INSERT INTO contratos (cod_contrato, hash) VALUES (?, ?) "
+                "ON CONFLICT (cod_contrato) DO UPDATE SET hash = excluded.hash",
+                alterados.items(),
+            )
+            self._conexao.executemany("DELETE FROM contratos WHERE cod_contrato = ?", ((c,) for c in removidos))
+
+    def fechar(self) -> None:
+        self._conexao.close()
+
+    def __enter__(self) -> "IndiceEstado":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.fechar()
+
+
+class Delta:
+    """
+    Itera sobre os contratos da fonte que são novos ou mudaram em relação ao índice (nas
+    `secoes`, ou no contrato inteiro sem elas), pulando os inalterados sem gerar linhas.
+    Depois da iteração, `removidos` tem os contratos do índice que não apareceram na entrada.
+
+    O índice só é atualizado por `confirmar`, chamado depois que a saída foi escrita;
+    se a execução falhar antes disso, a próxima reprocessa os mesmos contratos.
+    """
+
+    def __init__(self, fonte: Fonte, indice: IndiceEstado, secoes: Optional[Sequence[str]] = None,
+                 caminho: Sequence[str] = CAMINHO_CONTRATOS):
+        self._fonte = fonte
+        self._indice = indice
+        self._secoes = secoes
+        self._caminho = caminho
+        self._anteriores = indice.carregar()
+        self._alterados: Dict[str, bytes] = {}
+        self.novos = 0
+        self.alterados = 0
+        self.inalterados = 0
+        self.removidos: List[str] = []
+
+    def __iter__(self) -> Iterator[Dict]:
+        anteriores = self._anteriores
+        vistos = set()
+        fluxo, fechar = abrir_fluxo(self._fonte)
+        try:
+            for inicio, _, bruto in LeitorContratos(fluxo, self._caminho).fragmentos():
+                try:
+                    contrato = backend_json.loads(bruto)
+                except ValueError as e:
+                    raise ValueError(f"Erro ao carregar JSON na posição {inicio}: {e}")
+
+                cod_contrato = contrato["cod_contrato"]
+                vistos.add(cod_contrato)
+                atual = hash_contrato(contrato, self._secoes)
+                anterior = anteriores.get(cod_contrato)
+                if anterior == atual:
+                    self.inalterados += 1
+                    continue
+
+                if anterior is None:
+                    self.novos += 1
+                else:
+                    self.alterados += 1
+                self._alterados[cod_contrato] = atual
+                yield contrato
+        finally:
+            if fechar:
+                fluxo.close()
+
+        self.removidos = sorted(cod for cod in anteriores if cod not in vistos)
+
+    def confirmar(self) -> None:
+        """
+        Grava no índice os hashes novos e apaga os contratos removidos.
+        """
+        self._indice.registrar(self._alterados, self.removidos)
+
+    def estatisticas(self) -> Dict[str, int]:
+        return {
+            "contratos_novos": self.novos,
+            "contratos_alterados": self.alterados,
+            "contratos_inalterados": self.inalterados,
+            "contratos_removidos": len(self.removidos),
+        }
+
+
+def escrever_removidos(destino: Union[str, Path], removidos: Sequence[str]) -> None:
+    """
+    Grava a lista de contratos removidos (um cod_contrato por linha, com cabeçalho).
+    """
+    with open(destino, "w", encoding="utf-8", newline="") as arquivo:
+        arquivo.write("cod_contrato\n")
+        arquivo.writelines(f"{cod}\n" for cod in removidos)
+
+
+def processar_incremental(fonte: Fonte, destino: Destino, caminho_indice: Union[str, Path],
+                          layout: str = "lambda_csv3", arquivo_removidos: Optional[Union[str, Path]] = None,
+                          secoes: Optional[Sequence[str]] = None, contrato_inteiro: bool = False) -> Dict[str, int]:
+    """
+    Escreve no destino apenas as linhas dos contratos novos ou alterados, grava os removidos
+    em `arquivo_removidos` e, por último, atualiza o índice.
+    A comparação usa `secoes` ou, na falta delas, as SECOES_CONTRATO do layout; com
+    `contrato_inteiro`, qualquer mudança no contrato conta.
+    Retorna as estatísticas de escrita e as contagens de contratos.
+    """
+    modulo = importlib.import_module(layout)
+    if contrato_inteiro:
+        secoes = None
+    elif secoes is None:
+        secoes = modulo.SECOES_CONTRATO
+    with IndiceEstado(caminho_indice) as indice:
+        delta = Delta(fonte, indice, secoes)
+        estatisticas = modulo.escrever_csv(destino, delta)
+        if arquivo_removidos is not None:
+            escrever_removidos(arquivo_removidos, delta.removidos)
+        delta.confirmar()
+
+    return {**estatisticas, **delta.estatisticas()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("entrada")
+    parser.add_argument("saida")
+    parser.add_argument("--indice", required=True)
+    parser.add_argument("--removidos")
+    parser.add_argument("--layout", default="lambda_csv3")
+    comparacao = parser.add_mutually_exclusive_group()
+    comparacao.add_argument("--secoes", help="chaves do contrato comparadas, separadas por vírgula "
+                                             "(padrão: as que o layout lê)")
+    comparacao.add_argument("--contrato-inteiro", action="store_true",
+                            help="qualquer mudança no contrato o reprocessa")
+    args = parser.parse_args()
+
+    secoes = args.secoes.split(",") if args.secoes else None
+    print(processar_incremental(args.entrada, args.saida, args.indice, args.layout, args.removidos,
+                                secoes, args.contrato_inteiro))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import heapq
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from modelo import Contrato, normalizar_contrato
+
+# Etapas medidas em cada contrato, na ordem em que acontecem
+ETAPAS = ("leitura_json", "normalizacao", "geracao_linhas", "escrita")
+
+# Quantidade de contratos guardada em cada ranking (mais linhas, mais tempo)
+TOP_N = 10
+
+# Namespace das métricas no formato EMF (CloudWatch Embedded Metric Format)
+NAMESPACE_EMF = "ConversaoContratos"
+
+_ativa: Optional["Instrumentacao"] = None
+
+
+class Instrumentacao:
+    """
+    Tempos acumulados por etapa, contadores e os contratos com mais linhas e mais tempo.
+
+    Só é usada quando ativada (`ativar` ou variável de ambiente INSTRUMENTACAO=1); desligada,
+    os layouts seguem pelo caminho normal e o custo é uma verificação por chamada de escrever_csv.
+    """
+
+    def __init__(self, top_n: int = TOP_N):
+        self.top_n = top_n
+        self.etapas: Dict[str, float] = dict.fromkeys(ETAPAS, 0.0)
+        self.contadores: Dict[str, int] = {"contratos": 0, "contratos_sem_linhas": 0, "linhas": 0, "bytes": 0}
+        self._top_linhas: List[Tuple[int, int, str]] = []
+        self._top_tempo: List[Tuple[float, int, str]] = []
+
+    def _registrar_top(self, heap: list, valor, cod_contrato: str) -> None:
+        # Em empates fica o contrato que apareceu primeiro
+        item = (valor, -self.contadores["contratos"], cod_contrato)
+        if len(heap) < self.top_n:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    def escrever(self, escritor, contratos: Iterable[Union[Dict, Contrato]],
+                 gerar_linhas: Callable[[Contrato], Iterator[List[str]]],
+                 normalizar: Callable[[Dict], Contrato] = normalizar_contrato) -> None:
+        """
+        Escreve as linhas dos contratos medindo cada etapa separadamente: a leitura (o tempo
+        até o iterável entregar o próximo contrato), a normalização, a geração das linhas e a escrita.
+        As linhas de um contrato são montadas por inteiro antes de escritas, para separar as etapas.
+        `normalizar` é a normalização do layout (a completa, por padrão).
+        """
+        relogio = time.perf_counter
+        etapas = self.etapas
+        contadores = self.contadores
+        bytes_inicio = escritor.bytes_escritos
+        iterador = iter(contratos)
+
+        while True:
+            t0 = relogio()
+            try:
+                contrato = next(iterador)
+            except StopIteration:
+                break
+            t1 = relogio()
+            if not isinstance(contrato, Contrato):
+                contrato = normalizar(contrato)
+            t2 = relogio()
+            linhas = list(gerar_linhas(contrato))
+            t3 = relogio()
+            escritor.escrever_varias(linhas)
+            t4 = relogio()
+
+            etapas["leitura_json"] += t1 - t0
+            etapas["normalizacao"] += t2 - t1
+            etapas["geracao_linhas"] += t3 - t2
+            etapas["escrita"] += t4 - t3
+            contadores["contratos"] += 1
+            contadores["linhas"] += len(linhas)
+            if not linhas:
+                contadores["contratos_sem_linhas"] += 1
+            self._registrar_top(self._top_linhas, len(linhas), contrato.cod_contrato)
+            self._registrar_top(self._top_tempo, t4 - t0, contrato.cod_contrato)
+
+        t0 = relogio()
+        escritor.descarregar()
+        etapas["escrita"] += relogio() - t0
+        contadores["bytes"] += escritor.bytes_escritos - bytes_inicio
+
+    def relatorio(self) -> Dict:
+        """
+        Relatório em dicionário (serializável em JSON), com tempos em segundos.
+        """
+        def ranking(heap):
+            return [{"cod_contrato": cod, "valor": round(valor, 6)} for valor, _, cod in sorted(heap, reverse=True)]
+
+        total = sum(self.etapas.values())
+        return {
+            "etapas_s": {etapa: round(segundos, 6) for etapa, segundos in self.etapas.items()},
+            "total_s": round(total, 6),
+            "contadores": dict(self.contadores),
+            "contratos_por_s": round(self.contadores["contratos"] / total, 1) if total else 0.0,
+            "top_linhas": ranking(self._top_linhas),
+            "top_tempo_s": ranking(self._top_tempo),
+        }
+
+    def salvar(self, caminho: Union[str, Path]) -> None:
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            json.dump(self.relatorio(), arquivo, ensure_ascii=False, indent=4)
+
+    def linha_emf(self, dimensoes: Optional[Dict[str, str]] = None, namespace: str = NAMESPACE_EMF) -> str:
+        """
+        Linha de log no formato EMF: impressa pela Lambda, vira métricas no CloudWatch sem chamadas à API.
+        """
+        dimensoes = dimensoes or {}
+        metricas = {f"{etapa}_ms": round(segundos * 1000, 3) for etapa, segundos in self.etapas.items()}
+        metricas_unidade = [{"Name": nome, "Unit": "Milliseconds"} for nome in metricas]
+        for nome, valor in self.contadores.items():
+            metricas[nome] = valor
+            metricas_unidade.append({"Name": nome, "Unit": "Bytes" if nome == "bytes" else "Count"})
+
+        documento = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": namespace,
+                    "Dimensions": [list(dimensoes)],
+                    "Metrics": metricas_unidade,
+                }],
+            },
+            **dimensoes,
+            **metricas,
+        }
+        return json.dumps(documento, ensure_ascii=False, separators=(",", ":"))
+
+
+def ativar(top_n: int = TOP_N) -> Instrumentacao:
+    """
+    Liga a instrumentação com contadores zerados e retorna a instância em uso.
+    """
+    global _ativa
+    _ativa = Instrumentacao(top_n)
+    return _ativa
+
+
+def desativar() -> Optional[Instrumentacao]:
+    """
+    Desliga a instrumentação e retorna a instância que estava em uso.
+    """
+    global _ativa
+    anterior, _ativa = _ativa, None
+    return anterior
+
+
+def ativa() -> Optional[Instrumentacao]:
+    """
+    Retorna a instrumentação em uso ou None quando desligada.
+    """
+    return _ativa
+
+
+def ativada_no_ambiente() -> bool:
+    return os.environ.get("INSTRUMENTACAO", "") not in ("", "0")
@@ -1,8 +1,41 @@
 import json
-import csv
 import os
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+import backend_json
+from instrumentacao import ativa
+from leitor_contratos import ler_contratos
+from modelo import Agregados, Contrato, extrair_agregados, normalizar_contrato
+from numerico import contratos_por_lote, decimal_de_centavos, resumir_lote
+from saida_csv import TAMANHO_LOTE, Destino, abrir_escritor, formato_destino
+from validacao import Quarentena, compilar, esquema_contrato, exigir, filtrar_validos
+
+CABECALHO = [
+    "cod_contrato", "sigla", "maior_numero_parcela", "valor_maior_parcela",
+    "maior_saldo", "data_maior_saldo", "data_referencia_hist_atual",
+    "tipo_registro", "data_evento", "valor_evento"
+]
+
+# Tipo de cada coluna do CABECALHO na saída colunar (ver saida_parquet.TIPOS)
+TIPOS_COLUNAS = [
+    "texto", "codigo", "inteiro", "decimal",
+    "decimal", "data", "data",
+    "codigo", "data", "decimal"
+]
+
+# Este layout precisa da maior parcela e do maior saldo de cada contrato, e converte os valores
+ESQUEMA = exigir(esquema_contrato(valores=True), ("parcelas",), ("valor", "dados_historicos_saldo_devedor"))
+
+# Validação dos contratos, compilada uma vez a partir do esquema
+validar_contrato = compilar(ESQUEMA)
+
+# Chaves do contrato que chegam ao CSV; no processamento incremental, só mudanças nelas contam (ver incremental.py)
+SECOES_CONTRATO = (
+    "sigla", "parcelas", "dados_historicos_saldo_devedor", "valor", "dados_historicos_marcacao_contrato",
+    "pagamentos_realizados", "amortizacoes",
+)
 
 
 def carregar_json(json_str: str) -> Dict:
@@ -10,7 +43,7 @@ def carregar_json(json_str: str) -> Dict:
     Converte uma string JSON em um dicionário Python.
     """
     try:
-        return json.loads(json_str)
+        return backend_json.loads(json_str)
     except json.JSONDecodeError as e:
         raise ValueError(f"Erro ao carregar JSON: {e}")
 
@@ -48,50 +81,110 @@ def criar_diretorio(caminho: Path) -> None:
         caminho.mkdir(parents=True, exist_ok=True)
 
 
-def escrever_csv(nome_arquivo: Path, contratos: List[Dict]) -> None:
+def _linhas_contrato(contrato: Contrato, agregados: Agregados) -> Iterator[List[str]]:
+    """
+    Monta as linhas do contrato a partir dos agregados já extraídos.
+    """
+    maior_parcela = agregados.maior_parcela
+    maior_saldo = agregados.maior_saldo
+    if maior_parcela is None or maior_saldo is None:
+        raise ValueError(f"Contrato {contrato.cod_contrato} sem parcelas ou sem saldos")
+    data_hist_atual = agregados.marcacao_atual.data_referencia if agregados.marcacao_atual else ""
+
+    prefixo = [
+        contrato.cod_contrato,
+        contrato.sigla,
+        maior_parcela.numero,
+        maior_parcela.valor,
+        maior_saldo.valor,
+        maior_saldo.data_referencia,
+        data_hist_atual,
+    ]
+
+    if not contrato.eventos:
+        yield prefixo + ["", "", ""]  # Garante que o contrato apareça no CSV
+        return
+
+    for evento in contrato.eventos:
+        yield prefixo + [evento.tipo, evento.data, evento.valor]
+
+
+def gerar_linhas(contrato: Union[Dict, Contrato]) -> Iterator[List[str]]:
+    """
+    Gera as linhas do contrato: uma para cada pagamento ou amortização.
+    Aceita o dicionário do JSON ou um Contrato já normalizado.
+    """
+    if not isinstance(contrato, Contrato):
+        contrato = normalizar_contrato(contrato)
+
+    yield from _linhas_contrato(contrato, extrair_agregados(contrato))
+
+
+def gerar_linhas_lote(contratos: Iterable[Union[Dict, Contrato]]) -> Iterator[List[str]]:
+    """
+    Gera as mesmas linhas de `gerar_linhas`, mas normaliza os contratos em lotes e obtém o
+    maior saldo de cada lote inteiro pelo estágio numérico (numerico.resumir_lote), em centavos exatos.
+    Contratos com algum saldo fora do formato de centavos seguem pela comparação com Decimal,
+    como em `gerar_linhas`; valores de eventos são copiados sem conversão.
+    """
+    contratos = iter(contratos)
+    tamanho = contratos_por_lote()
+    while True:
+        lote = [
+            contrato if isinstance(contrato, Contrato) else normalizar_contrato(contrato)
+            for contrato in islice(contratos, tamanho)
+        ]
+        if not lote:
+            return
+
+        resumo = resumir_lote(lote)
+        for contrato, indice, maior in zip(lote, resumo.indice_maior_saldo, resumo.maior_saldo):
+            if indice is None:
+                agregados = extrair_agregados(contrato)
+            else:
+                agregados = extrair_agregados(contrato, saldos=False)
+                if indice >= 0:
+                    agregados.maior_saldo = contrato.saldos[indice]
+                    agregados.valor_maior_saldo = decimal_de_centavos(maior)
+            yield from _linhas_contrato(contrato, agregados)
+
+
+def escrever_csv(nome_arquivo: Destino, contratos: Iterable[Dict], tamanho_lote: int = TAMANHO_LOTE,
+                 processos: Optional[int] = 1, formato: Optional[str] = None,
+                 particionamento=None, quarentena: Optional[Quarentena] = None) -> Dict[str, int]:
     """
     Escreve os dados dos contratos em um arquivo CSV, gerando uma linha para cada pagamento ou amortização.
+    Aceita qualquer iterável de contratos, inclusive o gerador de `ler_contratos`.
+    O destino pode ser um caminho ou um fluxo binário aberto (por exemplo, um upload para o S3).
+    Com `processos` diferente de 1, divide os contratos entre processos (None usa todas as CPUs).
+    `formato` ("csv", "parquet" ou "arrow") é deduzido da extensão do arquivo quando omitido.
+    Com `particionamento` (saida_particionada.Particionamento), `nome_arquivo` é o diretório das partições.
+    Com `quarentena` (validacao.Quarentena), contratos fora do esquema vão para ela e o processamento continua.
+    Retorna as estatísticas de escrita (linhas, bytes e descargas) e, com quarentena, as dos contratos rejeitados.
     """
-    with nome_arquivo.open(mode="w", newline="", encoding="utf-8") as file:
-        writer = csv.writer(file, delimiter=";")
-
-        # Cabeçalho
-        writer.writerow([
-            "cod_contrato", "sigla", "maior_numero_parcela", "valor_maior_parcela",
-            "maior_saldo", "data_maior_saldo", "data_referencia_hist_atual",
-            "tipo_registro", "data_evento", "valor_evento"
-        ])
-
-        for contrato in contratos:
-            maior_parcela = obter_maior_parcela(contrato["parcelas"])
-            maior_saldo = obter_maior_saldo(contrato["valor"])
-            data_hist_atual = obter_historico_atual(contrato.get("dados_historicos_marcacao_contrato", []))
-
-            pagamentos = contrato.get("pagamentos_realizados", [])
-            amortizacoes = contrato.get("amortizacoes", [])
-
-            eventos = [
-                          ("Pagamento", p["data_pagamento"], p["valor_pago"]) for p in pagamentos
-                      ] + [
-                          ("Amortização", a["data_amortizacao"], a["valor_amortizado"]) for a in amortizacoes
-                      ]
-
-            if not eventos:
-                eventos.append(("", "", ""))  # Garante que o contrato apareça no CSV
-
-            for tipo, data, valor in eventos:
-                writer.writerow([
-                    contrato["cod_contrato"],
-                    contrato["sigla"],
-                    maior_parcela["numero_parcela"],
-                    maior_parcela["valor|"],
-                    maior_saldo["saldo"],
-                    maior_saldo["data_processamento"],
-                    data_hist_atual,
-                    tipo,
-                    data,
-                    valor
-                ])
+    formato = formato_destino(nome_arquivo, formato)
+    if quarentena is not None:
+        contratos = filtrar_validos(contratos, validar_contrato, quarentena)
+
+    if processos != 1:
+        if formato != "csv" or particionamento is not None:
+            raise ValueError("O modo paralelo só gera CSV em arquivo único")
+        from paralelo import escrever_csv_paralelo
+        estatisticas = escrever_csv_paralelo(nome_arquivo, contratos, "lambda_csv2", processos,
+                                             tamanho_lote=tamanho_lote)
+    else:
+        with abrir_escritor(nome_arquivo, CABECALHO, TIPOS_COLUNAS, formato, tamanho_lote,
+                            particionamento) as escritor:
+            instrumentacao = ativa()
+            if instrumentacao is None:
+                escritor.escrever_varias(gerar_linhas_lote(contratos))
+            else:
+                instrumentacao.escrever(escritor, contratos, gerar_linhas)
+        estatisticas = escritor.estatisticas()
+
+    if quarentena is not None:
+        estatisticas.update(quarentena.estatisticas())
+    return estatisticas
 
 
 def main():
@@ -144,11 +237,8 @@ def main():
     }
     '''
 
-    # Carregar JSON
-    dados = carregar_json(json_str)
-
-    # Obter lista de contratos
-    contratos = dados["dados"]["contratos"]
+    # Ler os contratos um a um, sem carregar o JSON inteiro
+    contratos = ler_contratos(json_str)
 
     # Caminho do diretório e do arquivo CSV
     diretorio = Path("C:/Users/Rafael/Documents/lambda/lambda-python")
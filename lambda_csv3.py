@@ -1,8 +1,149 @@
 import json
-import csv
 import os
+from itertools import product, repeat
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import backend_json
+from instrumentacao import ativa
+from leitor_contratos import ler_contratos
+from mapeamentos import RegistroMapeamentos
+from modelo import Contrato, como_lista, normalizar_contrato
+from saida_csv import TAMANHO_LOTE, Destino, abrir_escritor, formato_destino
+from validacao import ESQUEMA_CONTRATO, Quarentena, compilar, exigir, filtrar_validos
+
+# Cabeçalho do CSV, como no arquivo legado: dois pares de nomes aparecem colados ("NUM_CTRT" "COD_PROD_FINN"),
+# o que deixa 22 nomes para os 22 valores da linha. Não serve para nomear colunas tipadas (ver COLUNAS_TIPADAS).
+CABECALHO = [
+    "DATA_PRO", "SIGLA", "CPRODLIM", "NUM_CTRT" "COD_PROD_FINN", "COD_PRDO_CPIT_JRNM", "COD_SITU_COPO_CNTR"
+    "COD_COPO_FINN", "COD_FORM_EFET_COPO", "COD_FSCR_OPCR", "COD_MOTI_ISEN_COPO_FINN", "COD_REGM_CPIT_JRNM",
+    "COD_REGR_APRO_REACT_OPCR", "COD_SITU_OPCR", "COD_TIPO_COPO_FINN", "COD_TIPO_EFET_COPO_FINN",
+    "COD_TIPO_PARP_PESS_OPCR", "DAT_BAIX_OPCR", "DAT_CNTC_COPO_FINN", "DAT_CNTC_OPCR", "DAT_DTVR_ULTI_ATUI_OPCR",
+    "DAT_INICIO_ATIVO", "DAT_MDOO_ATIVO", "DATA_VALOR"
+]
+
+# Nome e tipo (ver saida_parquet.TIPOS) de cada valor da linha gerada, na ordem, para a saída colunar;
+# os nomes são os dos campos do registro de largura fixa
+COLUNAS_TIPADAS = [
+    ("DATA_PRO", "data"),
+    ("SIGLA", "codigo"),
+    ("CPRODLIM", "codigo"),
+    ("NUM_CTRT", "texto"),
+    ("COD_PROD_FINN", "codigo"),
+    ("COD_SITU_COPO_CNTR", "codigo"),
+    ("COD_COPO_FINN", "codigo"),
+    ("COD_FORM_EFET_COPO", "codigo"),
+    ("COD_FSCR_OPCR", "codigo"),
+    ("COD_MOTI_ISEN_COPO_FINN", "codigo"),
+    ("COD_REGM_CPIT_JRNM", "codigo"),
+    ("COD_REGR_APRO_REACT_OPCR", "codigo"),
+    ("COD_SITU_OPCR", "codigo"),
+    ("COD_TIPO_COPO_FINN", "codigo"),
+    ("COD_TIPO_EFET_COPO_FINN", "codigo"),
+    ("COD_TIPO_PARP_PESS_OPCR", "codigo"),
+    ("DAT_BAIX_OPCR", "data"),
+    ("DAT_CNTC_COPO_FINN", "data"),
+    ("DAT_CNTC_OPCR", "data"),
+    ("DAT_DTVR_ULTI_ATUI_OPCR", "data"),
+    ("DAT_INICIO_ATIVO", "data"),
+    ("DATA_VALOR", "data"),
+]
+COLUNAS = [nome for nome, _ in COLUNAS_TIPADAS]
+TIPOS_COLUNAS = [tipo for _, tipo in COLUNAS_TIPADAS]
+
+# Campos do registro de largura fixa (formato "fixo", extensão .dat), um para cada valor da linha gerada,
+# nomeado pelo dado que ele recebe. Os códigos já chegam com 5 posições; o motivo de baixa sem mapeamento
+# segue alinhado à esquerda.
+CAMPOS_LARGURA_FIXA = [
+    ("DATA_PRO", 10, "data"),
+    ("SIGLA", 4),
+    ("CPRODLIM", 10),
+    ("NUM_CTRT", 20),
+    ("COD_PROD_FINN", 10),
+    ("COD_SITU_COPO_CNTR", 5),
+    ("COD_COPO_FINN", 5),
+    ("COD_FORM_EFET_COPO", 5),
+    ("COD_FSCR_OPCR", 5),
+    ("COD_MOTI_ISEN_COPO_FINN", 5),
+    ("COD_REGM_CPIT_JRNM", 5),
+    ("COD_REGR_APRO_REACT_OPCR", 5),
+    ("COD_SITU_OPCR", 5),
+    ("COD_TIPO_COPO_FINN", 5),
+    ("COD_TIPO_EFET_COPO_FINN", 5),
+    ("COD_TIPO_PARP_PESS_OPCR", 5),
+    ("DAT_BAIX_OPCR", 10, "data"),
+    ("DAT_CNTC_COPO_FINN", 10, "data"),
+    ("DAT_CNTC_OPCR", 10, "data"),
+    ("DAT_DTVR_ULTI_ATUI_OPCR", 10, "data"),
+    ("DAT_INICIO_ATIVO", 10, "data"),
+    ("DATA_VALOR", 10, "data"),
+]
+
+# Mapeamento dos códigos de motivo de baixa
+MOTIVOS_BAIXA = {
+    "1": "00001",
+    "5": "00001",
+    "2": "00002",
+    "3": "00002",
+    "4": "00003",
+}
+
+# Mapeamento dos códigos de marcação do contrato
+MARCACAO_CONTRATO = {"1": "00010", "2": "XXXXX", "3": "00072"}
+
+# Mapeamentos usados pelo layout; podem ser trocados por outros carregados da configuração (usar_mapeamentos)
+MAPEAMENTOS_PADRAO = {
+    # Motivos fora da tabela mantêm o valor original
+    "motivo_baixa_contrato": {"tabela": MOTIVOS_BAIXA, "padrao": None},
+    "marcacao_contrato": {"tabela": MARCACAO_CONTRATO, "padrao": ""},
+    "regime_apropriacao": {"tabela": {"Competencia": "00001"}, "padrao": "     "},
+}
+
+mapeamentos = RegistroMapeamentos(MAPEAMENTOS_PADRAO)
+
+# Montado na primeira saída "fixo" (ver registro_largura_fixa)
+_registro_largura_fixa = None
+
+# Códigos fixos do layout
+COD_TIPO_COPO_FINN = "00000"
+COD_COPO_FINN = "00001"
+COD_SITU_COPO_CNTR = "00001"
+COD_FORM_EFET_COPO = "00002"
+COD_MOTI_ISEN_COPO_FINN = "00002"
+COD_REGM_CPIT_JRNM = "00001"
+COD_TIPO_EFET_COPO_FINN = "00001"
+COD_TIPO_PARP_PESS_OPCR = "00002"
+
+
+# Validação dos contratos, compilada uma vez a partir do esquema; este layout precisa dos dados da operação
+validar_contrato = compilar(exigir(ESQUEMA_CONTRATO, ("dados_da_operacao",)))
+
+# Chaves do contrato que chegam ao CSV; no processamento incremental, só mudanças nelas contam (ver incremental.py)
+SECOES_CONTRATO = (
+    "sigla", "data_hora-processamento_dados", "dados_do_produto", "dados_da_operacao",
+    "dados_historicos_marcacao_contrato", "dados_historicos_taxa", "dados_historicos_valor",
+    "pagamentos_realizados", "amortizacoes",
+)
+
+
+def usar_mapeamentos(registro: Optional[RegistroMapeamentos] = None) -> RegistroMapeamentos:
+    """
+    Troca os mapeamentos do layout; sem argumento, volta aos padrões. Retorna o registro em uso.
+    """
+    global mapeamentos
+    mapeamentos = registro or RegistroMapeamentos(MAPEAMENTOS_PADRAO)
+    return mapeamentos
+
+
+def registro_largura_fixa():
+    """
+    Layout do registro de largura fixa (saida_fixa.LayoutRegistro), montado e importado só quando usado.
+    """
+    global _registro_largura_fixa
+    if _registro_largura_fixa is None:
+        from saida_fixa import Campo, LayoutRegistro
+        _registro_largura_fixa = LayoutRegistro([Campo(*campo) for campo in CAMPOS_LARGURA_FIXA])
+    return _registro_largura_fixa
 
 
 def carregar_json(json_str: str) -> Dict:
@@ -10,7 +151,7 @@ def carregar_json(json_str: str) -> Dict:
     Converte uma string JSON em um dicionário Python.
     """
     try:
-        return json.loads(json_str)
+        return backend_json.loads(json_str)
     except json.JSONDecodeError as e:
         raise ValueError(f"Erro ao carregar JSON: {e}")
 
@@ -48,105 +189,190 @@ def criar_diretorio(caminho: Path) -> None:
         caminho.mkdir(parents=True, exist_ok=True)
 
 
-def escrever_csv(nome_arquivo: Path, contratos: List[Dict]) -> None:
+class PlanoContrato(NamedTuple):
     """
-    Escreve os dados dos contratos em um arquivo CSV, gerando uma linha para cada pagamento ou amortização.
+    Campos de um contrato já resolvidos antes da geração das linhas.
+    """
+    linhas_marcacao: List[List[str]]  # uma linha-base por marcação, sem as datas de taxa e valor
+    datas_taxa: List[str]
+    datas_valor: List[str]
+    repeticoes: int  # cada linha se repete uma vez por evento (pagamento ou amortização)
+
+
+def _codigos_sufixo(regime_apropriacao: str, motivo_baixa_contrato: str) -> Tuple[str, ...]:
+    """
+    Códigos do início do sufixo da linha, que dependem só do regime de apropriação e do motivo de baixa.
+    """
+    return (
+        COD_MOTI_ISEN_COPO_FINN,
+        COD_REGM_CPIT_JRNM,
+        mapeamentos["regime_apropriacao"](regime_apropriacao),
+        mapeamentos["motivo_baixa_contrato"](motivo_baixa_contrato),
+        COD_TIPO_COPO_FINN,
+        COD_TIPO_EFET_COPO_FINN,
+        COD_TIPO_PARP_PESS_OPCR,
+    )
+
+
+def planejar_contrato(contrato: Union[Dict, Contrato]) -> Optional[PlanoContrato]:
+    """
+    Calcula uma única vez todos os campos fixos do contrato.
+    Retorna None quando o contrato não gera nenhuma linha.
     """
-    with nome_arquivo.open(mode="w", newline="", encoding="utf-8") as file:
-        writer = csv.writer(file, delimiter=";")
+    if not isinstance(contrato, Contrato):
+        contrato = normalizar(contrato)
+
+    marcacoes = contrato.marcacoes
+    if not contrato.datas_taxa or not contrato.datas_valor or not marcacoes:
+        return None
+    if contrato.data_implantacao is None:
+        raise ValueError(f"Contrato {contrato.cod_contrato} sem dados_da_operacao")
+
+    # Os códigos que só dependem do regime e do motivo de baixa são montados uma vez por combinação
+    codigos = mapeamentos.combinacao(
+        (contrato.regime_apropriacao, contrato.motivo_baixa_contrato),
+        lambda: _codigos_sufixo(contrato.regime_apropriacao, contrato.motivo_baixa_contrato),
+    )
+
+    prefixo = [
+        contrato.data_processamento,
+        contrato.sigla,
+        contrato.cprodlin,
+        contrato.cod_contrato,
+        contrato.cprodlin,
+        # contrato["dados_do_produto"]["cod_produto_operacioanl_v9"],
+        COD_SITU_COPO_CNTR,
+        COD_COPO_FINN,
+        COD_FORM_EFET_COPO,
+    ]
+    sufixo = [
+        *codigos,
+        contrato.data_implantacao,
+        contrato.data_liquidacao,
+        contrato.data_ultima_atualizacao,
+        marcacoes[0].data_referencia,
+    ]
+    marcacao_contrato = mapeamentos["marcacao_contrato"]
+    linhas_marcacao = [
+        prefixo + [marcacao_contrato(marcacao.marcacao)] + sufixo
+        for marcacao in marcacoes
+    ]
 
-        # Cabeçalho
-        writer.writerow([
-            "DATA_PRO", "SIGLA", "CPRODLIM", "NUM_CTRT" "COD_PROD_FINN", "COD_PRDO_CPIT_JRNM", "COD_SITU_COPO_CNTR"
-            "COD_COPO_FINN", "COD_FORM_EFET_COPO", "COD_FSCR_OPCR", "COD_MOTI_ISEN_COPO_FINN", "COD_REGM_CPIT_JRNM",
-            "COD_REGR_APRO_REACT_OPCR", "COD_SITU_OPCR", "COD_TIPO_COPO_FINN", "COD_TIPO_EFET_COPO_FINN",
-            "COD_TIPO_PARP_PESS_OPCR", "DAT_BAIX_OPCR", "DAT_CNTC_COPO_FINN", "DAT_CNTC_OPCR", "DAT_DTVR_ULTI_ATUI_OPCR",
-            "DAT_INICIO_ATIVO", "DAT_MDOO_ATIVO", "DATA_VALOR"
-        ])
+    # Sem eventos, o contrato aparece uma vez no CSV
+    return PlanoContrato(linhas_marcacao, contrato.datas_taxa, contrato.datas_valor, contrato.quantidade_eventos or 1)
 
+
+def estimar_linhas(contrato: Union[Dict, Contrato]) -> int:
+    """
+    Calcula quantas linhas o contrato vai gerar, sem montar nenhuma delas.
+    Aceita o dicionário do JSON ou um Contrato já normalizado.
+    """
+    if isinstance(contrato, Contrato):
+        return (len(contrato.datas_taxa) * len(contrato.datas_valor) * len(contrato.marcacoes)
+                * (contrato.quantidade_eventos or 1))
+
+    eventos = len(contrato.get("pagamentos_realizados", [])) + len(contrato.get("amortizacoes", []))
+    return (
+        len(como_lista(contrato.get("dados_historicos_taxa")))
+        * len(como_lista(contrato.get("dados_historicos_valor")))
+        * len(como_lista(contrato.get("dados_historicos_marcacao_contrato")))
+        * (eventos or 1)
+    )
+
+
+class _LimiteLinhas:
+    """
+    Repassa os contratos, desviando os que gerariam mais linhas que o limite: vão para a
+    quarentena, quando houver, ou são só contados em `rejeitados`. A conversão continua.
+    """
+
+    def __init__(self, limite_linhas: int, quarentena: Optional[Quarentena] = None):
+        self.limite_linhas = limite_linhas
+        self.quarentena = quarentena
+        self.rejeitados = 0
+
+    def filtrar(self, contratos: Iterable[Union[Dict, Contrato]]) -> Iterator[Union[Dict, Contrato]]:
+        limite_linhas = self.limite_linhas
         for contrato in contratos:
-            maior_parcela = obter_maior_parcela(contrato["parcelas"])
-            maior_saldo = obter_maior_saldo(contrato["dados_historicos_saldo_devedor"])
-            data_hist_atual = obter_historico_atual(contrato.get("dados_historicos_marcacao_contrato", []))
-
-            pagamentos = contrato.get("pagamentos_realizados", [])
-            amortizacoes = contrato.get("amortizacoes", [])
-
-            eventos = [
-                          ("Pagamento", p["data_pagamento"], p["valor_pago"]) for p in pagamentos
-                      ] + [
-                          ("Amortização", a["data_amortizacao"], a["valor_amortizado"]) for a in amortizacoes
-                      ]
-
-            for taxa in contrato.get("dados_historicos_taxa", []):
-                data_referencia_taxa = taxa.get("data_referencia", "")
-                for valor in contrato.get("dados_historicos_valor", []):
-                    data_referencia_valor = valor.get("data_referencia", "")
-
-                    # Inclui a lógica de eventos
-                    if not eventos:
-                        eventos.append(("", "", ""))  # Garante que o contrato apareça no CSV
-
-                    regime_apropriacao = contrato["dados_da_operacao"]["regime_apropriacao"]
-                    if regime_apropriacao == "Competencia":
-                        regime_apropriacao = "00001"
-                    else:
-                        regime_apropriacao = "     ".ljust(5)
-
-                    motivo_baixa_contrato = contrato["dados_da_operacao"]["motivo_baixa_contrato"]
-                    # Mapeamento dos códigos
-                    motivos = {
-                        "1": "00001",
-                        "5": "00001",
-                        "2": "00002",
-                        "3": "00002",
-                        "4": "00003",
-                    }
-
-                    # Obtém o valor correspondente, se existir, senão mantém o original
-                    motivo_baixa_contrato = motivos.get(motivo_baixa_contrato, motivo_baixa_contrato)
-
-                    cod_tipo_copo_finn = "00000"
-                    cod_copo_finn = "00001"
-                    cod_situ_copo_cntr = "00001"
-                    cod_form_efet_copo = "00002"
-                    cod_moti_isen_copo_finn = "00002"
-                    cod_regm_cpit_jrnm = "00001"
-                    cod_tipo_efet_copo_finn = "00001"
-                    codi_tipo_parp_pess_opcr = "00002"
-
-                    for cod_fscr_opcr in contrato.get("dados_historicos_marcacao_contrato", []):
-                        marcacao_contrato = {
-                            "1": "00010", "2": "XXXXX", "3": "00072"
-                        }.get(cod_fscr_opcr.get("marcacao", ""), "")
-                        for tipo, data, valor in eventos:
-                            writer.writerow([
-                                contrato["data_hora-processamento_dados"][:10],
-                                contrato["sigla"],
-                                contrato["dados_do_produto"]["cprodlin"],
-                                contrato["cod_contrato"],
-                                contrato["dados_do_produto"]["cprodlin"],
-                                # contrato["dados_do_produto"]["cod_produto_operacioanl_v9"],
-                                cod_situ_copo_cntr,
-                                cod_copo_finn,
-                                cod_form_efet_copo,
-                                marcacao_contrato,
-                                cod_moti_isen_copo_finn,
-                                cod_regm_cpit_jrnm,
-                                regime_apropriacao,
-                                motivo_baixa_contrato,
-                                cod_tipo_copo_finn,
-                                cod_tipo_efet_copo_finn,
-                                codi_tipo_parp_pess_opcr,
-                                contrato["dados_da_operacao"]["data_implantacao"],
-                                contrato["dados_da_operacao"]["data_liquidacao"],
-                                contrato["dados_da_operacao"]["data_ulitma_atualizacao"],
-                                contrato.get("dados_historicos_marcacao_contrato", [{}])[0].get("data_referencia", ""),
-                                data_referencia_taxa,  # Adiciona data de referência da taxa
-                                data_referencia_valor  # Adiciona data de referência do valor
-                            ])
-
-                            
+            linhas = estimar_linhas(contrato)
+            if linhas <= limite_linhas:
+                yield contrato
+                continue
+            self.rejeitados += 1
+            if self.quarentena is not None:
+                self.quarentena.registrar(contrato, f"linhas: {linhas} acima do limite de {limite_linhas}")
+
+
+def normalizar(contrato: Dict) -> Contrato:
+    """
+    Normaliza só o que este layout lê (sem os valores de parcelas, saldos e eventos).
+    """
+    return normalizar_contrato(contrato, valores=False)
+
+
+def gerar_linhas(contrato: Union[Dict, Contrato]) -> Iterator[List[str]]:
+    """
+    Gera sob demanda as linhas do contrato: o produto cartesiano de taxa x valor x marcação,
+    repetido uma vez por evento. Aceita o dicionário do JSON ou um Contrato já normalizado.
+    """
+    plano = planejar_contrato(contrato)
+    if plano is None:
+        return
+
+    for data_referencia_taxa, data_referencia_valor, linha_base in product(
+            plano.datas_taxa, plano.datas_valor, plano.linhas_marcacao):
+        yield from repeat(linha_base + [data_referencia_taxa, data_referencia_valor], plano.repeticoes)
+
+
+def escrever_csv(nome_arquivo: Destino, contratos: Iterable[Dict], limite_linhas: Optional[int] = None,
+                 tamanho_lote: int = TAMANHO_LOTE, processos: Optional[int] = 1,
+                 formato: Optional[str] = None, particionamento=None,
+                 quarentena: Optional[Quarentena] = None) -> Dict[str, int]:
+    """
+    Escreve os dados dos contratos em um arquivo CSV, gerando uma linha para cada pagamento ou amortização.
+    Aceita qualquer iterável de contratos, inclusive o gerador de `ler_contratos`.
+    O destino pode ser um caminho ou um fluxo binário aberto (por exemplo, um upload para o S3).
+    Com `limite_linhas`, contratos que gerariam mais linhas que o limite são deixados de fora (e vão para a
+    quarentena, se houver); a quantidade sai em "contratos_acima_do_limite".
+    Com `processos` diferente de 1, divide os contratos entre processos (None usa todas as CPUs).
+    `formato` ("csv", "parquet", "arrow" ou "fixo") é deduzido da extensão do arquivo quando omitido.
+    Com `particionamento` (saida_particionada.Particionamento), `nome_arquivo` é o diretório das partições.
+    Com `quarentena` (validacao.Quarentena), contratos fora do esquema vão para ela e o processamento continua.
+    Retorna as estatísticas de escrita (linhas, bytes e descargas) e, com quarentena, as dos contratos rejeitados.
+    """
+    formato = formato_destino(nome_arquivo, formato)
+    if quarentena is not None:
+        contratos = filtrar_validos(contratos, validar_contrato, quarentena)
+    limite = None
+    if limite_linhas is not None:
+        limite = _LimiteLinhas(limite_linhas, quarentena)
+        contratos = limite.filtrar(contratos)
+
+    if processos != 1:
+        if formato != "csv" or particionamento is not None:
+            raise ValueError("O modo paralelo só gera CSV em arquivo único")
+        from paralelo import escrever_csv_paralelo
+        estatisticas = escrever_csv_paralelo(nome_arquivo, contratos, "lambda_csv3", processos,
+                                             tamanho_lote=tamanho_lote)
+    else:
+        registro = registro_largura_fixa() if formato == "fixo" else None
+        with abrir_escritor(nome_arquivo, CABECALHO, TIPOS_COLUNAS, formato, tamanho_lote,
+                            particionamento, registro, COLUNAS) as escritor:
+            instrumentacao = ativa()
+            if instrumentacao is None:
+                for contrato in contratos:
+                    escritor.escrever_varias(gerar_linhas(contrato))
+            else:
+                instrumentacao.escrever(escritor, contratos, gerar_linhas, normalizar)
+        estatisticas = escritor.estatisticas()
+
+    if limite is not None:
+        estatisticas["contratos_acima_do_limite"] = limite.rejeitados
+    if quarentena is not None:
+        estatisticas.update(quarentena.estatisticas())
+    return estatisticas
+
+
 def main():
     """
     Função principal que carrega o JSON, processa os contratos e gera um CSV.
@@ -419,14 +645,11 @@ def main():
 
     '''  # Substitua pelo JSON completo
 
-    # Carregar JSON
-    dados = carregar_json(json_str)
-
     # Nome do arquivo CSV
     arquivo_csv = "contratos.csv"
 
-    # Obter lista de contratos
-    contratos = dados["dados"]["contratos"]
+    # Ler os contratos um a um, sem carregar o JSON inteiro
+    contratos = ler_contratos(json_str)
 
     # Caminho onde você quer salvar o arquivo (diretório temp_dir no Windows)
     temp_dir = r"C:\Users\Rafael\Documents\lambda\lambda-python"
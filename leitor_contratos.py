@@ -0,0 +1,310 @@
+import io
+import json
+import mmap
+import re
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, Optional, Sequence, Tuple, Union
+
+import backend_json
+from compressao import abrir_entrada, codec_do_caminho, descompactar
+
+# Caminho até a lista de contratos dentro do JSON de entrada
+CAMINHO_CONTRATOS = ("dados", "contratos")
+
+# Quantidade de bytes lida da fonte a cada vez que o buffer se esgota
+TAMANHO_BLOCO = 1 << 20
+
+_ESTRUTURAL = re.compile(rb'[{}\[\]",:]')
+# Tudo que não é colchete/chave, pulando strings inteiras (inclusive as que contêm colchetes)
+_CONTEUDO = re.compile(rb'[^"{}\[\]]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"{}\[\]]*)*', re.DOTALL)
+_FIM_STRING = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_SEPARADORES = re.compile(rb'[ \t\r\n,]*')
+_ESPACOS = re.compile(rb'[ \t\r\n]*')
+
+Fonte = Union[str, bytes, Path, BinaryIO]
+
+
+class LeitorContratos:
+    """
+    Lê os contratos de um JSON de forma incremental, um de cada vez.
+
+    Apenas o contrato em leitura fica no buffer, então a memória depende do
+    maior contrato e não do tamanho do arquivo. As posições são offsets
+    absolutos em bytes na fonte.
+
+    Com `inicio`, retoma uma leitura anterior: o fluxo já está nesse offset (ver `posicionar`),
+    que é o `posicao` logo após um contrato, e a leitura continua dali até o fim da lista.
+    """
+
+    def __init__(self, fluxo: BinaryIO, caminho: Sequence[str] = CAMINHO_CONTRATOS,
+                 tamanho_bloco: int = TAMANHO_BLOCO, inicio: int = 0):
+        self._fluxo = fluxo
+        self._caminho = tuple(caminho)
+        self._tamanho_bloco = tamanho_bloco
+        self._buf = bytearray()
+        self._base = inicio  # offset absoluto de self._buf[0]
+        self._pos = inicio  # offset absoluto do próximo byte a analisar
+        self._marca = inicio  # primeiro offset que ainda precisa ficar no buffer
+        self._eof = False
+        self._no_array = inicio > 0
+
+    @property
+    def posicao(self) -> int:
+        """
+        Offset em bytes logo após o último contrato lido.
+        """
+        return self._pos
+
+    def _ler(self) -> bool:
+        """
+        Descarta o que já foi consumido e acrescenta um bloco ao buffer.
+        """
+        if self._eof:
+            return False
+
+        descartar = self._marca - self._base
+        if descartar > 0:
+            del self._buf[:descartar]
+            self._base = self._marca
+
+        bloco = self._fluxo.read(self._tamanho_bloco)
+        if isinstance(bloco, str):
+            bloco = bloco.encode("utf-8")
+        if not bloco:
+            self._eof = True
+            return False
+
+        self._buf += bloco
+        return True
+
+    def _buscar(self, padrao: "re.Pattern", inicio: int) -> "re.Match":
+        """
+        Procura o padrão a partir do offset, lendo mais dados enquanto não encontrar.
+        """
+        while True:
+            m = padrao.search(self._buf, inicio - self._base)
+            if m:
+                return m
+            if not self._ler():
+                raise ValueError("Erro ao carregar JSON: fim inesperado do arquivo")
+
+    def _fim_string(self, inicio: int) -> int:
+        """
+        Retorna o offset logo após a aspa que fecha a string iniciada em `inicio`.
+        """
+        while True:
+            m = _FIM_STRING.match(self._buf, inicio + 1 - self._base)
+            if m:
+                return m.end() + self._base
+            if not self._ler():
+                raise ValueError("Erro ao carregar JSON: string não terminada")
+
+    def _pular(self, padrao: "re.Pattern", inicio: int) -> int:
+        """
+        Avança sobre os caracteres do padrão e retorna o offset do próximo byte significativo.
+        """
+        while True:
+            inicio = padrao.match(self._buf, inicio - self._base).end() + self._base
+            if inicio - self._base < len(self._buf) or not self._ler():
+                return inicio
+
+    def _byte(self, posicao: int) -> bytes:
+        return bytes(self._buf[posicao - self._base:posicao - self._base + 1])
+
+    def _localizar_array(self) -> None:
+        """
+        Avança a leitura até o início da lista de contratos.
+        """
+        pilha = []  # [tipo do container, chave atual]
+        i = self._pos
+        while True:
+            self._marca = i
+            m = self._buscar(_ESTRUTURAL, i)
+            c = m.group()
+            j = m.start() + self._base
+
+            if c == b'"':
+                fim = self._fim_string(j)
+                k = self._pular(_ESPACOS, fim)
+                if pilha and pilha[-1][0] == b"{" and self._byte(k) == b":":
+                    pilha[-1][1] = json.loads(self._buf[j - self._base:fim - self._base])
+                i = fim
+                continue
+
+            if c == b"[" and len(pilha) == len(self._caminho) and all(
+                    tipo == b"{" and chave == esperado for (tipo, chave), esperado in zip(pilha, self._caminho)):
+                self._pos = self._marca = j + 1
+                self._no_array = True
+                return
+
+            if c in (b"{", b"["):
+                pilha.append([c, None])
+            elif c in (b"}", b"]"):
+                pilha.pop()
+                if not pilha:
+                    raise ValueError(f"Erro ao carregar JSON: caminho {'.'.join(self._caminho)} não encontrado")
+            elif c == b"," and pilha:
+                pilha[-1][1] = None
+            i = j + 1
+
+    def _fim_valor(self, inicio: int) -> int:
+        """
+        Retorna o offset logo após o objeto ou lista iniciado em `inicio`.
+        """
+        profundidade = 0
+        i = inicio
+        while True:
+            j = _CONTEUDO.match(self._buf, i - self._base).end()
+            i = j + self._base
+            # Parou no fim do buffer ou numa string ainda incompleta: lê mais e continua dali
+            if j >= len(self._buf) or self._buf[j] == 0x22:
+                if not self._ler():
+                    raise ValueError("Erro ao carregar JSON: fim inesperado do arquivo")
+                continue
+
+            if self._buf[j] in (0x7B, 0x5B):  # { [
+                profundidade += 1
+            else:
+                profundidade -= 1
+                if profundidade == 0:
+                    return i + 1
+            i += 1
+
+    def fragmentos(self) -> Iterator[Tuple[int, int, bytes]]:
+        """
+        Gera (inicio, fim, bytes) de cada contrato, sem decodificar o JSON.
+        """
+        if not self._no_array:
+            self._localizar_array()
+
+        while True:
+            self._marca = self._pos
+            i = self._pular(_SEPARADORES, self._pos)
+            c = self._byte(i)
+            if c == b"]":
+                self._pos = self._marca = i + 1
+                self._no_array = False
+                return
+            if not c:
+                raise ValueError("Erro ao carregar JSON: fim inesperado do arquivo")
+            if c not in (b"{", b"["):
+                raise ValueError(f"Erro ao carregar JSON: contrato inválido na posição {i}")
+
+            self._marca = i
+            fim = self._fim_valor(i)
+            bruto = bytes(self._buf[i - self._base:fim - self._base])
+            self._pos = self._marca = fim
+            yield i, fim, bruto
+
+    def __iter__(self) -> Iterator[Dict]:
+        for inicio, _, bruto in self.fragmentos():
+            try:
+                yield backend_json.loads(bruto)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Erro ao carregar JSON na posição {inicio}: {e}")
+
+
+class LeitorMapeado(LeitorContratos):
+    """
+    LeitorContratos sobre um buffer que já contém a entrada inteira, normalmente um arquivo
+    mapeado com `mapear`. As buscas correm direto no buffer, sem copiar blocos para o heap;
+    só os bytes de cada contrato viram objetos Python. Quem mantém os dados é o cache de
+    páginas do sistema, e `inicio` começa a leitura no offset sem tocar nos bytes anteriores.
+    """
+
+    def __init__(self, buffer: Union[bytes, mmap.mmap], caminho: Sequence[str] = CAMINHO_CONTRATOS,
+                 inicio: int = 0):
+        super().__init__(None, caminho, inicio=inicio)
+        self._buf = buffer
+        self._base = 0
+        self._eof = True
+
+    def _ler(self) -> bool:
+        return False
+
+
+@contextmanager
+def mapear(caminho: Union[str, Path]) -> Iterator[Union[bytes, mmap.mmap]]:
+    """
+    Mapeia um arquivo local sem compressão na memória, somente para leitura.
+    """
+    if codec_do_caminho(caminho):
+        raise ValueError(f"Arquivos compactados não podem ser mapeados: {caminho}")
+    with open(caminho, "rb") as arquivo:
+        if not Path(caminho).stat().st_size:
+            yield b""  # mmap não aceita arquivos vazios
+            return
+        buffer = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if hasattr(buffer, "madvise"):
+                buffer.madvise(mmap.MADV_SEQUENTIAL)
+            yield buffer
+        finally:
+            buffer.close()
+
+
+def abrir_fluxo(fonte: Fonte, compressao: Optional[str] = None) -> Tuple[BinaryIO, bool]:
+    """
+    Retorna um fluxo binário para a fonte e se ele deve ser fechado ao final.
+    Arquivos .gz/.zst são descompactados durante a leitura; para fluxos, o codec vem de `compressao`.
+    """
+    if isinstance(fonte, (bytes, bytearray)):
+        fluxo, fechar = io.BytesIO(fonte), True
+    elif isinstance(fonte, str) and fonte.lstrip().startswith(("{", "[")):
+        fluxo, fechar = io.BytesIO(fonte.encode("utf-8")), True
+    elif isinstance(fonte, (str, Path)):
+        return abrir_entrada(fonte, compressao), True
+    else:
+        fluxo, fechar = fonte, False
+
+    if compressao is None:
+        return fluxo, fechar
+    # Fechar o descompressor não fecha um fluxo recebido pronto
+    return descompactar(fluxo, compressao, fechar_fonte=fechar), True
+
+
+def posicionar(fluxo: BinaryIO, inicio: int) -> None:
+    """
+    Avança o fluxo até o offset `inicio`: com seek, quando o fluxo permite, ou lendo e
+    descartando (fluxos de rede e, nos compactados, o trecho já descompactado).
+    """
+    if inicio <= 0:
+        return
+    if fluxo.seekable():
+        fluxo.seek(inicio)
+        return
+    restante = inicio
+    while restante:
+        bloco = fluxo.read(min(restante, TAMANHO_BLOCO))
+        if not bloco:
+            raise ValueError(f"Erro ao carregar JSON: a fonte termina antes da posição {inicio}")
+        restante -= len(bloco)
+
+
+def ler_contratos(fonte: Fonte, caminho: Sequence[str] = CAMINHO_CONTRATOS,
+                  tamanho_bloco: Optional[int] = None, compressao: Optional[str] = None,
+                  inicio: int = 0) -> Iterator[Dict]:
+    """
+    Gera os contratos de `dados.contratos` um a um, a partir de um caminho de
+    arquivo, uma string/bytes JSON ou um fluxo aberto.
+    Com `compressao` ("gzip" ou "zstd"), a fonte é descompactada durante a leitura;
+    para arquivos, o codec também é deduzido da extensão (.gz, .zst).
+    Com `inicio` (o `posicao` de uma leitura anterior), pula os contratos antes desse offset.
+    """
+    fluxo, fechar = abrir_fluxo(fonte, compressao)
+    try:
+        posicionar(fluxo, inicio)
+        yield from LeitorContratos(fluxo, caminho, tamanho_bloco or TAMANHO_BLOCO, inicio)
+    finally:
+        if fechar:
+            fluxo.close()
+
+
+def ler_contratos_mapeado(arquivo: Union[str, Path], caminho: Sequence[str] = CAMINHO_CONTRATOS,
+                          inicio: int = 0) -> Iterator[Dict]:
+    """
+    Como `ler_contratos`, para um arquivo local sem compressão lido por mmap (ver `LeitorMapeado`).
+    """
+    with mapear(arquivo) as buffer:
+        yield from LeitorMapeado(buffer, caminho, inicio)
@@ -0,0 +1,132 @@
+import json
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Optional, TypeVar, Union
+
+T = TypeVar("T")
+
+# Definição de um mapeamento na configuração:
+#   {"tabela": {"valor de entrada": "código de saída", ...}, "padrao": "código" ou null}
+# Com "padrao" null (ou ausente), valores fora da tabela passam sem alteração.
+
+# Combinações guardadas no cache de um registro; as seguintes são construídas a cada uso, sem contagem própria.
+# Limita a memória quando as chaves incluem valores de entrada que passam sem mapeamento.
+LIMITE_COMBINACOES = 1024
+
+
+class Mapeamento:
+    """
+    Tabela de tradução de um campo, compilada num dicionário plano. Conta acertos, faltas
+    e quantas vezes cada código da tabela (ou o padrão) foi produzido; valores que passam sem
+    mapeamento só entram nas faltas, então a contagem não cresce com a variedade da entrada.
+    """
+    __slots__ = ("nome", "tabela", "padrao", "acertos", "faltas", "frequencias")
+
+    def __init__(self, nome: str, tabela: Dict[str, str], padrao: Optional[str] = None):
+        for origem, codigo in tabela.items():
+            if not isinstance(codigo, str):
+                raise ValueError(f"Mapeamento {nome}: código inválido para {origem!r}: {codigo!r}")
+        self.nome = nome
+        self.tabela = {str(origem): codigo for origem, codigo in tabela.items()}
+        self.padrao = padrao
+        self.acertos = 0
+        self.faltas = 0
+        self.frequencias: Counter = Counter()
+
+    def __call__(self, valor: str) -> str:
+        codigo = self.tabela.get(valor)
+        if codigo is None:
+            self.faltas += 1
+            if self.padrao is None:
+                return valor
+            codigo = self.padrao
+        else:
+            self.acertos += 1
+        self.frequencias[codigo] += 1
+        return codigo
+
+    def estatisticas(self, mais_comuns: int = 10) -> Dict:
+        return {
+            "acertos": self.acertos,
+            "faltas": self.faltas,
+            "mais_comuns": self.frequencias.most_common(mais_comuns),
+        }
+
+
+class RegistroMapeamentos:
+    """
+    Conjunto de mapeamentos de um layout, mais um cache de combinações derivadas
+    (por exemplo, o trecho de linha que só depende de dois campos mapeados), limitado a
+    `limite_combinacoes` chaves.
+
+    As estatísticas são do processo: no modo paralelo cada trabalhador usa o seu próprio
+    registro, e as contagens deles não chegam ao registro do processo principal.
+    """
+
+    def __init__(self, definicoes: Dict[str, Dict], limite_combinacoes: int = LIMITE_COMBINACOES):
+        self._mapeamentos: Dict[str, Mapeamento] = {}
+        for nome, definicao in definicoes.items():
+            if "tabela" not in definicao:
+                raise ValueError(f"Mapeamento {nome} sem tabela")
+            self._mapeamentos[nome] = Mapeamento(nome, definicao["tabela"], definicao.get("padrao"))
+        self._combinacoes: Dict[Hashable, object] = {}
+        self._limite_combinacoes = limite_combinacoes
+        self.frequencias_combinacao: Counter = Counter()
+        self.acertos_combinacao = 0
+        self.faltas_combinacao = 0
+
+    @classmethod
+    def de_arquivo(cls, caminho: Union[str, Path]) -> "RegistroMapeamentos":
+        """
+        Carrega os mapeamentos de um arquivo JSON.
+        """
+        try:
+            with open(caminho, encoding="utf-8") as arquivo:
+                return cls(json.load(arquivo))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Erro ao carregar mapeamentos de {caminho}: {e}")
+
+    def __getitem__(self, nome: str) -> Mapeamento:
+        return self._mapeamentos[nome]
+
+    def combinacao(self, chave: Hashable, construir: Callable[[], T]) -> T:
+        """
+        Retorna o valor derivado já calculado para a chave ou o constrói e guarda.
+        O valor é compartilhado entre as chamadas, então não deve ser alterado. Os mapeamentos usados
+        em `construir` só contam a construção; o uso de cada combinação guardada fica em
+        `frequencias_combinacao`. Com o cache cheio, chaves novas são construídas a cada uso e só
+        contam como faltas.
+        """
+        try:
+            valor = self._combinacoes[chave]
+        except KeyError:
+            self.faltas_combinacao += 1
+            valor = construir()
+            if len(self._combinacoes) >= self._limite_combinacoes:
+                return valor
+            self._combinacoes[chave] = valor
+        else:
+            self.acertos_combinacao += 1
+        self.frequencias_combinacao[chave] += 1
+        return valor
+
+    def estatisticas(self, mais_comuns: int = 10) -> Dict:
+        """
+        Acertos, faltas e códigos mais frequentes de cada mapeamento, e o uso do cache de combinações.
+        """
+        return {
+            "mapeamentos": {nome: m.estatisticas(mais_comuns) for nome, m in self._mapeamentos.items()},
+            "combinacoes": {
+                "acertos": self.acertos_combinacao,
+                "faltas": self.faltas_combinacao,
+                "tamanho": len(self._combinacoes),
+                "mais_comuns": self.frequencias_combinacao.most_common(mais_comuns),
+            },
+        }
+
+    def zerar_estatisticas(self) -> None:
+        for mapeamento in self._mapeamentos.values():
+            mapeamento.acertos = mapeamento.faltas = 0
+            mapeamento.frequencias.clear()
+        self.frequencias_combinacao.clear()
+        self.acertos_combinacao = self.faltas_combinacao = 0
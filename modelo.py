@@ -0,0 +1,217 @@
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional, Union
+
+# Tipos de evento gerados a partir de pagamentos_realizados e amortizacoes
+PAGAMENTO = "Pagamento"
+AMORTIZACAO = "Amortização"
+
+
+class Parcela:
+    __slots__ = ("numero", "valor")
+
+    def __init__(self, numero: str, valor: str):
+        self.numero = numero
+        self.valor = valor
+
+
+class SaldoDevedor:
+    __slots__ = ("valor", "data_referencia")
+
+    def __init__(self, valor: str, data_referencia: str):
+        self.valor = valor
+        self.data_referencia = data_referencia
+
+
+class HistoricoMarcacao:
+    __slots__ = ("marcacao", "data_referencia", "hist_atual")
+
+    def __init__(self, marcacao: str, data_referencia: str, hist_atual: bool):
+        self.marcacao = marcacao
+        self.data_referencia = data_referencia
+        self.hist_atual = hist_atual
+
+
+class HistoricoAlteracaoProduto:
+    __slots__ = ("cprodlin", "data_referencia", "hist_atual")
+
+    def __init__(self, cprodlin: str, data_referencia: str, hist_atual: bool):
+        self.cprodlin = cprodlin
+        self.data_referencia = data_referencia
+        self.hist_atual = hist_atual
+
+
+class Evento:
+    __slots__ = ("tipo", "data", "valor")
+
+    def __init__(self, tipo: str, data: str, valor: str):
+        self.tipo = tipo
+        self.data = data
+        self.valor = valor
+
+
+class Contrato:
+    """
+    Contrato normalizado: os campos usados pelos layouts, já extraídos do JSON, e os
+    históricos sempre como listas. Os campos da operação são None quando o contrato
+    não tem "dados_da_operacao"; os históricos de valores são None quando não foram
+    extraídos (ver `normalizar_contrato`).
+    """
+    __slots__ = (
+        "cod_contrato", "sigla", "data_processamento", "cprodlin",
+        "regime_apropriacao", "motivo_baixa_contrato",
+        "data_implantacao", "data_liquidacao", "data_ultima_atualizacao",
+        "parcelas", "saldos", "marcacoes", "alteracoes_produto", "datas_taxa", "datas_valor", "eventos",
+        "quantidade_eventos",
+    )
+
+    cod_contrato: str
+    sigla: str
+    data_processamento: str
+    cprodlin: str
+    regime_apropriacao: Optional[str]
+    motivo_baixa_contrato: Optional[str]
+    data_implantacao: Optional[str]
+    data_liquidacao: Optional[str]
+    data_ultima_atualizacao: Optional[str]
+    parcelas: Optional[List[Parcela]]
+    saldos: Optional[List[SaldoDevedor]]
+    marcacoes: List[HistoricoMarcacao]
+    alteracoes_produto: Optional[List[HistoricoAlteracaoProduto]]
+    datas_taxa: List[str]
+    datas_valor: List[str]
+    eventos: Optional[List[Evento]]
+    quantidade_eventos: int
+
+
+def como_lista(historicos: Union[List[Dict], Dict, None]) -> List[Dict]:
+    """
+    Históricos podem vir como lista ou, com um único registro, como objeto; sempre retorna lista.
+    """
+    if historicos is None:
+        return []
+    if isinstance(historicos, dict):
+        return [historicos]
+    return historicos
+
+
+def normalizar_contrato(dados: Dict, valores: bool = True) -> Contrato:
+    """
+    Monta o Contrato numa única passada pelo dicionário do JSON.
+
+    Aceita os dois formatos de entrada: o de lambda_csv2 (parcelas com "numero_parcela"
+    e saldos em "valor") e o de lambda_csv3 (parcelas com "num_parcela" e saldos em
+    "dados_historicos_saldo_devedor").
+
+    Com `valores=False`, os históricos que só interessam pelos valores (parcelas, saldos,
+    alterações de produto e eventos) não são percorridos e ficam None; dos eventos só se
+    conta a quantidade. É o que basta para lambda_csv3.
+    """
+    contrato = Contrato()
+    contrato.cod_contrato = dados["cod_contrato"]
+    contrato.sigla = dados["sigla"]
+    contrato.data_processamento = dados.get("data_hora-processamento_dados", "")[:10]
+    contrato.cprodlin = dados.get("dados_do_produto", {}).get("cprodlin", "")
+
+    operacao = dados.get("dados_da_operacao")
+    if operacao is None:
+        contrato.regime_apropriacao = contrato.motivo_baixa_contrato = None
+        contrato.data_implantacao = contrato.data_liquidacao = contrato.data_ultima_atualizacao = None
+    else:
+        contrato.regime_apropriacao = operacao.get("regime_apropriacao", "")
+        contrato.motivo_baixa_contrato = operacao.get("motivo_baixa_contrato", "")
+        contrato.data_implantacao = operacao.get("data_implantacao", "")
+        contrato.data_liquidacao = operacao.get("data_liquidacao", "")
+        contrato.data_ultima_atualizacao = operacao.get("data_ulitma_atualizacao", "")
+
+    contrato.marcacoes = [
+        HistoricoMarcacao(h.get("marcacao", ""), h.get("data_referencia", ""), h.get("hist_atual") == "true")
+        for h in como_lista(dados.get("dados_historicos_marcacao_contrato"))
+    ]
+    contrato.datas_taxa = [t.get("data_referencia", "") for t in como_lista(dados.get("dados_historicos_taxa"))]
+    contrato.datas_valor = [v.get("data_referencia", "") for v in como_lista(dados.get("dados_historicos_valor"))]
+
+    if not valores:
+        contrato.parcelas = contrato.saldos = contrato.alteracoes_produto = contrato.eventos = None
+        contrato.quantidade_eventos = len(dados.get("pagamentos_realizados", ())) + len(dados.get("amortizacoes", ()))
+        return contrato
+
+    contrato.parcelas = [
+        Parcela(p["numero_parcela"] if "numero_parcela" in p else p["num_parcela"], p.get("valor|", ""))
+        for p in dados.get("parcelas", [])
+    ]
+
+    if "dados_historicos_saldo_devedor" in dados:
+        contrato.saldos = [
+            SaldoDevedor(s["valor_saldo_devedor"], s.get("data_referencia", ""))
+            for s in como_lista(dados["dados_historicos_saldo_devedor"])
+        ]
+    else:
+        contrato.saldos = [
+            SaldoDevedor(s["saldo"], s.get("data_processamento", ""))
+            for s in dados.get("valor", [])
+        ]
+
+    contrato.alteracoes_produto = [
+        HistoricoAlteracaoProduto(h.get("cprodlin", ""), h.get("data_referencia", ""), h.get("hist_atual") == "true")
+        for h in como_lista(dados.get("dados_historicos_alteracao_produto"))
+    ]
+
+    contrato.eventos = [
+        Evento(PAGAMENTO, p["data_pagamento"], p["valor_pago"])
+        for p in dados.get("pagamentos_realizados", [])
+    ] + [
+        Evento(AMORTIZACAO, a["data_amortizacao"], a["valor_amortizado"])
+        for a in dados.get("amortizacoes", [])
+    ]
+    contrato.quantidade_eventos = len(contrato.eventos)
+
+    return contrato
+
+
+class Agregados:
+    """
+    Resumo dos históricos de um contrato, extraído numa única passada por `extrair_agregados`.
+    """
+    __slots__ = ("maior_parcela", "maior_saldo", "valor_maior_saldo", "marcacao_atual", "alteracao_produto_atual")
+
+    def __init__(self, maior_parcela: Optional[Parcela], maior_saldo: Optional[SaldoDevedor],
+                 valor_maior_saldo: Optional[Decimal], marcacao_atual: Optional[HistoricoMarcacao],
+                 alteracao_produto_atual: Optional[HistoricoAlteracaoProduto]):
+        self.maior_parcela = maior_parcela
+        self.maior_saldo = maior_saldo
+        self.valor_maior_saldo = valor_maior_saldo
+        self.marcacao_atual = marcacao_atual
+        self.alteracao_produto_atual = alteracao_produto_atual
+
+
+def extrair_agregados(contrato: Contrato, saldos: bool = True) -> Agregados:
+    """
+    Percorre cada histórico uma única vez e retorna a maior parcela, o maior saldo (com sua
+    data), a marcação atual e a alteração de produto atual. Cada número é convertido uma
+    só vez; saldos são comparados como Decimal, sem arredondamento de float.
+    Em empates vale o primeiro registro, como em max(). Históricos vazios resultam em None.
+    Saldos que não são números levantam ValueError.
+    Com `saldos=False` o histórico de saldos não é percorrido (quando vem do estágio numérico).
+    """
+    maior_parcela = None
+    maior_numero = 0
+    for parcela in contrato.parcelas:
+        numero = int(parcela.numero)
+        if maior_parcela is None or numero > maior_numero:
+            maior_parcela, maior_numero = parcela, numero
+
+    maior_saldo = None
+    maior_valor = None
+    for saldo in contrato.saldos if saldos else ():
+        try:
+            valor = Decimal(saldo.valor)
+            if maior_saldo is None or valor > maior_valor:
+                maior_saldo, maior_valor = saldo, valor
+        except InvalidOperation:
+            # Texto que não é número, ou NaN (que não se compara)
+            raise ValueError(f"Contrato {contrato.cod_contrato}: saldo devedor não numérico {saldo.valor!r}")
+
+    marcacao_atual = next((h for h in contrato.marcacoes if h.hist_atual), None)
+    alteracao_atual = next((h for h in contrato.alteracoes_produto if h.hist_atual), None)
+
+    return Agregados(maior_parcela, maior_saldo, maior_valor, marcacao_atual, alteracao_atual)
@@ -0,0 +1,227 @@
+import re
+from decimal import Decimal
+from typing import List, Optional, Sequence
+
+from modelo import AMORTIZACAO, PAGAMENTO, Contrato
+
+# Quantidade de contratos processada de cada vez pelo estágio numérico. Em Python puro lotes grandes
+# não compensam: os contratos normalizados que ficam vivos juntos só aumentam o trabalho do coletor de lixo
+CONTRATOS_POR_LOTE = 16
+
+# Com NumPy cada operação tem um custo fixo por chamada, que só se paga com mais contratos por lote
+CONTRATOS_POR_LOTE_NUMPY = 256
+
+# Valores que viram centavos exatos: sinal opcional, dígitos ASCII e até duas casas decimais
+_VALOR = re.compile(r"([+-]?)(\d*)(?:\.(\d{0,2}))?", re.ASCII)
+
+_DIGITOS = "0123456789"
+
+# Dígitos da parte inteira que cabem em centavos int64 com folga para as somas
+_DIGITOS_INT64 = 14
+
+_numpy = None
+_numpy_verificado = False
+
+
+def _importar_numpy():
+    """
+    Importa o NumPy na primeira utilização; sem ele, usa a implementação em Python puro.
+    """
+    global _numpy, _numpy_verificado
+    if not _numpy_verificado:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy, _numpy_verificado = numpy, True
+    return _numpy
+
+
+def contratos_por_lote() -> int:
+    """
+    Tamanho de lote indicado para o estágio numérico, conforme o NumPy esteja disponível.
+    """
+    return CONTRATOS_POR_LOTE if _importar_numpy() is None else CONTRATOS_POR_LOTE_NUMPY
+
+
+def centavos(valor: str) -> int:
+    """
+    Converte um valor monetário em texto ("5674.48", "100", "-0.5") para centavos inteiros, sem float.
+    Valores com mais de duas casas decimais ou fora desse formato levantam ValueError.
+    """
+    m = _VALOR.fullmatch(valor)
+    if m is None or not (m.group(2) or m.group(3)):
+        raise ValueError(f"Valor fora do formato com até duas casas decimais: {valor!r}")
+    sinal, inteiro, fracao = m.groups()
+    resultado = int(inteiro or "0") * 100 + int((fracao or "").ljust(2, "0"))
+    return -resultado if sinal == "-" else resultado
+
+
+class ResumoLote:
+    """
+    Resultado do estágio numérico para um lote de contratos, um item por contrato, na ordem do lote.
+    O índice do maior saldo é a posição em `contrato.saldos` (-1 sem saldos); valores e totais
+    estão em centavos. Um item é None quando algum dos valores dele não tem formato de centavos:
+    o maior saldo desse contrato segue pela comparação com Decimal (modelo.extrair_agregados).
+    """
+    __slots__ = ("indice_maior_saldo", "maior_saldo", "total_pagamentos", "total_amortizacoes")
+
+    def __init__(self, indice_maior_saldo: List[Optional[int]], maior_saldo: List[Optional[int]],
+                 total_pagamentos: List[Optional[int]], total_amortizacoes: List[Optional[int]]):
+        self.indice_maior_saldo = indice_maior_saldo
+        self.maior_saldo = maior_saldo
+        self.total_pagamentos = total_pagamentos
+        self.total_amortizacoes = total_amortizacoes
+
+
+def _colunas(contratos: Sequence[Contrato]):
+    """
+    Achata os valores monetários do lote em colunas, com a quantidade de itens por contrato.
+    """
+    saldos, pagamentos, amortizacoes = [], [], []
+    qtd_saldos, qtd_pagamentos, qtd_amortizacoes = [], [], []
+    for contrato in contratos:
+        saldos.extend(s.valor for s in contrato.saldos)
+        qtd_saldos.append(len(contrato.saldos))
+        pagos = [e.valor for e in contrato.eventos if e.tipo == PAGAMENTO]
+        amortizados = [e.valor for e in contrato.eventos if e.tipo == AMORTIZACAO]
+        pagamentos.extend(pagos)
+        amortizacoes.extend(amortizados)
+        qtd_pagamentos.append(len(pagos))
+        qtd_amortizacoes.append(len(amortizados))
+    return saldos, qtd_saldos, pagamentos, qtd_pagamentos, amortizacoes, qtd_amortizacoes
+
+
+def _centavos_numpy(np, valores: List[str]):
+    """
+    Converte uma coluna de textos para centavos int64 em operações vetorizadas. Retorna os
+    centavos (0 nos inválidos) e a máscara dos valores fora do formato aceito por `centavos`.
+    """
+    if not valores:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool)
+    textos = np.array(valores, dtype=str)
+    corpo = np.char.lstrip(textos, "+-")
+    inteiro, _, fracao = np.char.partition(corpo, ".").T
+    if len(inteiro) and np.char.str_len(inteiro).max() > _DIGITOS_INT64:
+        raise OverflowError("Valor grande demais para centavos em int64")
+    # strip com os dígitos ASCII deixa vazio só o que é feito deles (isdigit aceitaria outros alfabetos)
+    invalido = ((np.char.str_len(textos) - np.char.str_len(corpo) > 1)
+                | (np.char.strip(inteiro, _DIGITOS) != "") | (np.char.strip(fracao, _DIGITOS) != "")
+                | (np.char.str_len(fracao) > 2) | ((inteiro == "") & (fracao == "")))
+    inteiro = np.where(invalido | (inteiro == ""), "0", inteiro).astype(np.int64)
+    fracao = np.char.ljust(np.where(invalido, "", fracao), 2, "0").astype(np.int64)
+    resultado = inteiro * 100 + fracao
+    return np.where(np.char.startswith(textos, "-"), -resultado, resultado), invalido
+
+
+def _por_contrato(np, valores, quantidades):
+    """
+    Soma de `valores` por contrato, com `quantidades` itens em cada um (contratos sem itens somam 0).
+    """
+    acumulado = np.concatenate(([0], np.cumsum(valores, dtype=np.int64)))
+    fins = np.cumsum(quantidades)
+    return acumulado[fins] - acumulado[fins - quantidades]
+
+
+def _totais_numpy(np, valores: List[str], quantidades: List[int]) -> List[Optional[int]]:
+    centavos_, invalido = _centavos_numpy(np, valores)
+    quantidades = np.array(quantidades, dtype=np.int64)
+    totais = _por_contrato(np, centavos_, quantidades).tolist()
+    invalidos = _por_contrato(np, invalido, quantidades).tolist()
+    return [None if n else total for total, n in zip(totais, invalidos)]
+
+
+def _resumir_numpy(np, contratos: Sequence[Contrato]) -> ResumoLote:
+    saldos, qtd_saldos, pagamentos, qtd_pagamentos, amortizacoes, qtd_amortizacoes = _colunas(contratos)
+
+    valores, invalido = _centavos_numpy(np, saldos)
+    quantidades = np.array(qtd_saldos, dtype=np.int64)
+    inicios = np.cumsum(quantidades) - quantidades
+    com_saldo = quantidades > 0
+
+    indices: List[Optional[int]] = [-1] * len(contratos)
+    maiores: List[Optional[int]] = [None] * len(contratos)
+    if com_saldo.any():
+        inicios_validos = inicios[com_saldo]
+        maximos = np.maximum.reduceat(valores, inicios_validos)
+        # Primeira ocorrência do máximo em cada contrato, como em max()
+        posicoes = np.arange(len(valores))
+        eh_maximo = valores == np.repeat(maximos, quantidades[com_saldo])
+        primeiros = np.minimum.reduceat(np.where(eh_maximo, posicoes, len(valores)), inicios_validos)
+        fora_do_formato = np.logical_or.reduceat(invalido, inicios_validos)
+        for posicao, indice, maximo, fora in zip(np.flatnonzero(com_saldo).tolist(),
+                                                 (primeiros - inicios_validos).tolist(), maximos.tolist(),
+                                                 fora_do_formato.tolist()):
+            indices[posicao], maiores[posicao] = (None, None) if fora else (indice, maximo)
+
+    return ResumoLote(indices, maiores, _totais_numpy(np, pagamentos, qtd_pagamentos),
+                      _totais_numpy(np, amortizacoes, qtd_amortizacoes))
+
+
+def _total_python(valores) -> Optional[int]:
+    try:
+        return sum(centavos(valor) for valor in valores)
+    except ValueError:
+        return None
+
+
+def _resumir_python(contratos: Sequence[Contrato]) -> ResumoLote:
+    indices: List[Optional[int]] = []
+    maiores: List[Optional[int]] = []
+    pagos: List[Optional[int]] = []
+    amortizados: List[Optional[int]] = []
+    for contrato in contratos:
+        indice, maior = -1, None
+        try:
+            for posicao, saldo in enumerate(contrato.saldos):
+                valor = centavos(saldo.valor)
+                if maior is None or valor > maior:
+                    indice, maior = posicao, valor
+        except ValueError:
+            indice = maior = None
+        indices.append(indice)
+        maiores.append(maior)
+        pagos.append(_total_python(e.valor for e in contrato.eventos if e.tipo == PAGAMENTO))
+        amortizados.append(_total_python(e.valor for e in contrato.eventos if e.tipo == AMORTIZACAO))
+    return ResumoLote(indices, maiores, pagos, amortizados)
+
+
+def resumir_lote(contratos: Sequence[Contrato]) -> ResumoLote:
+    """
+    Converte os valores monetários do lote em centavos inteiros (exatos) e calcula, por contrato,
+    o índice e o valor do maior saldo (em empates, o primeiro, como em max()) e os totais de
+    pagamentos e amortizações. Com NumPy as operações são feitas sobre colunas inteiras; sem ele,
+    em Python puro, com o mesmo resultado.
+    """
+    np = _importar_numpy()
+    if np is not None:
+        try:
+            return _resumir_numpy(np, contratos)
+        except OverflowError:
+            pass
+    return _resumir_python(contratos)
+
+
+def formatar_centavos(valores: Sequence[Optional[int]]) -> List[str]:
+    """
+    Formata centavos como texto com duas casas (567448 -> "5674.48"), em bloco; None vira "".
+    """
+    np = _importar_numpy()
+    if np is None or not len(valores):
+        return ["" if v is None else f"{'-' if v < 0 else ''}{abs(v) // 100}.{abs(v) % 100:02d}" for v in valores]
+
+    ausente = np.array([v is None for v in valores])
+    numeros = np.array([0 if v is None else v for v in valores], dtype=np.int64)
+    absolutos = np.abs(numeros)
+    textos = np.char.add(
+        np.char.add(np.where(numeros < 0, "-", ""), (absolutos // 100).astype(str)),
+        np.char.add(".", np.char.zfill((absolutos % 100).astype(str), 2)),
+    )
+    return np.where(ausente, "", textos).tolist()
+
+
+def decimal_de_centavos(valor: int) -> Decimal:
+    """
+    Valor em centavos como Decimal com duas casas (567448 -> Decimal("5674.48")).
+    """
+    return Decimal(valor).scaleb(-2)
@@ -0,0 +1,169 @@
+import importlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from compressao import codec_do_caminho, compactar, extensao
+from saida_csv import TAMANHO_BUFFER, TAMANHO_LOTE, Destino, EscritorLotes
+
+# Quantidade de contratos enviada a um processo de cada vez
+CONTRATOS_POR_FATIA = 1000
+
+# Fatias enviadas a um processo antes de esperar a confirmação da mais antiga
+FATIAS_EM_ANDAMENTO = 2
+
+
+def processos_disponiveis() -> int:
+    """
+    Retorna a quantidade de CPUs que este processo pode usar.
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _nome_parte(diretorio: Path, indice: int, codec: Optional[str] = None) -> Path:
+    return diretorio / f"parte-{indice:06d}.csv{extensao(codec)}"
+
+
+def _trabalhador(layout: str, diretorio: str, codec: Optional[str], tamanho_lote: int,
+                 limite_linhas: Optional[int], conexao) -> None:
+    """
+    Recebe fatias de contratos e grava cada uma em seu próprio arquivo de parte, sem cabeçalho,
+    já compactada quando o arquivo final é .gz/.zst. Com `limite_linhas`, deixa de fora e conta
+    os contratos que gerariam mais linhas que o limite.
+    """
+    modulo = importlib.import_module(layout)
+    gerar_linhas = modulo.gerar_linhas
+    while True:
+        try:
+            tarefa = conexao.recv()
+        except EOFError:
+            break
+        if tarefa is None:
+            break
+
+        indice, contratos = tarefa
+        try:
+            rejeitados = 0
+            with EscritorLotes(_nome_parte(Path(diretorio), indice, codec), tamanho_lote=tamanho_lote) as escritor:
+                for contrato in contratos:
+                    if limite_linhas is not None and modulo.estimar_linhas(contrato) > limite_linhas:
+                        rejeitados += 1
+                        continue
+                    escritor.escrever_varias(gerar_linhas(contrato))
+            conexao.send(("ok", {**escritor.estatisticas(), "contratos_acima_do_limite": rejeitados}))
+        except Exception as e:
+            conexao.send(("erro", f"{type(e).__name__}: {e}"))
+    conexao.close()
+
+
+def escrever_csv_paralelo(nome_arquivo: Destino, contratos: Iterable[Dict], layout: str = "lambda_csv3",
+                          processos: Optional[int] = None,
+                          contratos_por_fatia: int = CONTRATOS_POR_FATIA, tamanho_lote: int = TAMANHO_LOTE,
+                          limite_linhas: Optional[int] = None) -> Dict[str, int]:
+    """
+    Divide os contratos em fatias entre vários processos. Cada processo grava suas fatias em
+    arquivos de parte, que ao final são concatenados na ordem original sob um único cabeçalho.
+
+    O layout é o nome do módulo que fornece `CABECALHO` e `gerar_linhas` (lambda_csv2 ou lambda_csv3).
+    Usa multiprocessing.Process com Pipe, que funciona no Lambda (Pool e Queue dependem de /dev/shm).
+
+    Para arquivos .gz/.zst, cada parte é compactada pelo seu processo e as partes são concatenadas
+    sem recompressão (membros gzip e quadros zstd em sequência formam um arquivo válido).
+
+    `tamanho_lote` e `limite_linhas` têm o mesmo efeito que em `escrever_csv`; o limite só vale
+    para layouts com `estimar_linhas` (lambda_csv3).
+    """
+    modulo = importlib.import_module(layout)
+    processos = processos or processos_disponiveis()
+    opcoes = {"tamanho_lote": tamanho_lote}
+    if limite_linhas is not None:
+        if not hasattr(modulo, "estimar_linhas"):
+            raise ValueError(f"O layout {layout} não aceita limite_linhas")
+        opcoes["limite_linhas"] = limite_linhas
+
+    if processos == 1:
+        return modulo.escrever_csv(nome_arquivo, contratos, **opcoes)
+
+    # As partes ficam ao lado do arquivo final; para fluxos, no diretório temporário padrão
+    em_arquivo = isinstance(nome_arquivo, (str, Path))
+    diretorio_partes = Path(nome_arquivo).parent if em_arquivo else None
+    codec = codec_do_caminho(nome_arquivo) if em_arquivo else None
+
+    estatisticas = {"linhas_escritas": 0, "bytes_escritos": 0, "descargas": 0}
+    if limite_linhas is not None:
+        estatisticas["contratos_acima_do_limite"] = 0
+
+    def acumular(resposta) -> None:
+        situacao, dados = resposta
+        if situacao != "ok":
+            raise RuntimeError(f"Falha ao processar fatia de contratos: {dados}")
+        for chave in estatisticas:
+            estatisticas[chave] += dados[chave]
+
+    with tempfile.TemporaryDirectory(prefix="partes-", dir=diretorio_partes) as diretorio:
+        conexoes = []
+        trabalhadores = []
+        for _ in range(processos):
+            pai, filho = multiprocessing.Pipe()
+            trabalhador = multiprocessing.Process(
+                target=_trabalhador, args=(layout, diretorio, codec, tamanho_lote, limite_linhas, filho), daemon=True,
+            )
+            trabalhador.start()
+            filho.close()
+            conexoes.append(pai)
+            trabalhadores.append(trabalhador)
+
+        pendentes = [0] * processos
+        total_fatias = 0
+        try:
+            contratos = iter(contratos)
+            while True:
+                fatia = list(islice(contratos, contratos_por_fatia))
+                if not fatia:
+                    break
+
+                # Distribuição circular: a fatia i sempre vai para o processo i % processos
+                destino = total_fatias % processos
+                if pendentes[destino] >= FATIAS_EM_ANDAMENTO:
+                    acumular(conexoes[destino].recv())
+                    pendentes[destino] -= 1
+                conexoes[destino].send((total_fatias, fatia))
+                pendentes[destino] += 1
+                total_fatias += 1
+
+            for conexao, quantidade in zip(conexoes, pendentes):
+                for _ in range(quantidade):
+                    acumular(conexao.recv())
+                conexao.send(None)
+        finally:
+            for conexao in conexoes:
+                conexao.close()
+            for trabalhador in trabalhadores:
+                trabalhador.join(timeout=5)
+                if trabalhador.is_alive():
+                    trabalhador.terminate()
+
+        # Concatena as partes na ordem das fatias, sob um único cabeçalho
+        saida = open(nome_arquivo, "wb", buffering=TAMANHO_BUFFER) if em_arquivo else nome_arquivo
+        try:
+            destino_cabecalho = compactar(saida, codec) if codec else saida
+            cabecalho = EscritorLotes(destino_cabecalho, modulo.CABECALHO)
+            cabecalho.fechar()
+            if codec:
+                destino_cabecalho.close()
+            estatisticas["bytes_escritos"] += cabecalho.bytes_escritos
+            for indice in range(total_fatias):
+                with _nome_parte(Path(diretorio), indice, codec).open("rb") as parte:
+                    shutil.copyfileobj(parte, saida, TAMANHO_BUFFER)
+        finally:
+            if em_arquivo:
+                saida.close()
+
+    return estatisticas
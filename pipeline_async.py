@@ -0,0 +1,362 @@
+"""
+Pipeline assíncrono: leitura, transformação e escrita em etapas simultâneas, ligadas por
+filas limitadas. Enquanto um bloco da entrada é baixado, os contratos anteriores são
+convertidos e o CSV já gerado é enviado; a fila cheia faz a etapa anterior esperar,
+então a memória fica limitada pelo tamanho das filas.
+
+    leitura (async) --[blocos JSON]--> transformação (executor) --[blocos CSV]--> escrita (async)
+
+A transformação é o próprio `escrever_csv` do layout, rodando numa thread do executor sobre
+um fluxo que lê da fila de entrada e grava na fila de saída.
+
+Uso (demonstração com latência simulada): python pipeline_async.py [--contratos 20000] [--latencia-ms 20]
+"""
+import argparse
+import asyncio
+import importlib
+import io
+import threading
+import time
+from concurrent.futures import Executor, Future, TimeoutError as TempoEsgotado
+from typing import Dict, Optional, Protocol, Set
+
+from leitor_contratos import TAMANHO_BLOCO, ler_contratos
+
+# Blocos aguardando em cada fila antes que a etapa anterior espere
+BLOCOS_EM_FILA = 4
+
+# Intervalo com que a thread de transformação confere se o pipeline foi cancelado
+_INTERVALO_CANCELAMENTO = 0.1
+
+
+class FonteAssincrona(Protocol):
+    async def read(self, tamanho: int) -> bytes: ...
+
+
+class DestinoAssincrono(Protocol):
+    async def write(self, dados: bytes) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+class PipelineCancelado(Exception):
+    """
+    Uma das etapas falhou e as demais foram interrompidas.
+    """
+
+
+class _Ponte:
+    """
+    Entrega e retira itens de uma fila asyncio a partir da thread de transformação,
+    desistindo quando o pipeline é cancelado.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, cancelado: threading.Event):
+        self._loop = loop
+        self._cancelado = cancelado
+        self._pendentes: Set[asyncio.Task] = set()
+
+    def _iniciar(self, futuro: Future, corrotina, args) -> None:
+        # Roda no loop: a operação vira uma tarefa conhecida, que `cancelar` consegue interromper
+        tarefa = self._loop.create_task(corrotina(*args))
+        self._pendentes.add(tarefa)
+
+        def concluir(tarefa: asyncio.Task) -> None:
+            self._pendentes.discard(tarefa)
+            if tarefa.cancelled():
+                futuro.cancel()
+            elif tarefa.exception() is not None:
+                futuro.set_exception(tarefa.exception())
+            else:
+                futuro.set_result(tarefa.result())
+
+        tarefa.add_done_callback(concluir)
+
+    def _esperar(self, corrotina, *args):
+        futuro: Future = Future()
+        self._loop.call_soon_threadsafe(self._iniciar, futuro, corrotina, args)
+        while True:
+            try:
+                return futuro.result(timeout=_INTERVALO_CANCELAMENTO)
+            except TempoEsgotado:
+                if self._cancelado.is_set():
+                    raise PipelineCancelado()
+
+    def get(self, fila: asyncio.Queue):
+        return self._esperar(fila.get)
+
+    def put(self, fila: asyncio.Queue, item) -> None:
+        self._esperar(fila.put, item)
+
+    def cancelar(self) -> None:
+        """
+        Cancela as operações de fila que ficaram pendentes (chamado no loop, depois que a thread saiu).
+        """
+        for tarefa in list(self._pendentes):
+            tarefa.cancel()
+
+
+class _EntradaDaFila(io.RawIOBase):
+    """
+    Fluxo de leitura, usado na thread de transformação, que consome os blocos da fila de entrada.
+    """
+
+    def __init__(self, ponte: _Ponte, fila: asyncio.Queue):
+        self._ponte = ponte
+        self._fila = fila
+        self._pendente = b""
+        self._fim = False
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, tamanho: int = -1) -> bytes:
+        if not self._pendente and not self._fim:
+            bloco = self._ponte.get(self._fila)
+            if bloco is None:
+                self._fim = True
+            else:
+                self._pendente = bloco
+        if tamanho < 0 or tamanho >= len(self._pendente):
+            dados, self._pendente = self._pendente, b""
+        else:
+            dados, self._pendente = self._pendente[:tamanho], self._pendente[tamanho:]
+        return dados
+
+
+class _SaidaParaFila(io.RawIOBase):
+    """
+    Fluxo de escrita, usado na thread de transformação, que junta as gravações em blocos
+    de `tamanho_bloco` e entrega cada bloco à fila de saída.
+    """
+
+    def __init__(self, ponte: _Ponte, fila: asyncio.Queue, tamanho_bloco: int):
+        self._ponte = ponte
+        self._fila = fila
+        self._tamanho_bloco = tamanho_bloco
+        self._bloco = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, dados) -> int:
+        self._bloco += dados
+        if len(self._bloco) >= self._tamanho_bloco:
+            self.flush()
+        return len(dados)
+
+    def flush(self) -> None:
+        if self._bloco:
+            self._ponte.put(self._fila, bytes(self._bloco))
+            self._bloco.clear()
+
+
+async def _ler(fonte: FonteAssincrona, fila: asyncio.Queue, tamanho_bloco: int, estatisticas: Dict) -> None:
+    while True:
+        bloco = await fonte.read(tamanho_bloco)
+        if not bloco:
+            break
+        estatisticas["bytes_lidos"] += len(bloco)
+        estatisticas["blocos_lidos"] += 1
+        await fila.put(bloco)
+    await fila.put(None)
+
+
+async def _escrever(destino: DestinoAssincrono, fila: asyncio.Queue, estatisticas: Dict) -> None:
+    while True:
+        bloco = await fila.get()
+        if bloco is None:
+            break
+        estatisticas["blocos_enviados"] += 1
+        await destino.write(bloco)
+    await destino.close()
+
+
+def _transformar(layout: str, ponte: _Ponte, entrada: asyncio.Queue, saida: asyncio.Queue,
+                 tamanho_bloco: int, compressao: Optional[str]) -> Dict[str, int]:
+    modulo = importlib.import_module(layout)
+    destino = _SaidaParaFila(ponte, saida, tamanho_bloco)
+    estatisticas = modulo.escrever_csv(destino, ler_contratos(_EntradaDaFila(ponte, entrada), compressao=compressao))
+    destino.flush()
+    ponte.put(saida, None)
+    return estatisticas
+
+
+async def converter(fonte: FonteAssincrona, destino: DestinoAssincrono, layout: str = "lambda_csv3",
+                    tamanho_bloco: int = TAMANHO_BLOCO, blocos_em_fila: int = BLOCOS_EM_FILA,
+                    executor: Optional[Executor] = None, compressao: Optional[str] = None) -> Dict[str, int]:
+    """
+    Converte o JSON lido de `fonte` em CSV gravado em `destino`, com as três etapas simultâneas.
+    Entrada e saída circulam em blocos de `tamanho_bloco` bytes.
+    Dados depois da lista de contratos não são lidos: a leitura para quando a conversão termina.
+    Se uma etapa falha, as outras são interrompidas e o erro original é propagado; o destino
+    não é fechado nesse caso (para uploads, cabe a quem chamou abortar).
+    Retorna as estatísticas do escrever_csv mais bytes e blocos lidos e blocos enviados.
+    """
+    loop = asyncio.get_running_loop()
+    entrada: asyncio.Queue = asyncio.Queue(blocos_em_fila)
+    saida: asyncio.Queue = asyncio.Queue(blocos_em_fila)
+    cancelado = threading.Event()
+    ponte = _Ponte(loop, cancelado)
+    estatisticas = {"bytes_lidos": 0, "blocos_lidos": 0, "blocos_enviados": 0}
+
+    tarefas = [
+        asyncio.ensure_future(_ler(fonte, entrada, tamanho_bloco, estatisticas)),
+        loop.run_in_executor(executor, _transformar, layout, ponte, entrada, saida,
+                             tamanho_bloco, compressao),
+        asyncio.ensure_future(_escrever(destino, saida, estatisticas)),
+    ]
+    leitura, transformacao, escrita = tarefas
+    pendentes = set(tarefas)
+    try:
+        while pendentes:
+            concluidas, pendentes = await asyncio.wait(pendentes, return_when=asyncio.FIRST_COMPLETED)
+            for tarefa in concluidas:
+                tarefa.result()
+            if transformacao in concluidas and leitura in pendentes:
+                # O layout parou de ler no fim da lista de contratos: o restante da entrada não
+                # interessa, e ninguém mais consumiria a fila de entrada
+                leitura.cancel()
+                pendentes.discard(leitura)
+                await asyncio.gather(leitura, return_exceptions=True)
+    except BaseException:
+        cancelado.set()
+        leitura.cancel()
+        escrita.cancel()
+        # A thread não pode ser cancelada: ela sai sozinha na próxima operação de fila.
+        # Espera por ela antes de propagar o erro, para não deixar trabalho solto no executor.
+        await asyncio.gather(*tarefas, return_exceptions=True)
+        ponte.cancelar()
+        raise
+
+    return {**transformacao.result(), **estatisticas}
+
+
+class FonteLocal:
+    """
+    Fonte assíncrona sobre bytes ou um fluxo local, com latência opcional por leitura
+    (simula a rede nos testes e na demonstração).
+    """
+
+    def __init__(self, dados, latencia: float = 0.0):
+        self._fluxo = io.BytesIO(dados) if isinstance(dados, (bytes, bytearray)) else dados
+        self._latencia = latencia
+
+    async def read(self, tamanho: int) -> bytes:
+        if self._latencia:
+            await asyncio.sleep(self._latencia)
+        return self._fluxo.read(tamanho)
+
+
+class DestinoLocal:
+    """
+    Destino assíncrono em memória, com latência opcional por gravação.
+    """
+
+    def __init__(self, latencia: float = 0.0):
+        self.conteudo = io.BytesIO()
+        self.fechado = False
+        self._latencia = latencia
+
+    async def write(self, dados: bytes) -> None:
+        if self._latencia:
+            await asyncio.sleep(self._latencia)
+        self.conteudo.write(dados)
+
+    async def close(self) -> None:
+        self.fechado = True
+
+
+class FonteS3:
+    """
+    Fonte assíncrona sobre o corpo de um get_object (boto3 ou S3Local); cada leitura bloqueante
+    roda numa thread, sem travar o loop.
+    """
+
+    def __init__(self, corpo):
+        self._corpo = corpo
+
+    async def read(self, tamanho: int) -> bytes:
+        return await asyncio.to_thread(self._corpo.read, tamanho)
+
+
+class DestinoS3:
+    """
+    Destino assíncrono sobre um UploadMultipart; as partes são enviadas numa thread.
+    """
+
+    def __init__(self, upload):
+        self._upload = upload
+
+    async def write(self, dados: bytes) -> None:
+        await asyncio.to_thread(self._upload.write, dados)
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self._upload.close)
+
+
+async def processar_objeto_async(cliente, bucket: str, chave: str, bucket_saida: str, chave_saida: str,
+                                 layout: str = "lambda_csv3") -> Dict[str, int]:
+    """
+    Converte um objeto do S3 em outro, com download, conversão e upload simultâneos.
+    """
+    from compressao import codec_do_caminho
+    from upload_s3 import UploadMultipart
+
+    resposta = await asyncio.to_thread(cliente.get_object, Bucket=bucket, Key=chave)
+    corpo = resposta["Body"]
+    upload = UploadMultipart(cliente, bucket_saida, chave_saida)
+    try:
+        return await converter(FonteS3(corpo), DestinoS3(upload), layout, compressao=codec_do_caminho(chave))
+    except BaseException:
+        await asyncio.to_thread(upload.abortar)
+        raise
+    finally:
+        corpo.close()
+
+
+async def _demonstrar(documento: bytes, latencia: float, tamanho_bloco: int) -> None:
+    import lambda_csv3
+
+    # Em sequência: baixa tudo, converte tudo, envia tudo
+    inicio = time.perf_counter()
+    fonte = FonteLocal(documento, latencia)
+    blocos = []
+    while True:
+        bloco = await fonte.read(tamanho_bloco)
+        if not bloco:
+            break
+        blocos.append(bloco)
+    csv = io.BytesIO()
+    lambda_csv3.escrever_csv(csv, ler_contratos(b"".join(blocos)))
+    destino = DestinoLocal(latencia)
+    dados = csv.getvalue()
+    for posicao in range(0, len(dados), tamanho_bloco):
+        await destino.write(dados[posicao:posicao + tamanho_bloco])
+    sequencial = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    destino_pipeline = DestinoLocal(latencia)
+    estatisticas = await converter(FonteLocal(documento, latencia), destino_pipeline, tamanho_bloco=tamanho_bloco)
+    pipeline = time.perf_counter() - inicio
+
+    print(f"sequencial {sequencial:6.2f} s   pipeline {pipeline:6.2f} s   ({sequencial / pipeline:.2f}x)")
+    print(f"saída idêntica: {'sim' if destino_pipeline.conteudo.getvalue() == dados else 'NÃO'}  {estatisticas}")
+
+
+def main():
+    from gerador_contratos import ConfiguracaoGerador, escrever_json
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contratos", type=int, default=20000)
+    parser.add_argument("--latencia-ms", type=float, default=20.0, help="latência de cada leitura e gravação")
+    parser.add_argument("--tamanho-bloco", type=int, default=256 * 1024)
+    args = parser.parse_args()
+
+    documento = io.BytesIO()
+    escrever_json(documento, ConfiguracaoGerador(contratos=args.contratos))
+    asyncio.run(_demonstrar(documento.getvalue(), args.latencia_ms / 1000, args.tamanho_bloco))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""
+Conversão retomável: a saída é gravada em partes e, a cada parte concluída, um ponto de
+controle registra o offset da entrada logo após o último contrato gravado. Uma execução
+interrompida (por exemplo, pelo limite de tempo da Lambda) é retomada do último ponto de
+controle, sem reprocessar os contratos das partes já concluídas.
+
+Cada parte só aparece com o nome final quando está completa: no disco é gravada com um nome
+temporário e renomeada com os.replace; no S3 o objeto só existe quando o upload termina.
+
+Uso: python retomada.py entrada.json diretorio_saida [--layout lambda_csv3]
+                        [--contratos-por-parte 50000] [--segundos 840] [--compressao gzip]
+"""
+import argparse
+import importlib
+import io
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, ContextManager, Dict, Iterator, Optional, Protocol, Sequence, Tuple, Union
+
+import backend_json
+from compressao import THREADS_ZSTD, abrir_entrada, codec_do_caminho, compactar, descompactar, extensao
+from leitor_contratos import CAMINHO_CONTRATOS, LeitorContratos, posicionar
+from upload_s3 import UploadMultipart
+from validacao import Quarentena
+
+# Contratos por parte; cada parte concluída é um ponto de controle
+CONTRATOS_POR_PARTE = 50000
+
+# Arquivo do ponto de controle, junto das partes
+ARQUIVO_ESTADO = "_estado.json"
+
+# Prefixo das partes ainda em gravação no disco
+PREFIXO_TEMPORARIO = "_gravando."
+
+VERSAO_ESTADO = 1
+
+
+class ConversaoIncompleta(RuntimeError):
+    """
+    O prazo acabou antes do fim da entrada; a próxima execução continua do último ponto de controle.
+    """
+
+
+class FonteRetomavel(Protocol):
+    identificacao: str  # muda quando o conteúdo da entrada muda
+
+    def abrir(self, inicio: int) -> BinaryIO: ...
+
+
+class Armazenamento(Protocol):
+    def ler_estado(self) -> Optional[Dict]: ...
+
+    def gravar_estado(self, estado: Dict) -> None: ...
+
+    def parte(self, nome: str) -> ContextManager[BinaryIO]: ...
+
+
+class FonteArquivo:
+    """
+    Arquivo local, compactado ou não. Nos compactados, retomar descompacta e descarta o trecho
+    já convertido (sem gerar linhas para ele).
+    """
+
+    def __init__(self, caminho: Union[str, Path], compressao: Optional[str] = None):
+        self.caminho = Path(caminho)
+        self.compressao = compressao or codec_do_caminho(caminho)
+        estado = self.caminho.stat()
+        self.identificacao = f"{self.caminho.resolve()}:{estado.st_size}:{estado.st_mtime_ns}"
+
+    def abrir(self, inicio: int) -> BinaryIO:
+        fluxo = abrir_entrada(self.caminho, self.compressao)
+        posicionar(fluxo, inicio)
+        return fluxo
+
+
+class FonteS3:
+    """
+    Objeto do S3. Sem compressão, a leitura retomada pede ao S3 só os bytes a partir do offset.
+    """
+
+    def __init__(self, cliente, bucket: str, chave: str, compressao: Optional[str] = None):
+        self._cliente = cliente
+        self.bucket = bucket
+        self.chave = chave
+        self.compressao = compressao or codec_do_caminho(chave)
+        self.identificacao = f"s3://{bucket}/{chave}:{cliente.head_object(Bucket=bucket, Key=chave)['ETag']}"
+
+    def abrir(self, inicio: int) -> BinaryIO:
+        if self.compressao is None and inicio:
+            return self._cliente.get_object(Bucket=self.bucket, Key=self.chave, Range=f"bytes={inicio}-")["Body"]
+
+        fluxo = self._cliente.get_object(Bucket=self.bucket, Key=self.chave)["Body"]
+        if self.compressao is not None:
+            fluxo = descompactar(fluxo, self.compressao, fechar_fonte=True)
+        posicionar(fluxo, inicio)
+        return fluxo
+
+
+class ArmazenamentoLocal:
+    """
+    Partes e ponto de controle num diretório. Partes que ficaram pela metade numa execução
+    interrompida são apagadas ao abrir o diretório.
+    """
+
+    def __init__(self, diretorio: Union[str, Path]):
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        for temporario in self.diretorio.glob(PREFIXO_TEMPORARIO + "*"):
+            temporario.unlink()
+
+    def ler_estado(self) -> Optional[Dict]:
+        caminho = self.diretorio / ARQUIVO_ESTADO
+        if not caminho.exists():
+            return None
+        return json.loads(caminho.read_bytes())
+
+    def gravar_estado(self, estado: Dict) -> None:
+        with self.parte(ARQUIVO_ESTADO) as arquivo:
+            arquivo.write(json.dumps(estado, ensure_ascii=False, indent=2).encode("utf-8"))
+
+    @contextmanager
+    def parte(self, nome: str) -> Iterator[BinaryIO]:
+        """
+        Arquivo que só recebe o nome final, já gravado em disco, se o bloco terminar sem erro.
+        """
+        temporario = self.diretorio / (PREFIXO_TEMPORARIO + nome)
+        arquivo = open(temporario, "wb")
+        try:
+            yield arquivo
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        except BaseException:
+            arquivo.close()
+            temporario.unlink(missing_ok=True)
+            raise
+        arquivo.close()
+        os.replace(temporario, self.diretorio / nome)
+
+
+class ArmazenamentoS3:
+    """
+    Partes e ponto de controle sob um prefixo do S3. Uploads interrompidos nunca viram objeto;
+    as partes enviadas por eles ficam até a regra de ciclo de vida do bucket abortá-los.
+    """
+
+    def __init__(self, cliente, bucket: str, prefixo: str):
+        self._cliente = cliente
+        self.bucket = bucket
+        self.prefixo = prefixo.rstrip("/") + "/"
+
+    def ler_estado(self) -> Optional[Dict]:
+        try:
+            corpo = self._cliente.get_object(Bucket=self.bucket, Key=self.prefixo + ARQUIVO_ESTADO)["Body"]
+        except self._cliente.exceptions.NoSuchKey:
+            return None
+        try:
+            return json.loads(corpo.read())
+        finally:
+            corpo.close()
+
+    def gravar_estado(self, estado: Dict) -> None:
+        self._cliente.put_object(Bucket=self.bucket, Key=self.prefixo + ARQUIVO_ESTADO,
+                                 Body=json.dumps(estado, ensure_ascii=False, indent=2).encode("utf-8"))
+
+    @contextmanager
+    def parte(self, nome: str) -> Iterator[BinaryIO]:
+        with UploadMultipart(self._cliente, self.bucket, self.prefixo + nome) as destino:
+            yield destino
+
+
+class _Lote:
+    """
+    Contratos de uma parte: a partir do fragmento já lido, até `limite` contratos ou até o
+    prazo (depois de pelo menos um). Ao final, `proximo` é o primeiro fragmento da parte seguinte.
+    """
+
+    def __init__(self, fragmentos: Iterator[Tuple[int, int, bytes]], primeiro: Tuple[int, int, bytes],
+                 limite: int, prazo: Optional[float]):
+        self._fragmentos = fragmentos
+        self._limite = limite
+        self._prazo = prazo
+        self.proximo: Optional[Tuple[int, int, bytes]] = primeiro
+        self.contratos = 0
+        self.fim = 0
+
+    def __iter__(self) -> Iterator[Dict]:
+        while self.proximo is not None and self.contratos < self._limite:
+            if self.contratos and self._prazo is not None and time.monotonic() >= self._prazo:
+                return
+            inicio, fim, bruto = self.proximo
+            try:
+                contrato = backend_json.loads(bruto)
+            except ValueError as e:
+                raise ValueError(f"Erro ao carregar JSON na posição {inicio}: {e}")
+            self.proximo = next(self._fragmentos, None)
+            self.contratos += 1
+            self.fim = fim
+            yield contrato
+
+
+def _estado_inicial(fonte: FonteRetomavel, layout: str) -> Dict:
+    return {
+        "versao": VERSAO_ESTADO,
+        "fonte": fonte.identificacao,
+        "layout": layout,
+        "posicao": 0,  # offset da entrada (descompactada) logo após o último contrato gravado
+        "contratos": 0,
+        "partes": [],
+        "linhas_escritas": 0,
+        "bytes_escritos": 0,
+        "quarentenas": [],
+        "contratos_em_quarentena": 0,
+        "concluido": False,
+    }
+
+
+def converter_retomavel(fonte: FonteRetomavel, armazenamento: Armazenamento, layout: str = "lambda_csv3",
+                        contratos_por_parte: int = CONTRATOS_POR_PARTE, prazo: Optional[float] = None,
+                        compressao: Optional[str] = None, nivel: Optional[int] = None,
+                        threads: int = THREADS_ZSTD, quarentena: bool = False,
+                        caminho: Sequence[str] = CAMINHO_CONTRATOS) -> Dict:
+    """
+    Converte a entrada em partes CSV (part-00001.csv, ...; cada uma com cabeçalho), gravando
+    o ponto de controle depois de cada parte. Se já houver um ponto de controle da mesma
+    entrada, continua dele.
+
+    Com `prazo` (um instante de time.monotonic()), a parte em gravação é concluída com os
+    contratos já lidos quando o prazo chega, e a função retorna sem ter terminado a entrada.
+    Cada execução grava pelo menos uma parte, mesmo com o prazo já vencido, para sempre avançar.
+    Com `quarentena`, os contratos inválidos de cada parte vão para part-NNNNN.quarentena.ndjson.
+    Retorna o estado gravado: partes, contratos, posição e se a entrada foi concluída.
+    """
+    modulo = importlib.import_module(layout)
+    estado = armazenamento.ler_estado()
+    if estado is None:
+        estado = _estado_inicial(fonte, layout)
+    elif estado["fonte"] != fonte.identificacao or estado["layout"] != layout:
+        raise ValueError(
+            f"O ponto de controle é de outra conversão ({estado['fonte']}, {estado['layout']}); "
+            f"use outro destino ou apague {ARQUIVO_ESTADO}"
+        )
+    if estado["concluido"]:
+        return estado
+    # Pontos de controle gravados antes da quarentena não têm estes campos
+    estado.setdefault("quarentenas", [])
+    estado.setdefault("contratos_em_quarentena", 0)
+
+    fluxo = fonte.abrir(estado["posicao"])
+    try:
+        fragmentos = LeitorContratos(fluxo, caminho, inicio=estado["posicao"]).fragmentos()
+        proximo = next(fragmentos, None)
+        partes_gravadas = 0
+        while proximo is not None:
+            if partes_gravadas and prazo is not None and time.monotonic() >= prazo:
+                break
+
+            numero = len(estado["partes"]) + 1
+            nome = f"part-{numero:05d}.csv{extensao(compressao)}"
+            lote = _Lote(fragmentos, proximo, contratos_por_parte, prazo)
+            # Os rejeitados de uma parte são poucos: ficam em memória e são gravados junto com ela
+            rejeitados = io.BytesIO()
+            registro = Quarentena(rejeitados) if quarentena else None
+            with armazenamento.parte(nome) as destino:
+                if compressao is None:
+                    estatisticas = modulo.escrever_csv(destino, lote, formato="csv", quarentena=registro)
+                else:
+                    with compactar(destino, compressao, nivel, threads) as compactado:
+                        estatisticas = modulo.escrever_csv(compactado, lote, formato="csv", quarentena=registro)
+            if registro is not None and registro.contratos:
+                nome_quarentena = f"part-{numero:05d}.quarentena.ndjson"
+                with armazenamento.parte(nome_quarentena) as destino:
+                    destino.write(rejeitados.getvalue())
+                estado["quarentenas"].append(nome_quarentena)
+                estado["contratos_em_quarentena"] += registro.contratos
+            proximo = lote.proximo
+            partes_gravadas += 1
+
+            estado["partes"].append(nome)
+            estado["posicao"] = lote.fim
+            estado["contratos"] += lote.contratos
+            estado["linhas_escritas"] += estatisticas["linhas_escritas"]
+            estado["bytes_escritos"] += estatisticas["bytes_escritos"]
+            estado["concluido"] = proximo is None
+            armazenamento.gravar_estado(estado)
+    finally:
+        fluxo.close()
+
+    if proximo is None and not estado["concluido"]:
+        # Retomada exatamente no fim da entrada (ou entrada sem contratos)
+        estado["concluido"] = True
+        armazenamento.gravar_estado(estado)
+    return estado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("entrada")
+    parser.add_argument("saida", help="diretório das partes e do ponto de controle")
+    parser.add_argument("--layout", default="lambda_csv3")
+    parser.add_argument("--contratos-por-parte", type=int, default=CONTRATOS_POR_PARTE)
+    parser.add_argument("--segundos", type=float, default=None, help="tempo máximo desta execução")
+    parser.add_argument("--compressao", choices=("gzip", "zstd"), default=None)
+    args = parser.parse_args()
+
+    prazo = time.monotonic() + args.segundos if args.segundos is not None else None
+    estado = converter_retomavel(FonteArquivo(args.entrada), ArmazenamentoLocal(args.saida), args.layout,
+                                 args.contratos_por_parte, prazo, args.compressao)
+    situacao = "concluído" if estado["concluido"] else "interrompido; execute de novo para continuar"
+    print(f"{len(estado['partes'])} partes, {estado['contratos']} contratos, "
+          f"{estado['linhas_escritas']} linhas: {situacao}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import hashlib
+import os
+import shutil
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Union
+
+# Tamanho mínimo de cada parte de um upload multipart, exceto a última (mesma regra do S3)
+TAMANHO_MINIMO_PARTE = 5 * 1024 * 1024
+
+
+class NoSuchKey(KeyError):
+    pass
+
+
+class S3Local:
+    """
+    Substituto do cliente S3 do boto3 que guarda os objetos em disco, em `raiz/<bucket>/<chave>`.
+    Implementa só as operações usadas pelo handler, com as mesmas assinaturas.
+    Como no S3, um objeto só aparece quando está completo.
+    """
+
+    # Como cliente.exceptions.NoSuchKey do boto3
+    exceptions = SimpleNamespace(NoSuchKey=NoSuchKey)
+
+    def __init__(self, raiz: Union[str, Path]):
+        self.raiz = Path(raiz)
+
+    def _caminho(self, bucket: str, chave: str) -> Path:
+        return self.raiz / bucket / chave
+
+    def _uploads(self, upload_id: str) -> Path:
+        return self.raiz / ".uploads" / upload_id
+
+    def _existente(self, bucket: str, chave: str) -> Path:
+        caminho = self._caminho(bucket, chave)
+        if not caminho.exists():
+            raise NoSuchKey(f"Objeto não encontrado: s3://{bucket}/{chave}")
+        return caminho
+
+    @staticmethod
+    def _etag(caminho: Path) -> str:
+        # Identifica a versão do arquivo pelo tamanho e pela data de modificação (não é o MD5 do S3)
+        estado = caminho.stat()
+        return f'"{estado.st_size:x}-{estado.st_mtime_ns:x}"'
+
+    def head_object(self, Bucket: str, Key: str) -> Dict:
+        caminho = self._existente(Bucket, Key)
+        return {"ContentLength": caminho.stat().st_size, "ETag": self._etag(caminho)}
+
+    def get_object(self, Bucket: str, Key: str, Range: Optional[str] = None) -> Dict:
+        caminho = self._existente(Bucket, Key)
+        corpo = caminho.open("rb")
+        tamanho = caminho.stat().st_size
+        if Range is None:
+            return {"Body": corpo, "ContentLength": tamanho, "ETag": self._etag(caminho)}
+
+        # Só a forma usada para retomar leituras: "bytes=<início>-"
+        inicio = int(Range[len("bytes="):].rstrip("-"))
+        corpo.seek(inicio)
+        return {"Body": corpo, "ContentLength": max(tamanho - inicio, 0), "ETag": self._etag(caminho)}
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes) -> Dict:
+        caminho = self._caminho(Bucket, Key)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = caminho.with_name(f"{caminho.name}.{uuid.uuid4().hex}")
+        temporario.write_bytes(Body)
+        os.replace(temporario, caminho)
+        return {"ETag": hashlib.md5(Body).hexdigest()}
+
+    def create_multipart_upload(self, Bucket: str, Key: str) -> Dict:
+        upload_id = uuid.uuid4().hex
+        self._uploads(upload_id).mkdir(parents=True)
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body: bytes) -> Dict:
+        (self._uploads(UploadId) / f"{PartNumber:05d}").write_bytes(Body)
+        return {"ETag": hashlib.md5(Body).hexdigest()}
+
+    def complete_multipart_upload(self, Bucket: str, Key: str, UploadId: str, MultipartUpload: Dict) -> Dict:
+        partes: List[Dict] = MultipartUpload["Parts"]
+        if not partes:
+            raise ValueError("Upload multipart sem partes")
+
+        caminho = self._caminho(Bucket, Key)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = caminho.with_name(f"{caminho.name}.{UploadId}")
+        try:
+            with temporario.open("wb") as destino:
+                for posicao, parte in enumerate(partes):
+                    arquivo = self._uploads(UploadId) / f"{parte['PartNumber']:05d}"
+                    if posicao < len(partes) - 1 and arquivo.stat().st_size < TAMANHO_MINIMO_PARTE:
+                        raise ValueError(f"EntityTooSmall: parte {parte['PartNumber']} menor que 5 MiB")
+                    with arquivo.open("rb") as origem:
+                        shutil.copyfileobj(origem, destino)
+        except BaseException:
+            temporario.unlink(missing_ok=True)
+            raise
+        os.replace(temporario, caminho)
+
+        shutil.rmtree(self._uploads(UploadId))
+        return {"Bucket": Bucket, "Key": Key}
+
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str) -> Dict:
+        shutil.rmtree(self._uploads(UploadId), ignore_errors=True)
+        return {}
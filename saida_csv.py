@@ -0,0 +1,175 @@
+import csv
+import io
+from itertools import islice
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Optional, Sequence, Union
+
+from compressao import abrir_saida, codec_do_caminho, sem_extensao
+
+# Quantidade de linhas acumuladas antes de cada gravação. Lotes de centenas de
+# linhas ainda cabem no cache; lotes muito maiores ficam mais lentos.
+TAMANHO_LOTE = 512
+
+# Tamanho do buffer do arquivo de saída, em bytes
+TAMANHO_BUFFER = 1 << 20
+
+Destino = Union[str, Path, BinaryIO]
+
+
+class ContadorBytes(io.RawIOBase):
+    """
+    Repassa os bytes para o destino contando quantos foram gravados.
+    """
+
+    def __init__(self, destino: BinaryIO):
+        self._destino = destino
+        self.total = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, dados) -> int:
+        self.total += len(dados)
+        self._destino.write(dados)
+        return len(dados)
+
+
+class EscritorLotes:
+    """
+    Escreve linhas CSV em lotes: cada lote é serializado com uma única chamada
+    `writerows` e descarregado de uma vez num arquivo com buffer grande.
+    Caminhos terminados em .gz ou .zst são gravados compactados; `bytes_escritos` conta o CSV sem compressão.
+    """
+
+    def __init__(self, destino: Destino, cabecalho: Optional[Sequence[str]] = None,
+                 tamanho_lote: int = TAMANHO_LOTE, tamanho_buffer: int = TAMANHO_BUFFER,
+                 delimitador: str = ";", encoding: str = "utf-8"):
+        if isinstance(destino, (str, Path)):
+            self._arquivo = abrir_saida(destino, tamanho_buffer=tamanho_buffer)
+            self._fechar_arquivo = True
+        else:
+            self._arquivo = destino
+            self._fechar_arquivo = False
+
+        self._tamanho_lote = tamanho_lote
+        self._contador = ContadorBytes(self._arquivo)
+        self._texto = io.TextIOWrapper(self._contador, encoding=encoding, newline="")
+        self._writer = csv.writer(self._texto, delimiter=delimitador)
+        self._lote: List[Sequence[str]] = []
+
+        self.linhas_escritas = 0
+        self.descargas = 0
+
+        if cabecalho is not None:
+            self._writer.writerow(cabecalho)
+
+    def escrever(self, linha: Sequence[str]) -> None:
+        """
+        Acrescenta uma linha ao lote atual.
+        """
+        self._lote.append(linha)
+        if len(self._lote) >= self._tamanho_lote:
+            self.descarregar()
+
+    def escrever_varias(self, linhas: Iterable[Sequence[str]]) -> None:
+        """
+        Acrescenta várias linhas, completando e gravando lotes conforme enchem.
+        """
+        linhas = iter(linhas)
+        while True:
+            self._lote.extend(islice(linhas, self._tamanho_lote - len(self._lote)))
+            if len(self._lote) < self._tamanho_lote:
+                return
+            self.descarregar()
+
+    def descarregar(self) -> None:
+        """
+        Serializa o lote pendente e grava no arquivo.
+        """
+        if self._lote:
+            self._writer.writerows(self._lote)
+            self.linhas_escritas += len(self._lote)
+            self.descargas += 1
+            self._lote.clear()
+        self._texto.flush()
+
+    @property
+    def bytes_escritos(self) -> int:
+        return self._contador.total
+
+    def fechar(self) -> None:
+        """
+        Grava o que falta e fecha o arquivo, se ele foi aberto aqui.
+        """
+        self.descarregar()
+        self._texto.detach()
+        if self._fechar_arquivo:
+            self._arquivo.close()
+        else:
+            self._arquivo.flush()
+
+    def estatisticas(self) -> Dict[str, int]:
+        """
+        Retorna as linhas, bytes e descargas feitas até agora.
+        """
+        return {
+            "linhas_escritas": self.linhas_escritas,
+            "bytes_escritos": self.bytes_escritos,
+            "descargas": self.descargas,
+        }
+
+    def __enter__(self) -> "EscritorLotes":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.fechar()
+
+
+# Formatos de saída aceitos por `abrir_escritor`, reconhecidos pela extensão do destino
+FORMATOS = {".csv": "csv", ".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow", ".dat": "fixo"}
+
+
+def formato_destino(destino: Destino, formato: Optional[str] = None) -> str:
+    """
+    Retorna o formato informado ou, na falta dele, o deduzido pela extensão do arquivo (CSV por padrão).
+    A extensão de compressão é ignorada ("saida.csv.gz" é CSV).
+    """
+    if formato:
+        if formato not in FORMATOS.values():
+            raise ValueError(f"Formato de saída desconhecido: {formato}")
+        return formato
+    if isinstance(destino, (str, Path)):
+        return FORMATOS.get(Path(sem_extensao(destino)).suffix.lower(), "csv")
+    return "csv"
+
+
+def abrir_escritor(destino: Destino, cabecalho: Sequence[str], tipos: Optional[Sequence[str]] = None,
+                   formato: Optional[str] = None, tamanho_lote: int = TAMANHO_LOTE, particionamento=None,
+                   registro=None, colunas: Optional[Sequence[str]] = None):
+    """
+    Abre o escritor do formato pedido: CSV em lotes; para parquet/arrow, colunar tipado
+    segundo `tipos` (um tipo de saida_parquet.TIPOS por coluna), com os nomes de `colunas`
+    (o cabeçalho, se omitidos); para "fixo", registros de
+    largura fixa segundo `registro` (saida_fixa.LayoutRegistro), sem cabeçalho.
+    Com `particionamento` (saida_particionada.Particionamento), o destino é um diretório e o
+    CSV é dividido em partes por partição, procurada pelos nomes de `colunas`.
+    """
+    if particionamento is not None:
+        if formato not in (None, "csv") or not isinstance(destino, (str, Path)):
+            raise ValueError("A saída particionada grava CSV num diretório")
+        from saida_particionada import EscritorParticionado
+        return EscritorParticionado(destino, cabecalho, particionamento, tamanho_lote, colunas)
+
+    formato = formato_destino(destino, formato)
+    if formato == "csv":
+        return EscritorLotes(destino, cabecalho, tamanho_lote=tamanho_lote)
+    if formato == "fixo":
+        if registro is None:
+            raise ValueError("Este layout não tem registro de largura fixa")
+        from saida_fixa import EscritorLarguraFixa
+        return EscritorLarguraFixa(destino, registro)
+    if isinstance(destino, (str, Path)) and codec_do_caminho(destino):
+        raise ValueError("Parquet e Arrow já são compactados internamente; use o destino sem .gz/.zst")
+
+    from saida_parquet import EscritorColunar
+    return EscritorColunar(destino, colunas or cabecalho, tipos, formato=formato)
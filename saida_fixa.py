@@ -0,0 +1,191 @@
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from compressao import abrir_saida
+from saida_csv import TAMANHO_BUFFER, Destino
+
+# Registros montados no mesmo bloco antes de cada gravação
+REGISTROS_POR_BLOCO = 1024
+
+# Tipos de campo:
+#   texto   alinhado à esquerda, completado com espaços
+#   numero  alinhado à direita, completado com zeros depois do sinal ("-12" em 6 posições: "-00012")
+#   data    "AAAA-MM-DD" gravada como está, completada com espaços quando vazia
+TIPOS = ("texto", "numero", "data")
+
+_PADROES = {
+    "texto": ("esquerda", " "),
+    "numero": ("direita", "0"),
+    "data": ("esquerda", " "),
+}
+
+
+class Campo(NamedTuple):
+    """
+    Campo do registro. Alinhamento e preenchimento vêm do tipo, a menos que sejam informados;
+    `inicio`, se informado, é conferido contra a posição calculada pela soma das larguras.
+    """
+    nome: str
+    largura: int
+    tipo: str = "texto"
+    preenchimento: Optional[str] = None
+    alinhamento: Optional[str] = None  # "esquerda" ou "direita"
+    inicio: Optional[int] = None
+
+
+class _CampoCompilado(NamedTuple):
+    nome: str
+    inicio: int
+    largura: int
+    direita: bool
+
+
+class LayoutRegistro:
+    """
+    Layout de um registro de largura fixa: as posições de cada campo e o formato compilado
+    que monta o registro inteiro (alinhamento, preenchimento e terminador) numa só chamada.
+    """
+
+    def __init__(self, campos: Sequence[Campo], terminador: str = "\r\n", encoding: str = "latin-1"):
+        self.campos = list(campos)
+        self.encoding = encoding
+        self.posicoes: List[_CampoCompilado] = []
+        # (posição na linha, largura) dos campos completados com zeros à direita do sinal
+        self.zeros_apos_sinal: List[Tuple[int, int]] = []
+        especificacoes = []
+        inicio = 0
+
+        for numero, campo in enumerate(self.campos):
+            if campo.tipo not in TIPOS:
+                raise ValueError(f"Campo {campo.nome}: tipo desconhecido {campo.tipo}")
+            if campo.largura < 1:
+                raise ValueError(f"Campo {campo.nome}: largura inválida {campo.largura}")
+            if campo.inicio is not None and campo.inicio != inicio:
+                raise ValueError(f"Campo {campo.nome}: começa em {inicio}, não em {campo.inicio}")
+
+            alinhamento, preenchimento = _PADROES[campo.tipo]
+            alinhamento = campo.alinhamento or alinhamento
+            preenchimento = campo.preenchimento or preenchimento
+            if len(preenchimento.encode(encoding)) != 1 or preenchimento in "{}":
+                raise ValueError(f"Campo {campo.nome}: o preenchimento precisa ser um único byte")
+
+            self.posicoes.append(_CampoCompilado(campo.nome, inicio, campo.largura, alinhamento == "direita"))
+            if alinhamento == "direita" and preenchimento == "0":
+                self.zeros_apos_sinal.append((numero, campo.largura))
+            especificacoes.append(f"{{:{preenchimento}{'>' if alinhamento == 'direita' else '<'}{campo.largura}}}")
+            inicio += campo.largura
+
+        self.formato = "".join(especificacoes) + terminador
+        self.tamanho = inicio + len(terminador.encode(encoding))
+
+
+class EscritorLarguraFixa:
+    """
+    Grava registros de largura fixa num bloco pré-alocado e reutilizado: cada registro é
+    montado pelo formato compilado do layout (uma chamada por registro, sem passar pelo
+    csv.writer), codificado e copiado para a sua posição no bloco pelo memoryview.
+    O bloco é gravado inteiro quando enche.
+
+    Tem a mesma interface do EscritorLotes (escrever, escrever_varias, fechar, estatisticas).
+    """
+
+    def __init__(self, destino: Destino, layout: LayoutRegistro,
+                 registros_por_bloco: int = REGISTROS_POR_BLOCO, tamanho_buffer: int = TAMANHO_BUFFER):
+        if isinstance(destino, (str, Path)):
+            self._arquivo = abrir_saida(destino, tamanho_buffer=tamanho_buffer)
+            self._fechar_arquivo = True
+        else:
+            self._arquivo = destino
+            self._fechar_arquivo = False
+
+        self._campos = layout.posicoes
+        self._zeros_apos_sinal = layout.zeros_apos_sinal
+        self._formatar = layout.formato.format
+        self._tamanho = layout.tamanho
+        self._encoding = layout.encoding
+        self._registros_por_bloco = registros_por_bloco
+        self._bloco = bytearray(layout.tamanho * registros_por_bloco)
+        self._visao = memoryview(self._bloco)
+        self._pos = 0
+        self._registros_no_bloco = 0
+
+        self.linhas_escritas = 0
+        self.descargas = 0
+        self.bytes_escritos = 0
+
+    def escrever(self, linha: Sequence[str]) -> None:
+        """
+        Monta a linha no próximo registro do bloco. Valores maiores que o campo são rejeitados.
+        """
+        if len(linha) != len(self._campos):
+            raise ValueError(f"Registro com {len(linha)} valores para {len(self._campos)} campos")
+        if self._zeros_apos_sinal:
+            linha = self._completar_apos_sinal(linha)
+
+        dados = self._formatar(*linha).encode(self._encoding)
+        if len(dados) != self._tamanho:
+            self._rejeitar(linha)
+
+        pos = self._pos
+        self._visao[pos:pos + self._tamanho] = dados
+        self._pos = pos + self._tamanho
+        self._registros_no_bloco += 1
+        if self._registros_no_bloco == self._registros_por_bloco:
+            self.descarregar()
+
+    def _completar_apos_sinal(self, linha: Sequence[str]) -> Sequence[str]:
+        # O formato de texto não tem o alinhamento "=" dos números: o sinal vai para a frente dos zeros aqui
+        for numero, largura in self._zeros_apos_sinal:
+            valor = linha[numero]
+            if valor[:1] in ("-", "+"):
+                linha = list(linha)
+                linha[numero] = valor[0] + valor[1:].rjust(largura - 1, "0")
+        return linha
+
+    def _rejeitar(self, linha: Sequence[str]) -> None:
+        for campo, valor in zip(self._campos, linha):
+            if len(valor.encode(self._encoding)) > campo.largura:
+                raise ValueError(f"Valor {valor!r} não cabe no campo {campo.nome} ({campo.largura} posições)")
+        raise ValueError("Registro com tamanho diferente do layout")
+
+    def escrever_varias(self, linhas: Iterable[Sequence[str]]) -> None:
+        escrever = self.escrever
+        for linha in linhas:
+            escrever(linha)
+
+    def descarregar(self) -> None:
+        """
+        Grava os registros do bloco atual de uma vez.
+        """
+        if not self._pos:
+            return
+        self._arquivo.write(self._visao[:self._pos])
+        self.bytes_escritos += self._pos
+        self.linhas_escritas += self._registros_no_bloco
+        self.descargas += 1
+        self._pos = 0
+        self._registros_no_bloco = 0
+
+    def fechar(self) -> None:
+        """
+        Grava o último bloco e fecha o arquivo, se ele foi aberto aqui.
+        """
+        self.descarregar()
+        self._visao.release()
+        if self._fechar_arquivo:
+            self._arquivo.close()
+        else:
+            self._arquivo.flush()
+
+    def estatisticas(self) -> Dict[str, int]:
+        return {
+            "linhas_escritas": self.linhas_escritas,
+            "bytes_escritos": self.bytes_escritos,
+            "descargas": self.descargas,
+        }
+
+    def __enter__(self) -> "EscritorLarguraFixa":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.fechar()
@@ -0,0 +1,180 @@
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from saida_csv import TAMANHO_BUFFER, ContadorBytes, Destino
+
+# Tipos de coluna aceitos nos esquemas dos layouts:
+#   texto    string simples (ex.: código do contrato, quase sempre único)
+#   codigo   string de baixa cardinalidade, gravada com dicionário
+#   data     "AAAA-MM-DD" -> date32
+#   decimal  valor monetário -> decimal128(18, 2)
+#   inteiro  -> int64
+TIPOS = ("texto", "codigo", "data", "decimal", "inteiro")
+
+FORMATOS = ("parquet", "arrow")
+
+# Linhas acumuladas por grupo de linhas (row group); limita a memória da escrita
+LINHAS_POR_GRUPO = 100000
+
+CENTAVO = Decimal("0.01")
+
+
+def _texto(valor: str) -> Optional[str]:
+    return valor
+
+
+def _data(valor: str) -> Optional[date]:
+    return date.fromisoformat(valor) if valor else None
+
+
+def _decimal(valor: str) -> Optional[Decimal]:
+    if not valor:
+        return None
+    numero = Decimal(valor)
+    arredondado = numero.quantize(CENTAVO)
+    if arredondado != numero:
+        raise ValueError(f"Valor com mais de duas casas decimais: {valor}")
+    return arredondado
+
+
+def _inteiro(valor: str) -> Optional[int]:
+    return int(valor) if valor else None
+
+
+_CONVERSORES: Dict[str, Callable[[str], object]] = {
+    "texto": _texto,
+    "codigo": _texto,
+    "data": _data,
+    "decimal": _decimal,
+    "inteiro": _inteiro,
+}
+
+
+def _importar_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("A saída Parquet/Arrow precisa do pacote pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def _tipo_arrow(pa, tipo: str):
+    return {
+        "texto": pa.string(),
+        "codigo": pa.dictionary(pa.int32(), pa.string()),
+        "data": pa.date32(),
+        "decimal": pa.decimal128(18, 2),
+        "inteiro": pa.int64(),
+    }[tipo]
+
+
+class EscritorColunar:
+    """
+    Escreve as linhas em Parquet ou Arrow (IPC) com colunas tipadas: datas como date32,
+    valores como decimal e códigos com dicionário. As linhas são acumuladas por coluna e
+    gravadas em grupos de `linhas_por_grupo`, então a memória não depende do total.
+
+    Tem a mesma interface do EscritorLotes (escrever, escrever_varias, fechar, estatisticas).
+    """
+
+    def __init__(self, destino: Destino, cabecalho: Sequence[str], tipos: Sequence[str],
+                 formato: str = "parquet", linhas_por_grupo: int = LINHAS_POR_GRUPO,
+                 compressao: str = "zstd"):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato colunar desconhecido: {formato}")
+        if len(cabecalho) != len(tipos):
+            raise ValueError("O esquema precisa de um tipo para cada coluna do cabeçalho")
+        desconhecidos = set(tipos) - set(TIPOS)
+        if desconhecidos:
+            raise ValueError(f"Tipos de coluna desconhecidos: {sorted(desconhecidos)}")
+
+        pa = _importar_pyarrow()
+        self._pa = pa
+        self._tipos = list(tipos)
+        self._conversores = [_CONVERSORES[tipo] for tipo in tipos]
+        self._schema = pa.schema([pa.field(nome, _tipo_arrow(pa, tipo)) for nome, tipo in zip(cabecalho, tipos)])
+        self._linhas_por_grupo = linhas_por_grupo
+        self._colunas: List[List] = [[] for _ in cabecalho]
+
+        if isinstance(destino, (str, Path)):
+            self._arquivo = open(destino, "wb", buffering=TAMANHO_BUFFER)
+            self._fechar_arquivo = True
+        else:
+            self._arquivo = destino
+            self._fechar_arquivo = False
+        self._contador = ContadorBytes(self._arquivo)
+
+        if formato == "parquet":
+            self._writer = pa.parquet.ParquetWriter(self._contador, self._schema, compression=compressao)
+        else:
+            opcoes = pa.ipc.IpcWriteOptions(compression=compressao)
+            self._writer = pa.ipc.new_file(self._contador, self._schema, options=opcoes)
+
+        self.linhas_escritas = 0
+        self.descargas = 0
+
+    def escrever(self, linha: Sequence[str]) -> None:
+        """
+        Converte e acrescenta uma linha às colunas pendentes.
+        """
+        for coluna, converter, valor in zip(self._colunas, self._conversores, linha):
+            coluna.append(converter(valor))
+        if len(self._colunas[0]) >= self._linhas_por_grupo:
+            self.descarregar()
+
+    def escrever_varias(self, linhas) -> None:
+        for linha in linhas:
+            self.escrever(linha)
+
+    def descarregar(self) -> None:
+        """
+        Grava as colunas pendentes como um grupo de linhas.
+        """
+        quantidade = len(self._colunas[0])
+        if not quantidade:
+            return
+
+        pa = self._pa
+        arrays = []
+        for coluna, tipo, campo in zip(self._colunas, self._tipos, self._schema):
+            if tipo == "codigo":
+                arrays.append(pa.array(coluna, type=pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(coluna, type=campo.type))
+            coluna.clear()
+
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+        self.linhas_escritas += quantidade
+        self.descargas += 1
+
+    @property
+    def bytes_escritos(self) -> int:
+        return self._contador.total
+
+    def fechar(self) -> None:
+        """
+        Grava o último grupo, finaliza o arquivo e fecha o destino, se ele foi aberto aqui.
+        """
+        self.descarregar()
+        self._writer.close()
+        if self._fechar_arquivo:
+            self._arquivo.close()
+        else:
+            self._arquivo.flush()
+
+    def estatisticas(self) -> Dict[str, int]:
+        return {
+            "linhas_escritas": self.linhas_escritas,
+            "bytes_escritos": self.bytes_escritos,
+            "descargas": self.descargas,
+        }
+
+    def __enter__(self) -> "EscritorColunar":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.fechar()
@@ -0,0 +1,202 @@
+from collections import OrderedDict
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+from urllib.parse import quote
+
+from compressao import abrir_saida, extensao
+from saida_csv import TAMANHO_BUFFER, TAMANHO_LOTE, EscritorLotes
+
+# Valor usado no nome do diretório quando a coluna da partição está vazia
+VALOR_VAZIO = "__vazio__"
+
+# Arquivos de partes abertos ao mesmo tempo, no máximo
+MAX_ABERTOS = 64
+
+# Buffer de cada arquivo de parte; menor que o do arquivo único, já que vários ficam abertos
+TAMANHO_BUFFER_PARTE = TAMANHO_BUFFER // 8
+
+
+class Particionamento(NamedTuple):
+    """
+    Como dividir a saída: as colunas que formam a partição, em ordem
+    (ex.: ("SIGLA", "DATA_PRO") -> sigla=OD/data_pro=2024-06-28/), e os limites de cada parte.
+    """
+    colunas: Sequence[str]
+    max_linhas: Optional[int] = None  # linhas por parte
+    max_bytes: Optional[int] = None  # bytes por parte (sem compressão), conferido a cada lote gravado
+    max_abertos: int = MAX_ABERTOS
+    compressao: Optional[str] = None  # codec das partes ("gzip" ou "zstd")
+
+
+class _Particao:
+    """
+    Estado de uma partição: a parte atual e, se estiver aberta, seu arquivo e escritor.
+    """
+    __slots__ = ("diretorio", "numero_parte", "linhas_parte", "bytes_fechados", "arquivo", "escritor")
+
+    def __init__(self, diretorio: Path):
+        self.diretorio = diretorio
+        self.numero_parte = 0
+        self.linhas_parte = 0
+        self.bytes_fechados = 0  # bytes da parte atual gravados antes da última reabertura
+        self.arquivo: Optional[BinaryIO] = None
+        self.escritor: Optional[EscritorLotes] = None
+
+    def bytes_parte(self) -> int:
+        return self.bytes_fechados + (self.escritor.bytes_escritos if self.escritor else 0)
+
+
+class EscritorParticionado:
+    """
+    Distribui as linhas em arquivos CSV por partição, no formato de diretórios
+    coluna=valor/part-0001.csv, e passa para uma nova parte ao atingir o limite de
+    linhas ou de bytes. Cada parte tem o cabeçalho.
+
+    No máximo `max_abertos` partes ficam abertas; a menos usada recentemente é fechada
+    quando é preciso abrir outra e, se voltar a receber linhas, é reaberta para acréscimo.
+
+    As colunas da partição são procuradas em `colunas`, um nome por valor da linha (o
+    cabeçalho, se omitidas); o cabeçalho é só a primeira linha de cada parte.
+
+    Tem a mesma interface do EscritorLotes (escrever, escrever_varias, fechar, estatisticas).
+    """
+
+    def __init__(self, diretorio: Union[str, Path], cabecalho: Sequence[str], particionamento: Particionamento,
+                 tamanho_lote: int = TAMANHO_LOTE, colunas: Optional[Sequence[str]] = None):
+        colunas = list(colunas or cabecalho)
+        desconhecidas = [c for c in particionamento.colunas if c not in colunas]
+        if not particionamento.colunas or desconhecidas:
+            raise ValueError(f"Colunas de partição inválidas: {desconhecidas or 'nenhuma informada'}")
+        if particionamento.max_abertos < 1:
+            raise ValueError("max_abertos precisa ser pelo menos 1")
+
+        self._diretorio = Path(diretorio)
+        self._cabecalho = list(cabecalho)
+        self._config = particionamento
+        self._indices = [colunas.index(c) for c in particionamento.colunas]
+        self._nomes = [c.lower() for c in particionamento.colunas]
+        self._tamanho_lote = tamanho_lote
+        self._extensao = extensao(particionamento.compressao)
+
+        self._particoes: Dict[Tuple[str, ...], _Particao] = {}
+        self._abertas: "OrderedDict[Tuple[str, ...], _Particao]" = OrderedDict()
+        self._ultima_chave: Optional[Tuple[str, ...]] = None
+        self._ultima: Optional[_Particao] = None
+
+        self.partes: List[Path] = []
+        self.linhas_escritas = 0
+        self.descargas = 0
+        self.reaberturas = 0
+        self._bytes_fechados = 0
+
+    def _caminho_particao(self, chave: Tuple[str, ...]) -> Path:
+        partes = [
+            f"{nome}={quote(valor, safe='') if valor else VALOR_VAZIO}" for nome, valor in zip(self._nomes, chave)
+        ]
+        return self._diretorio.joinpath(*partes)
+
+    def _nome_parte(self, particao: _Particao) -> Path:
+        return particao.diretorio / f"part-{particao.numero_parte:04d}.csv{self._extensao}"
+
+    def _fechar_particao(self, particao: _Particao) -> None:
+        escritor = particao.escritor
+        escritor.fechar()
+        particao.arquivo.close()
+        self.linhas_escritas += escritor.linhas_escritas
+        self.descargas += escritor.descargas
+        self._bytes_fechados += escritor.bytes_escritos
+        particao.bytes_fechados += escritor.bytes_escritos
+        particao.arquivo = particao.escritor = None
+
+    def _abrir(self, chave: Tuple[str, ...], particao: _Particao) -> None:
+        """
+        Abre a parte atual da partição, fechando a menos usada se o limite de abertas foi atingido.
+        """
+        if len(self._abertas) >= self._config.max_abertos:
+            _, antiga = self._abertas.popitem(last=False)
+            self._fechar_particao(antiga)
+
+        nova = particao.linhas_parte == 0
+        if nova:
+            particao.numero_parte += 1
+            particao.bytes_fechados = 0
+            particao.diretorio.mkdir(parents=True, exist_ok=True)
+            self.partes.append(self._nome_parte(particao))
+        else:
+            self.reaberturas += 1
+
+        particao.arquivo = abrir_saida(self._nome_parte(particao), tamanho_buffer=TAMANHO_BUFFER_PARTE,
+                                       acrescentar=not nova)
+        particao.escritor = EscritorLotes(particao.arquivo, self._cabecalho if nova else None,
+                                          tamanho_lote=self._tamanho_lote)
+        self._abertas[chave] = particao
+
+    def _particao(self, chave: Tuple[str, ...]) -> _Particao:
+        particao = self._particoes.get(chave)
+        if particao is None:
+            particao = self._particoes[chave] = _Particao(self._caminho_particao(chave))
+        if particao.escritor is None:
+            self._abrir(chave, particao)
+        else:
+            self._abertas.move_to_end(chave)
+        self._ultima_chave, self._ultima = chave, particao
+        return particao
+
+    def escrever(self, linha: Sequence[str]) -> None:
+        """
+        Grava a linha na parte atual da sua partição.
+        """
+        chave = tuple([linha[i] for i in self._indices])
+        # Linhas seguidas do mesmo contrato costumam cair na mesma partição
+        if chave == self._ultima_chave and self._ultima.escritor is not None:
+            particao = self._ultima
+        else:
+            particao = self._particao(chave)
+
+        particao.escritor.escrever(linha)
+        particao.linhas_parte += 1
+
+        config = self._config
+        if ((config.max_linhas and particao.linhas_parte >= config.max_linhas)
+                or (config.max_bytes and particao.bytes_parte() >= config.max_bytes)):
+            del self._abertas[chave]
+            self._fechar_particao(particao)
+            particao.linhas_parte = 0
+
+    def escrever_varias(self, linhas: Iterable[Sequence[str]]) -> None:
+        for linha in linhas:
+            self.escrever(linha)
+
+    def descarregar(self) -> None:
+        for particao in self._abertas.values():
+            particao.escritor.descarregar()
+
+    @property
+    def bytes_escritos(self) -> int:
+        return self._bytes_fechados + sum(p.escritor.bytes_escritos for p in self._abertas.values())
+
+    def fechar(self) -> None:
+        """
+        Fecha todas as partes abertas.
+        """
+        while self._abertas:
+            _, particao = self._abertas.popitem(last=False)
+            self._fechar_particao(particao)
+        self._ultima_chave = self._ultima = None
+
+    def estatisticas(self) -> Dict[str, int]:
+        abertas = [p.escritor for p in self._abertas.values()]
+        return {
+            "linhas_escritas": self.linhas_escritas + sum(e.linhas_escritas for e in abertas),
+            "bytes_escritos": self.bytes_escritos,
+            "descargas": self.descargas + sum(e.descargas for e in abertas),
+            "particoes": len(self._particoes),
+            "partes": len(self.partes),
+            "reaberturas": self.reaberturas,
+        }
+
+    def __enter__(self) -> "EscritorParticionado":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.fechar()
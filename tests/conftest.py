@@ -0,0 +1,29 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Os módulos ficam na raiz do repositório
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gerador_contratos import ConfiguracaoGerador, escrever_json  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def entrada_pequena(tmp_path_factory) -> Path:
+    """
+    JSON sintético com 300 contratos.
+    """
+    caminho = tmp_path_factory.mktemp("entrada") / "contratos.json"
+    escrever_json(caminho, ConfiguracaoGerador(contratos=300, semente=1))
+    return caminho
+
+
+@pytest.fixture(scope="session")
+def entrada_grande(tmp_path_factory) -> Path:
+    """
+    JSON sintético cujo CSV (lambda_csv3) passa de 10 MB, o bastante para mais de uma parte no upload.
+    """
+    caminho = tmp_path_factory.mktemp("entrada") / "contratos.json"
+    escrever_json(caminho, ConfiguracaoGerador(contratos=5000, semente=2))
+    return caminho
@@ -0,0 +1,82 @@
+import importlib.util
+import json
+import math
+
+import pytest
+
+import backend_json
+
+BACKENDS = [
+    "json",
+    pytest.param("orjson", marks=pytest.mark.skipif(importlib.util.find_spec("orjson") is None,
+                                                   reason="orjson não instalado")),
+]
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    yield backend_json.usar(request.param)
+    backend_json.usar()
+
+
+@pytest.mark.parametrize("texto", [
+    '{"cod_contrato": "100001", "valor": "5674.48", "n": 12, "lista": [1.5, true, null]}',
+    '18446744073709551615',
+    '18446744073709551616',
+    '-9223372036854775809',
+    '[123456789012345678901234567890, -123456789012345678901234567890]',
+    '{"id": 99999999999999999999, "cod": "0000000000000000000000001"}',
+    '{"taxa": 0.12345678901234567890}',
+    '"sequência longa só na string: 12345678901234567890"',
+    '{"a": "ação €"}',
+])
+def test_mesmo_resultado_que_o_json(backend, texto):
+    esperado = json.loads(texto)
+    for entrada in (texto, texto.encode("utf-8")):
+        resultado = backend_json.loads(entrada)
+        assert resultado == esperado
+        assert type(resultado) is type(esperado)
+        assert json.dumps(resultado) == json.dumps(esperado)
+
+
+def test_inteiros_longos_continuam_inteiros(backend):
+    assert backend_json.loads(b'{"n": 18446744073709551616}') == {"n": 2 ** 64}
+    assert backend_json.loads('[-9223372036854775809]') == [-2 ** 63 - 1]
+    assert backend_json.dumps_compacto(2 ** 70) == str(2 ** 70).encode()
+
+
+@pytest.mark.parametrize("texto", ["NaN", "[Infinity]", '{"a": -Infinity}'])
+def test_nan_e_infinity_aceitos_como_no_json(backend, texto):
+    assert json.dumps(backend_json.loads(texto)) == json.dumps(json.loads(texto))
+    assert math.isnan(backend_json.loads(b"[NaN]")[0])
+
+
+@pytest.mark.parametrize("texto", ['{"a": 1,}', '[1, 2', '{"a": nan}', '', '"sem fim', '[1] [2]'])
+def test_json_invalido(backend, texto):
+    with pytest.raises(json.JSONDecodeError):
+        backend_json.loads(texto)
+    with pytest.raises(ValueError):
+        backend_json.loads(texto.encode("utf-8"))
+
+
+def test_serializacao_igual_nos_backends():
+    valor = {"b": [1, "ação", None, True], "a": {"z": 2 ** 65, "y": ""}}
+    saidas = {}
+    for nome in ("json", *([] if importlib.util.find_spec("orjson") is None else ["orjson"])):
+        backend_json.usar(nome)
+        saidas[nome] = (backend_json.dumps_compacto(valor), backend_json.dumps_canonico(valor))
+    backend_json.usar()
+
+    for compacto, canonico in saidas.values():
+        assert json.loads(compacto) == json.loads(canonico) == valor
+        assert canonico == '{"a":{"y":"","z":36893488147419103232},"b":[1,"ação",null,true]}'.encode("utf-8")
+    assert len(set(saidas.values())) == 1
+
+
+def test_backend_desconhecido(monkeypatch):
+    with pytest.raises(ValueError, match="Backend JSON desconhecido: simdjson"):
+        backend_json.usar("simdjson")
+    monkeypatch.setenv("JSON_BACKEND", "json")
+    assert backend_json.usar() == "json"
+    monkeypatch.delenv("JSON_BACKEND")
+    assert backend_json.usar() == backend_json.nome_backend()
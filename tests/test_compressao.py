@@ -0,0 +1,76 @@
+import importlib.util
+import io
+
+import pytest
+
+import lambda_csv3
+from compressao import abrir_entrada, abrir_saida, compactar, descompactar, extensao
+from leitor_contratos import ler_contratos
+
+SEM_ZSTANDARD = importlib.util.find_spec("zstandard") is None
+
+CODECS = ["gzip", pytest.param("zstd", marks=pytest.mark.skipif(SEM_ZSTANDARD, reason="zstandard não instalado"))]
+
+DADOS = b"".join(b"%d;contrato;2024-01-28\r\n" % i for i in range(50000))
+
+
+@pytest.mark.parametrize("nivel", [None, 1])
+@pytest.mark.parametrize("codec", CODECS)
+def test_ida_e_volta_em_fluxo(codec, nivel):
+    destino = io.BytesIO()
+    with compactar(destino, codec, nivel) as compactado:
+        for inicio in range(0, len(DADOS), 4096):
+            compactado.write(DADOS[inicio:inicio + 4096])
+    assert len(destino.getvalue()) < len(DADOS)
+
+    destino.seek(0)
+    with descompactar(destino, codec) as fluxo:
+        assert fluxo.read() == DADOS
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_arquivo_com_varios_membros(codec, tmp_path):
+    caminho = tmp_path / f"dados.csv{extensao(codec)}"
+    metade = len(DADOS) // 2
+    with abrir_saida(caminho) as saida:
+        saida.write(DADOS[:metade])
+    with abrir_saida(caminho, acrescentar=True) as saida:
+        saida.write(DADOS[metade:])
+
+    with abrir_entrada(caminho) as entrada:
+        assert entrada.read() == DADOS
+
+
+@pytest.mark.skipif(SEM_ZSTANDARD, reason="zstandard não instalado")
+def test_zstd_multithread():
+    destino = io.BytesIO()
+    with compactar(destino, "zstd", threads=-1) as compactado:
+        compactado.write(DADOS)
+    destino.seek(0)
+    with descompactar(destino, "zstd") as fluxo:
+        assert fluxo.read() == DADOS
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_conversao_de_ponta_a_ponta(codec, entrada_pequena, tmp_path):
+    entrada = tmp_path / f"contratos.json{extensao(codec)}"
+    with abrir_saida(entrada) as saida:
+        saida.write(entrada_pequena.read_bytes())
+    lambda_csv3.escrever_csv(tmp_path / "esperado.csv", ler_contratos(entrada_pequena))
+
+    destino = tmp_path / f"contratos.csv{extensao(codec)}"
+    lambda_csv3.escrever_csv(destino, ler_contratos(entrada))
+
+    with abrir_entrada(destino) as saida:
+        assert saida.read() == (tmp_path / "esperado.csv").read_bytes()
+
+
+@pytest.mark.skipif(not SEM_ZSTANDARD, reason="zstandard instalado")
+def test_zstd_sem_o_pacote_explica_a_dependencia():
+    with pytest.raises(ImportError, match="zstandard"):
+        compactar(io.BytesIO(), "zstd")
+
+
+def test_codec_desconhecido():
+    with pytest.raises(ValueError):
+        compactar(io.BytesIO(), "bzip2")
@@ -0,0 +1,90 @@
+import csv
+import importlib.util
+import json
+
+import pytest
+
+import backend_json
+from converterToJson import converter_csv_para_json
+
+LINHAS = [
+    ["cod_contrato", "obs", "valor"],
+    ["1", "simples", "10.00"],
+    ["2", "com ; delimitador e \"aspas\"", ""],
+    ["3", "quebra\r\nde linha", "-0.50"],
+    ["4", "unicode ação € 😀 \\ \t", "1e10"],
+]
+
+
+@pytest.fixture(params=[
+    "json",
+    pytest.param("orjson", marks=pytest.mark.skipif(importlib.util.find_spec("orjson") is None,
+                                                   reason="orjson não instalado")),
+])
+def backend(request):
+    yield backend_json.usar(request.param)
+    backend_json.usar()
+
+
+@pytest.fixture
+def arquivo_csv(tmp_path):
+    caminho = tmp_path / "entrada.csv"
+    with open(caminho, "w", encoding="utf-8", newline="") as arquivo:
+        csv.writer(arquivo, delimiter=";").writerows(LINHAS)
+    return caminho
+
+
+def registros(caminho):
+    with open(caminho, encoding="utf-8", newline="") as arquivo:
+        return list(csv.DictReader(arquivo, delimiter=";"))
+
+
+def test_ndjson_um_registro_por_linha(arquivo_csv, tmp_path, backend):
+    destino = tmp_path / "saida.ndjson"
+    converter_csv_para_json(str(arquivo_csv), str(destino), formato="ndjson")
+
+    conteudo = destino.read_bytes()
+    assert conteudo.endswith(b"\n")
+    linhas = conteudo.split(b"\n")[:-1]
+    assert len(linhas) == len(LINHAS) - 1
+    assert [json.loads(linha) for linha in linhas] == registros(arquivo_csv)
+    # Compacto, sem escapar caracteres fora do ASCII
+    assert linhas[0] == b'{"cod_contrato":"1","obs":"simples","valor":"10.00"}'
+    assert "ação € 😀".encode("utf-8") in linhas[3]
+
+
+def test_json_igual_ao_json_dump(arquivo_csv, tmp_path, backend):
+    destino = tmp_path / "saida.json"
+    converter_csv_para_json(str(arquivo_csv), str(destino))
+
+    texto = destino.read_text(encoding="utf-8")
+    assert texto == json.dumps(registros(arquivo_csv), ensure_ascii=False, indent=4)
+    assert json.loads(texto) == registros(arquivo_csv)
+
+
+@pytest.mark.parametrize("formato, esperado", [("json", "[]"), ("ndjson", "")])
+def test_csv_so_com_cabecalho(tmp_path, formato, esperado):
+    entrada = tmp_path / "vazio.csv"
+    entrada.write_text("cod_contrato;obs\r\n", encoding="utf-8")
+    converter_csv_para_json(str(entrada), str(tmp_path / "saida"), formato=formato)
+    assert (tmp_path / "saida").read_text(encoding="utf-8") == esperado
+
+
+def test_saida_de_um_layout(entrada_pequena, tmp_path):
+    import lambda_csv3
+    from leitor_contratos import ler_contratos
+
+    lambda_csv3.escrever_csv(tmp_path / "contratos.csv", ler_contratos(entrada_pequena))
+    converter_csv_para_json(str(tmp_path / "contratos.csv"), str(tmp_path / "saida.ndjson"), formato="ndjson")
+    converter_csv_para_json(str(tmp_path / "contratos.csv"), str(tmp_path / "saida.json"))
+
+    with open(tmp_path / "saida.ndjson", encoding="utf-8") as arquivo:
+        ndjson = [json.loads(linha) for linha in arquivo]
+    assert ndjson == json.loads((tmp_path / "saida.json").read_text(encoding="utf-8"))
+    assert ndjson == registros(tmp_path / "contratos.csv")
+
+
+def test_formato_desconhecido(arquivo_csv, tmp_path):
+    with pytest.raises(ValueError, match="Formato desconhecido: csv"):
+        converter_csv_para_json(str(arquivo_csv), str(tmp_path / "saida"), formato="csv")
+    assert not (tmp_path / "saida").exists()
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+import faixas
+import lambda_csv2
+import lambda_csv3
+from leitor_contratos import ler_contratos
+
+LAYOUTS = {"lambda_csv2": lambda_csv2, "lambda_csv3": lambda_csv3}
+
+
+@pytest.fixture(scope="module")
+def entrada(entrada_pequena, tmp_path_factory):
+    # Cópia própria: o índice é gravado ao lado da entrada
+    caminho = tmp_path_factory.mktemp("faixas") / "contratos.json"
+    caminho.write_bytes(entrada_pequena.read_bytes())
+    return caminho
+
+
+@pytest.mark.parametrize("layout", sorted(LAYOUTS))
+@pytest.mark.parametrize("itens", [1, 2, 3, 7])
+def test_simular_gera_o_mesmo_csv_que_escrever_csv(entrada, tmp_path, layout, itens):
+    esperado = tmp_path / "esperado.csv"
+    LAYOUTS[layout].escrever_csv(esperado, ler_contratos(entrada))
+
+    # Marcos a cada 10 contratos, para que os 300 contratos rendam vários itens
+    resultado = faixas.simular(entrada, tmp_path / "faixas.csv", itens, processos=2, layout=layout, passo=10)
+
+    assert resultado["itens"] == itens
+    assert resultado["contratos"] == 300
+    assert (tmp_path / "faixas.csv").read_bytes() == esperado.read_bytes()
+    assert resultado["bytes_escritos"] == esperado.stat().st_size
+
+
+def test_indice_com_outro_passo_e_refeito(entrada):
+    faixas.indexar(entrada, passo=100)
+    assert len(faixas.carregar_indice(entrada, passo=100)["marcos"]) == 3
+
+    indice = faixas.carregar_indice(entrada, passo=10)
+    assert indice["passo"] == 10
+    assert len(indice["marcos"]) == 30
+    assert json.loads(faixas.caminho_indice(entrada).read_text(encoding="utf-8"))["passo"] == 10
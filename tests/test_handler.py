@@ -0,0 +1,267 @@
+import gzip
+import importlib.util
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+import handler
+import lambda_csv3
+from compressao import abrir_entrada, compactar
+from leitor_contratos import ler_contratos
+from retomada import ARQUIVO_ESTADO, ArmazenamentoLocal, ConversaoIncompleta, FonteArquivo, converter_retomavel
+from s3_local import TAMANHO_MINIMO_PARTE, S3Local
+from upload_s3 import TAMANHO_PARTE
+
+BUCKET = "entrada"
+
+ZSTD = pytest.param("zstd", marks=pytest.mark.skipif(
+    importlib.util.find_spec("zstandard") is None, reason="zstandard não instalado"))
+
+
+class S3Espiao(S3Local):
+    """
+    S3Local que confere, a cada parte e na conclusão, que o objeto só aparece depois do complete.
+    """
+
+    def __init__(self, raiz: Path):
+        super().__init__(raiz)
+        self.partes = 0
+        self.concluidos = []
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        assert not self._caminho(Bucket, Key).exists()
+        self.partes += 1
+        return super().upload_part(Bucket=Bucket, Key=Key, UploadId=UploadId, PartNumber=PartNumber, Body=Body)
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        assert not self._caminho(Bucket, Key).exists()
+        resposta = super().complete_multipart_upload(Bucket=Bucket, Key=Key, UploadId=UploadId,
+                                                     MultipartUpload=MultipartUpload)
+        assert self._caminho(Bucket, Key).exists()
+        self.concluidos.append(Key)
+        return resposta
+
+
+@pytest.fixture
+def s3(tmp_path, monkeypatch) -> S3Espiao:
+    for variavel in ("LAYOUT", "BUCKET_SAIDA", "PREFIXO_SAIDA", "COMPRESSAO_SAIDA", "NIVEL_COMPRESSAO",
+                     "THREADS_COMPRESSAO", "INSTRUMENTACAO", "QUARENTENA", "RETOMAVEL", "MARGEM_RETOMADA",
+                     "MAX_CONTINUACOES"):
+        monkeypatch.delenv(variavel, raising=False)
+    cliente = S3Espiao(tmp_path / "s3")
+    monkeypatch.setattr(handler, "_cliente", cliente)
+    return cliente
+
+
+def evento(chave: str) -> dict:
+    return {"Records": [{"s3": {"bucket": {"name": BUCKET}, "object": {"key": chave}}}]}
+
+
+def publicar(s3: S3Local, entrada: Path, chave: str, codec: str = None) -> None:
+    destino = s3._caminho(BUCKET, chave)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    with open(entrada, "rb") as origem, open(destino, "wb") as arquivo:
+        if codec is None:
+            shutil.copyfileobj(origem, arquivo)
+        else:
+            with compactar(arquivo, codec) as compactado:
+                shutil.copyfileobj(origem, compactado)
+
+
+def csv_local(entrada: Path, destino: Path) -> bytes:
+    lambda_csv3.escrever_csv(destino, ler_contratos(entrada))
+    return destino.read_bytes()
+
+
+def test_csv_maior_que_uma_parte_vai_em_multipart(s3, entrada_grande, tmp_path):
+    publicar(s3, entrada_grande, "lotes/contratos.json")
+    esperado = csv_local(entrada_grande, tmp_path / "local.csv")
+    assert len(esperado) > TAMANHO_PARTE > TAMANHO_MINIMO_PARTE
+
+    resultado = handler.handler(evento("lotes/contratos.json"), None)
+
+    [arquivo] = resultado["arquivos"]
+    assert arquivo["chave"] == "lotes/contratos.csv"
+    assert s3.partes >= 2
+    assert s3.concluidos == ["lotes/contratos.csv"]
+    assert s3._caminho(BUCKET, "lotes/contratos.csv").read_bytes() == esperado
+    assert arquivo["bytes_escritos"] == len(esperado)
+    assert not any((s3.raiz / ".uploads").iterdir())
+
+
+@pytest.mark.parametrize("codec_entrada", [None, "gzip", ZSTD])
+@pytest.mark.parametrize("codec_saida", [None, "gzip", ZSTD])
+def test_entrada_e_saida_compactadas(s3, entrada_pequena, tmp_path, monkeypatch, codec_entrada, codec_saida):
+    chave = "contratos.json" + {None: "", "gzip": ".gz", "zstd": ".zst"}[codec_entrada]
+    publicar(s3, entrada_pequena, chave, codec_entrada)
+    if codec_saida:
+        monkeypatch.setenv("COMPRESSAO_SAIDA", codec_saida)
+    esperado = csv_local(entrada_pequena, tmp_path / "local.csv")
+
+    [arquivo] = handler.handler(evento(chave), None)["arquivos"]
+
+    extensao = {None: "", "gzip": ".gz", "zstd": ".zst"}[codec_saida]
+    assert arquivo["chave"] == "contratos.csv" + extensao
+    with abrir_entrada(s3._caminho(BUCKET, arquivo["chave"])) as saida:
+        assert saida.read() == esperado
+    if codec_saida == "gzip":
+        assert gzip.decompress(s3._caminho(BUCKET, arquivo["chave"]).read_bytes()) == esperado
+
+
+def test_erro_no_meio_nao_publica_objeto(s3, entrada_grande):
+    dados = entrada_grande.read_bytes()
+    caminho = s3._caminho(BUCKET, "truncado.json")
+    caminho.parent.mkdir(parents=True)
+    caminho.write_bytes(dados[:len(dados) * 19 // 20])
+
+    with pytest.raises(ValueError):
+        handler.handler(evento("truncado.json"), None)
+
+    assert s3.partes >= 1
+    assert s3.concluidos == []
+    assert not s3._caminho(BUCKET, "truncado.csv").exists()
+    assert not any((s3.raiz / ".uploads").iterdir())
+
+
+class Contexto:
+    invoked_function_arn = "arn:aws:lambda:sa-east-1:123456789012:function:conversor:prod"
+
+    def __init__(self, segundos: float):
+        self.segundos = segundos
+
+    def get_remaining_time_in_millis(self) -> int:
+        return int(self.segundos * 1000)
+
+
+def test_retomavel_usa_compressao_quarentena_e_instrumentacao(s3, entrada_pequena, tmp_path, monkeypatch, capsys):
+    documento = json.loads(entrada_pequena.read_bytes())
+    documento["dados"]["contratos"].insert(7, {"cod_contrato": "SEM-OPERACAO"})
+    entrada = tmp_path / "com_invalido.json"
+    entrada.write_text(json.dumps(documento), encoding="utf-8")
+    publicar(s3, entrada, "contratos.json")
+    for variavel, valor in (("RETOMAVEL", "1"), ("QUARENTENA", "1"), ("INSTRUMENTACAO", "1"),
+                            ("COMPRESSAO_SAIDA", "gzip"), ("NIVEL_COMPRESSAO", "1")):
+        monkeypatch.setenv(variavel, valor)
+
+    [arquivo] = handler.handler(evento("contratos.json"), Contexto(900))["arquivos"]
+
+    assert arquivo["concluido"]
+    assert arquivo["partes"] == ["part-00001.csv.gz"]
+    with abrir_entrada(s3._caminho(BUCKET, "contratos/part-00001.csv.gz")) as parte:
+        assert parte.read() == csv_local(entrada_pequena, tmp_path / "local.csv")
+    assert arquivo["quarentenas"] == ["part-00001.quarentena.ndjson"]
+    assert arquivo["contratos_em_quarentena"] == 1
+    [rejeitado] = s3._caminho(BUCKET, "contratos/part-00001.quarentena.ndjson").read_bytes().splitlines()
+    assert json.loads(rejeitado)["cod_contrato"] == "SEM-OPERACAO"
+    assert "instrumentacao" in arquivo
+    assert "_aws" in capsys.readouterr().out
+
+
+def test_retomavel_com_menos_tempo_que_a_margem_ainda_converte(s3, entrada_pequena, tmp_path, monkeypatch):
+    publicar(s3, entrada_pequena, "contratos.json")
+    monkeypatch.setenv("RETOMAVEL", "1")
+    monkeypatch.setenv("MARGEM_RETOMADA", "60")
+
+    [arquivo] = handler.handler(evento("contratos.json"), Contexto(30))["arquivos"]
+
+    assert arquivo["concluido"]
+    assert s3._caminho(BUCKET, "contratos/part-00001.csv").read_bytes() == csv_local(
+        entrada_pequena, tmp_path / "local.csv")
+
+
+def test_prazo_vencido_grava_uma_parte_por_execucao(entrada_pequena, tmp_path):
+    armazenamento = ArmazenamentoLocal(tmp_path / "partes")
+    fonte = FonteArquivo(entrada_pequena)
+
+    estado = converter_retomavel(fonte, armazenamento, contratos_por_parte=100, prazo=0)
+    assert not estado["concluido"]
+    assert len(estado["partes"]) == 1
+    assert estado["contratos"] >= 1
+
+    for _ in range(3):
+        anterior = estado["contratos"]
+        estado = converter_retomavel(fonte, armazenamento, contratos_por_parte=100, prazo=0)
+        assert estado["contratos"] > anterior
+
+    estado = converter_retomavel(fonte, armazenamento, contratos_por_parte=100)
+    assert estado["concluido"]
+    assert estado["contratos"] == 300
+    assert json.loads((tmp_path / "partes" / ARQUIVO_ESTADO).read_bytes())["concluido"]
+
+
+class LambdaFalsa:
+    """
+    Cliente Lambda que só guarda as invocações.
+    """
+
+    def __init__(self):
+        self.invocacoes = []
+
+    def invoke(self, **parametros):
+        self.invocacoes.append(parametros)
+        return {"StatusCode": 202}
+
+
+@pytest.fixture
+def lambda_falsa(monkeypatch) -> LambdaFalsa:
+    cliente = LambdaFalsa()
+    monkeypatch.setattr(handler, "_cliente_lambda", cliente)
+    return cliente
+
+
+def test_retomavel_interrompido_continua_em_nova_invocacao(s3, lambda_falsa, entrada_pequena, tmp_path,
+                                                           monkeypatch):
+    publicar(s3, entrada_pequena, "a.json")
+    publicar(s3, entrada_pequena, "b.json")
+    monkeypatch.setenv("RETOMAVEL", "1")
+    registros = [evento("a.json")["Records"][0], evento("b.json")["Records"][0]]
+
+    # Sem tempo restante, cada execução grava uma parte e passa o evento adiante, sem falhar
+    [parcial] = handler.handler({"Records": registros}, Contexto(0))["arquivos"]
+    assert not parcial["concluido"]
+    assert parcial["continuacao"] == 1
+    [invocacao] = lambda_falsa.invocacoes
+    assert invocacao["FunctionName"] == Contexto.invoked_function_arn
+    assert invocacao["InvocationType"] == "Event"
+    continuacao = json.loads(invocacao["Payload"])
+    assert continuacao == {"Records": registros, "continuacao": 1}
+
+    [parcial] = handler.handler(continuacao, Contexto(0))["arquivos"]
+    assert json.loads(lambda_falsa.invocacoes[-1]["Payload"])["continuacao"] == 2
+
+    # Com tempo, a continuação conclui o objeto interrompido e os seguintes, sem nova invocação
+    a, b = handler.handler(json.loads(lambda_falsa.invocacoes[-1]["Payload"]), Contexto(900))["arquivos"]
+    assert len(lambda_falsa.invocacoes) == 2
+    assert a["concluido"] and b["concluido"]
+    assert a["contratos"] == b["contratos"] == 300
+    assert len(a["partes"]) == 3
+    esperado = csv_local(entrada_pequena, tmp_path / "local.csv")
+    conteudo = [s3._caminho(BUCKET, f"a/{parte}").read_bytes() for parte in a["partes"]]
+    assert conteudo[0] + b"".join(c.split(b"\r\n", 1)[1] for c in conteudo[1:]) == esperado
+
+
+def test_continua_so_os_objetos_que_faltam(s3, lambda_falsa, entrada_pequena, monkeypatch):
+    publicar(s3, entrada_pequena, "a.json")
+    publicar(s3, entrada_pequena, "b.json")
+    monkeypatch.setenv("RETOMAVEL", "1")
+    registros = [evento("a.json")["Records"][0], evento("b.json")["Records"][0]]
+    handler.handler({"Records": registros[:1]}, Contexto(900))
+
+    # O primeiro objeto já foi concluído antes (pelo ponto de controle); o prazo vence no segundo
+    a, b = handler.handler({"Records": registros}, Contexto(0))["arquivos"]
+
+    assert a["concluido"] and not b["concluido"]
+    [invocacao] = lambda_falsa.invocacoes
+    assert json.loads(invocacao["Payload"]) == {"Records": registros[1:], "continuacao": 1}
+
+
+def test_limite_de_continuacoes(s3, lambda_falsa, entrada_pequena, monkeypatch):
+    publicar(s3, entrada_pequena, "contratos.json")
+    monkeypatch.setenv("RETOMAVEL", "1")
+    monkeypatch.setenv("MAX_CONTINUACOES", "2")
+
+    with pytest.raises(ConversaoIncompleta, match="depois de 2 continuações"):
+        handler.handler({**evento("contratos.json"), "continuacao": 2}, Contexto(0))
+    assert lambda_falsa.invocacoes == []
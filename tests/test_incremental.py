@@ -0,0 +1,101 @@
+import copy
+import csv
+import json
+
+import pytest
+
+import lambda_csv2
+import lambda_csv3
+from incremental import IndiceEstado, hash_contrato, processar_incremental
+from leitor_contratos import ler_contratos
+
+
+@pytest.fixture
+def contratos(entrada_pequena):
+    return [copy.deepcopy(c) for c in ler_contratos(entrada_pequena)][:40]
+
+
+def gravar(caminho, contratos, **opcoes):
+    caminho.write_text(json.dumps({"dados": {"contratos": contratos}}, **opcoes), encoding="utf-8")
+    return caminho
+
+
+def reformatado(contrato):
+    """
+    O mesmo contrato com as chaves em ordem inversa, em todos os níveis.
+    """
+    if isinstance(contrato, dict):
+        return {chave: reformatado(contrato[chave]) for chave in reversed(list(contrato))}
+    if isinstance(contrato, list):
+        return [reformatado(item) for item in contrato]
+    return contrato
+
+
+def linhas(caminho):
+    with open(caminho, newline="", encoding="utf-8") as arquivo:
+        return list(csv.reader(arquivo, delimiter=";"))
+
+
+@pytest.mark.parametrize("modulo", [lambda_csv2, lambda_csv3])
+def test_novos_alterados_inalterados_e_removidos(contratos, tmp_path, modulo):
+    layout = modulo.__name__
+    indice = tmp_path / "estado.sqlite"
+    entrada = gravar(tmp_path / "entrada.json", contratos)
+
+    primeira = processar_incremental(entrada, tmp_path / "1.csv", indice, layout)
+    modulo.escrever_csv(tmp_path / "completo.csv", contratos)
+    assert primeira["contratos_novos"] == len(contratos)
+    assert linhas(tmp_path / "1.csv") == linhas(tmp_path / "completo.csv")
+
+    # Mesmo conteúdo, com outra formatação e outra ordem de chaves, e um campo que o layout não lê
+    for contrato in contratos:
+        contrato["observacao_interna"] = "revisado"
+    gravar(entrada, [reformatado(c) for c in contratos], indent=4)
+    segunda = processar_incremental(entrada, tmp_path / "2.csv", indice, layout)
+    assert segunda["contratos_inalterados"] == len(contratos)
+    assert segunda["contratos_novos"] == segunda["contratos_alterados"] == segunda["contratos_removidos"] == 0
+    assert linhas(tmp_path / "2.csv") == [linhas(tmp_path / "completo.csv")[0]]
+
+    alterado = contratos[3]
+    alterado["dados_historicos_marcacao_contrato"][0]["data_referencia"] = "2030-01-01"
+    removidos = [c["cod_contrato"] for c in contratos[:2]]
+    restantes = contratos[2:]
+    gravar(entrada, restantes)
+    terceira = processar_incremental(entrada, tmp_path / "3.csv", indice, layout, tmp_path / "removidos.csv")
+    modulo.escrever_csv(tmp_path / "alterado.csv", [alterado])
+    assert terceira["contratos_alterados"] == 1
+    assert terceira["contratos_inalterados"] == len(restantes) - 1
+    assert terceira["contratos_removidos"] == 2
+    assert linhas(tmp_path / "3.csv") == linhas(tmp_path / "alterado.csv")
+    assert linhas(tmp_path / "removidos.csv") == [["cod_contrato"]] + [[cod] for cod in sorted(removidos)]
+    with IndiceEstado(indice) as estado:
+        assert set(estado.carregar()) == {c["cod_contrato"] for c in restantes}
+
+    # Os removidos já saíram do índice: não aparecem de novo
+    quarta = processar_incremental(entrada, tmp_path / "4.csv", indice, layout, tmp_path / "removidos.csv")
+    assert quarta["contratos_removidos"] == 0
+    assert linhas(tmp_path / "removidos.csv") == [["cod_contrato"]]
+
+
+def test_contrato_inteiro_conta_qualquer_campo(contratos, tmp_path):
+    indice = tmp_path / "estado.sqlite"
+    entrada = gravar(tmp_path / "entrada.json", contratos)
+    processar_incremental(entrada, tmp_path / "1.csv", indice, contrato_inteiro=True)
+
+    gravar(entrada, [reformatado(c) for c in contratos], indent=2)
+    assert processar_incremental(entrada, tmp_path / "2.csv", indice, contrato_inteiro=True)[
+        "contratos_inalterados"] == len(contratos)
+
+    contratos[0]["observacao_interna"] = "revisado"
+    gravar(entrada, contratos)
+    assert processar_incremental(entrada, tmp_path / "3.csv", indice, contrato_inteiro=True)[
+        "contratos_alterados"] == 1
+
+
+def test_hash_so_das_secoes(contratos):
+    contrato = contratos[0]
+    secoes = lambda_csv3.SECOES_CONTRATO
+    assert hash_contrato(reformatado(contrato), secoes) == hash_contrato(contrato, secoes)
+    assert hash_contrato({**contrato, "outro": 1}, secoes) == hash_contrato(contrato, secoes)
+    assert hash_contrato({**contrato, "sigla": "XX"}, secoes) != hash_contrato(contrato, secoes)
+    assert hash_contrato({**contrato, "outro": 1}) != hash_contrato(contrato)
@@ -0,0 +1,82 @@
+import json
+import time
+
+import pytest
+
+import instrumentacao
+import lambda_csv2
+import lambda_csv3
+from instrumentacao import ETAPAS, NAMESPACE_EMF, Instrumentacao
+from leitor_contratos import ler_contratos
+
+
+@pytest.fixture
+def medicao():
+    instrumentacao.desativar()
+    yield instrumentacao.ativar(top_n=3)
+    instrumentacao.desativar()
+
+
+@pytest.mark.parametrize("layout", [lambda_csv3, lambda_csv2])
+def test_mesma_saida_com_instrumentacao(layout, entrada_pequena, tmp_path, medicao):
+    medido = layout.escrever_csv(tmp_path / "medido.csv", ler_contratos(entrada_pequena))
+    assert instrumentacao.desativar() is medicao
+    normal = layout.escrever_csv(tmp_path / "normal.csv", ler_contratos(entrada_pequena))
+
+    assert (tmp_path / "medido.csv").read_bytes() == (tmp_path / "normal.csv").read_bytes()
+    assert medido["linhas_escritas"] == normal["linhas_escritas"]
+    relatorio = medicao.relatorio()
+    assert relatorio["contadores"]["contratos"] == 300
+    assert relatorio["contadores"]["linhas"] == normal["linhas_escritas"]
+    assert relatorio["contadores"]["bytes"] == normal["bytes_escritos"]
+    assert list(relatorio["etapas_s"]) == list(ETAPAS)
+    assert all(segundos >= 0 for segundos in relatorio["etapas_s"].values())
+    assert relatorio["total_s"] == pytest.approx(sum(relatorio["etapas_s"].values()), abs=1e-5)
+
+    top = relatorio["top_linhas"]
+    assert len(top) == 3
+    assert [item["valor"] for item in top] == sorted((item["valor"] for item in top), reverse=True)
+    if layout is lambda_csv3:
+        assert top[0]["valor"] == max(lambda_csv3.estimar_linhas(c) for c in ler_contratos(entrada_pequena))
+
+
+def test_formato_emf():
+    medicao = Instrumentacao()
+    medicao.etapas["normalizacao"] = 0.0123456
+    medicao.contadores.update(contratos=2, linhas=5, bytes=120)
+    antes = int(time.time() * 1000)
+
+    documento = json.loads(medicao.linha_emf({"Layout": "lambda_csv3", "Funcao": "conversor"}))
+
+    metadados = documento.pop("_aws")
+    assert antes <= metadados["Timestamp"] <= int(time.time() * 1000)
+    [diretiva] = metadados["CloudWatchMetrics"]
+    assert diretiva["Namespace"] == NAMESPACE_EMF
+    assert diretiva["Dimensions"] == [["Layout", "Funcao"]]
+    assert documento.pop("Layout") == "lambda_csv3"
+    assert documento.pop("Funcao") == "conversor"
+
+    # Cada métrica declarada tem o valor na raiz do documento, e nada além delas
+    unidades = {metrica["Name"]: metrica["Unit"] for metrica in diretiva["Metrics"]}
+    assert set(unidades) == set(documento)
+    assert unidades == {
+        **{f"{etapa}_ms": "Milliseconds" for etapa in ETAPAS},
+        "contratos": "Count", "contratos_sem_linhas": "Count", "linhas": "Count", "bytes": "Bytes",
+    }
+    assert documento["normalizacao_ms"] == 12.346
+    assert documento["linhas"] == 5 and documento["bytes"] == 120
+
+
+def test_formato_emf_sem_dimensoes():
+    documento = json.loads(Instrumentacao().linha_emf(namespace="Testes"))
+    assert documento["_aws"]["CloudWatchMetrics"][0]["Namespace"] == "Testes"
+    assert documento["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [[]]
+    assert "\n" not in Instrumentacao().linha_emf()
+
+
+def test_ativacao_pelo_ambiente(monkeypatch):
+    for valor, esperado in [("", False), ("0", False), ("1", True), ("sim", True)]:
+        monkeypatch.setenv("INSTRUMENTACAO", valor)
+        assert instrumentacao.ativada_no_ambiente() is esperado
+    monkeypatch.delenv("INSTRUMENTACAO")
+    assert not instrumentacao.ativada_no_ambiente()
@@ -0,0 +1,80 @@
+import copy
+import io
+import json
+
+import pytest
+
+import lambda_csv3
+from gerador_contratos import gerar_contrato
+from leitor_contratos import ler_contratos
+from paralelo import escrever_csv_paralelo
+from validacao import Quarentena
+
+
+@pytest.fixture(scope="module")
+def contratos(entrada_pequena):
+    return list(ler_contratos(entrada_pequena))
+
+
+def test_estimativa_igual_as_linhas_geradas(contratos):
+    assert any(lambda_csv3.estimar_linhas(c) > 50 for c in contratos)
+    for contrato in contratos:
+        linhas = sum(1 for _ in lambda_csv3.gerar_linhas(contrato))
+        assert lambda_csv3.estimar_linhas(contrato) == linhas
+        assert lambda_csv3.estimar_linhas(lambda_csv3.normalizar(contrato)) == linhas
+
+
+@pytest.mark.parametrize("alteracao, esperado", [
+    ({}, 3 * 1 * 3 * 1),
+    ({"dados_historicos_valor": {"tipo": "3", "data_referencia": "2024-05-28"}}, 3 * 1 * 3 * 1),
+    ({"amortizacoes": [{"data_amortizacao": "2024-06-05", "valor_amortizado": "30"}] * 2}, 3 * 1 * 3 * 3),
+    ({"pagamentos_realizados": []}, 3 * 1 * 3 * 1),
+    ({"dados_historicos_taxa": None}, 0),
+    ({"dados_historicos_marcacao_contrato": []}, 0),
+])
+def test_estimativa_com_formatos_do_json(alteracao, esperado):
+    contrato = {**copy.deepcopy(gerar_contrato(1)), **alteracao}
+    assert lambda_csv3.estimar_linhas(contrato) == esperado
+    assert len(list(lambda_csv3.gerar_linhas(contrato))) == esperado
+
+
+@pytest.mark.parametrize("limite", [0, 9, 50, 10 ** 6])
+def test_limite_linhas_deixa_contratos_de_fora(contratos, limite, tmp_path):
+    dentro = [c for c in contratos if lambda_csv3.estimar_linhas(c) <= limite]
+
+    estatisticas = lambda_csv3.escrever_csv(tmp_path / "limitado.csv", iter(contratos), limite_linhas=limite)
+    esperado = lambda_csv3.escrever_csv(tmp_path / "esperado.csv", dentro)
+
+    assert (tmp_path / "limitado.csv").read_bytes() == (tmp_path / "esperado.csv").read_bytes()
+    assert estatisticas == {**esperado, "contratos_acima_do_limite": len(contratos) - len(dentro)}
+    assert estatisticas["linhas_escritas"] <= limite * len(dentro)
+
+
+def test_limite_linhas_com_quarentena(contratos, tmp_path):
+    rejeitados = io.BytesIO()
+    estatisticas = lambda_csv3.escrever_csv(tmp_path / "saida.csv", contratos, limite_linhas=50,
+                                            quarentena=Quarentena(rejeitados))
+
+    registros = [json.loads(linha) for linha in rejeitados.getvalue().splitlines()]
+    acima = [c for c in contratos if lambda_csv3.estimar_linhas(c) > 50]
+    assert acima
+    assert [r["contrato"] for r in registros] == acima
+    assert registros[0]["motivo"] == f"linhas: {lambda_csv3.estimar_linhas(acima[0])} acima do limite de 50"
+    assert estatisticas["contratos_acima_do_limite"] == estatisticas["contratos_em_quarentena"] == len(acima)
+    assert estatisticas["motivos_quarentena"] == {"linhas": len(acima)}
+
+
+def test_limite_linhas_em_paralelo(contratos, tmp_path):
+    sequencial = lambda_csv3.escrever_csv(tmp_path / "sequencial.csv", contratos, limite_linhas=20)
+    paralelo = escrever_csv_paralelo(tmp_path / "paralelo.csv", contratos, "lambda_csv3", processos=2,
+                                     contratos_por_fatia=16, limite_linhas=20)
+    pelo_layout = lambda_csv3.escrever_csv(tmp_path / "layout.csv", contratos, limite_linhas=20, processos=2)
+
+    conteudo = (tmp_path / "sequencial.csv").read_bytes()
+    assert (tmp_path / "paralelo.csv").read_bytes() == conteudo
+    assert (tmp_path / "layout.csv").read_bytes() == conteudo
+    for estatisticas in (paralelo, pelo_layout):
+        assert estatisticas["linhas_escritas"] == sequencial["linhas_escritas"]
+        assert estatisticas["contratos_acima_do_limite"] == sequencial["contratos_acima_do_limite"] > 0
+    with pytest.raises(ValueError, match="lambda_csv2 não aceita limite_linhas"):
+        escrever_csv_paralelo(tmp_path / "csv2.csv", contratos, "lambda_csv2", processos=2, limite_linhas=20)
@@ -0,0 +1,140 @@
+import gzip
+import io
+import json
+
+import pytest
+
+from leitor_contratos import (LeitorContratos, LeitorMapeado, ler_contratos, ler_contratos_mapeado, mapear,
+                              posicionar)
+
+CONTRATOS = [
+    {"cod_contrato": "1", "sigla": "OD", "parcelas": [{"numero_parcela": "1", "valor|": "10.00"}]},
+    {"cod_contrato": "2", "obs": "colchetes ] [ e chaves } { dentro da string", "lista": [[], {}, [{}]]},
+    {"cod_contrato": "3", "obs": "aspas \"escapadas\" e barra \\ no fim \\", "vazio": ""},
+    {"cod_contrato": "4", "obs": "unicode ç ã € 😀 e \\\"]}", "numeros": [1, -2.5, 1e10, True, None]},
+    {"cod_contrato": "5"},
+]
+
+
+class SemSeek(io.RawIOBase):
+    """
+    Fluxo que só permite leitura sequencial, como um download.
+    """
+
+    def __init__(self, dados: bytes):
+        self._fluxo = io.BytesIO(dados)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        return self._fluxo.readinto(b)
+
+
+def documento(contratos=CONTRATOS, **extras) -> bytes:
+    # Chaves antes e depois da lista, com colchetes e chaves em strings, e espaços variados
+    dados = {"antes": {"contratos": ["não é esta"], "texto": "[{\"}"}, "contratos": contratos, "depois": [1]}
+    return json.dumps({"cabecalho": "x]", "dados": dados, **extras}, ensure_ascii=False, indent=1).encode("utf-8")
+
+
+@pytest.mark.parametrize("tamanho_bloco", range(1, 17))
+def test_contratos_cortados_entre_blocos(tamanho_bloco):
+    dados = documento()
+    assert list(LeitorContratos(io.BytesIO(dados), tamanho_bloco=tamanho_bloco)) == CONTRATOS
+    assert list(LeitorContratos(SemSeek(dados), tamanho_bloco=tamanho_bloco)) == CONTRATOS
+
+
+def test_fragmentos_sao_os_bytes_da_entrada():
+    dados = documento()
+    for inicio, fim, bruto in LeitorContratos(io.BytesIO(dados), tamanho_bloco=7).fragmentos():
+        assert dados[inicio:fim] == bruto
+        assert json.loads(bruto) in CONTRATOS
+
+
+def test_caminho_personalizado():
+    dados = json.dumps({"resposta": {"itens": CONTRATOS[:2]}, "dados": {"contratos": CONTRATOS[2:]}}).encode()
+    assert list(LeitorContratos(io.BytesIO(dados), ("resposta", "itens"), tamanho_bloco=5)) == CONTRATOS[:2]
+    assert list(ler_contratos(dados)) == CONTRATOS[2:]
+    assert list(ler_contratos(json.dumps(CONTRATOS), caminho=())) == CONTRATOS
+
+
+def test_fontes_equivalentes(tmp_path):
+    dados = documento()
+    arquivo = tmp_path / "entrada.json"
+    arquivo.write_bytes(dados)
+    (tmp_path / "entrada.json.gz").write_bytes(gzip.compress(dados))
+    esperado = list(ler_contratos(arquivo))
+
+    assert esperado == CONTRATOS
+    assert list(ler_contratos(str(arquivo))) == esperado
+    assert list(ler_contratos(dados.decode("utf-8"))) == esperado
+    assert list(ler_contratos(io.BytesIO(dados))) == esperado
+    assert list(ler_contratos(tmp_path / "entrada.json.gz")) == esperado
+    assert list(ler_contratos(io.BytesIO(gzip.compress(dados)), compressao="gzip")) == esperado
+    assert list(ler_contratos_mapeado(arquivo)) == esperado
+
+
+def test_mapeado_igual_ao_fluxo(entrada_grande):
+    with mapear(entrada_grande) as buffer:
+        mapeados = list(LeitorMapeado(buffer).fragmentos())
+    assert mapeados == list(LeitorContratos(open(entrada_grande, "rb"), tamanho_bloco=4096).fragmentos())
+    assert len(mapeados) == 5000
+
+
+@pytest.mark.parametrize("dados, mensagem", [
+    (b'{"dados": {"outros": []}}', "caminho dados.contratos não encontrado"),
+    (b'{"contratos": [{"cod_contrato": "1"}]}', "caminho dados.contratos não encontrado"),
+    (b'{"dados": {"contratos": [{"cod_contrato": "1"}', "fim inesperado"),
+    (b'{"dados": {"contratos": [{"cod_contrato": "1"}, {"cod_contrato": "2', "fim inesperado"),
+    (b'{"dados": {"contratos": [{"cod_contrato": "1"},', "fim inesperado"),
+    (b'{"dados": {"contr', "string não terminada"),
+    (b'{"dados": {"contratos": [{"a": 1}, 2]}}', "contrato inválido na posição 35"),
+    (b'{"dados": {"contratos": [{"a": 1,}]}}', "Erro ao carregar JSON na posição 25"),
+    (b'', "fim inesperado"),
+])
+@pytest.mark.parametrize("tamanho_bloco", [3, 1 << 20])
+def test_entrada_invalida(dados, mensagem, tamanho_bloco):
+    with pytest.raises(ValueError, match=mensagem):
+        list(LeitorContratos(io.BytesIO(dados), tamanho_bloco=tamanho_bloco))
+    with pytest.raises(ValueError, match=mensagem):
+        list(LeitorMapeado(dados))
+
+
+@pytest.mark.parametrize("lidos", [0, 1, 3, len(CONTRATOS)])
+def test_retomar_com_inicio(lidos, tmp_path):
+    dados = documento()
+    arquivo = tmp_path / "entrada.json"
+    arquivo.write_bytes(dados)
+    leitor = LeitorContratos(io.BytesIO(dados), tamanho_bloco=4)
+    contratos = iter(leitor)
+    for _ in range(lidos):
+        next(contratos)
+    inicio = leitor.posicao
+
+    restantes = CONTRATOS[lidos:]
+    assert list(ler_contratos(arquivo, inicio=inicio)) == restantes
+    assert list(ler_contratos(io.BytesIO(dados), tamanho_bloco=3, inicio=inicio)) == restantes
+    assert list(ler_contratos(SemSeek(dados), tamanho_bloco=3, inicio=inicio)) == restantes
+    assert list(ler_contratos_mapeado(arquivo, inicio=inicio)) == restantes
+    with open(arquivo, "rb") as fluxo:
+        posicionar(fluxo, inicio)
+        assert list(LeitorContratos(fluxo, inicio=inicio)) == restantes
+
+
+def test_retomar_arquivo_compactado(tmp_path):
+    dados = documento()
+    arquivo = tmp_path / "entrada.json.gz"
+    arquivo.write_bytes(gzip.compress(dados))
+    leitor = LeitorContratos(io.BytesIO(dados))
+    contratos = iter(leitor)
+    next(contratos), next(contratos)
+    assert list(ler_contratos(arquivo, inicio=leitor.posicao)) == CONTRATOS[2:]
+
+
+def test_posicionar_alem_do_fim():
+    fluxo = SemSeek(b"0123456789")
+    with pytest.raises(ValueError, match="termina antes da posição 11"):
+        posicionar(fluxo, 11)
+    fluxo = SemSeek(b"0123456789")
+    posicionar(fluxo, 4)
+    assert fluxo.read() == b"456789"
@@ -0,0 +1,106 @@
+import copy
+import json
+
+import pytest
+
+import lambda_csv3
+from gerador_contratos import gerar_contrato
+from mapeamentos import Mapeamento, RegistroMapeamentos
+
+# Posições, na linha de lambda_csv3, dos códigos que vêm dos mapeamentos
+MARCACAO, REGIME, MOTIVO = 8, 11, 12
+
+
+@pytest.fixture
+def registro():
+    registro = lambda_csv3.usar_mapeamentos()
+    yield registro
+    lambda_csv3.usar_mapeamentos()
+
+
+def contrato(marcacao="1", regime="Competencia", motivo="1"):
+    contrato = copy.deepcopy(gerar_contrato(0))
+    contrato["dados_historicos_marcacao_contrato"] = [
+        {"marcacao": marcacao, "data_referencia": "2024-01-28", "hist_atual": "true"},
+    ]
+    contrato["dados_da_operacao"].update(regime_apropriacao=regime, motivo_baixa_contrato=motivo)
+    return contrato
+
+
+def test_mapeamento_com_e_sem_padrao():
+    sem_padrao = Mapeamento("motivo", {"1": "00001", 2: "00002"})
+    com_padrao = Mapeamento("marcacao", {"1": "00010"}, padrao="")
+
+    assert [sem_padrao(v) for v in ("1", "2", "9", "")] == ["00001", "00002", "9", ""]
+    assert [com_padrao(v) for v in ("1", "9", "")] == ["00010", "", ""]
+    assert sem_padrao.estatisticas() == {"acertos": 2, "faltas": 2, "mais_comuns": [("00001", 1), ("00002", 1)]}
+    # Valores que passam sem mapeamento não entram nas frequências; o padrão entra
+    assert com_padrao.estatisticas() == {"acertos": 1, "faltas": 2, "mais_comuns": [("", 2), ("00010", 1)]}
+
+
+def test_definicao_invalida(tmp_path):
+    with pytest.raises(ValueError, match="código inválido para '1': 10"):
+        Mapeamento("marcacao", {"1": 10})
+    with pytest.raises(ValueError, match="Mapeamento marcacao sem tabela"):
+        RegistroMapeamentos({"marcacao": {"padrao": ""}})
+    arquivo = tmp_path / "mapeamentos.json"
+    arquivo.write_text('{"marcacao": {"tabela": {"1": "00010"},}}', encoding="utf-8")
+    with pytest.raises(ValueError, match="Erro ao carregar mapeamentos"):
+        RegistroMapeamentos.de_arquivo(arquivo)
+    with pytest.raises(KeyError):
+        RegistroMapeamentos({})["marcacao"]
+
+
+def test_cache_de_combinacoes_limitado():
+    registro = RegistroMapeamentos({}, limite_combinacoes=2)
+    construcoes = []
+
+    def construir(chave):
+        return lambda: construcoes.append(chave) or (chave,)
+
+    for chave in ["a", "b", "a", "c", "c", "a"]:
+        assert registro.combinacao(chave, construir(chave)) == (chave,)
+
+    # "c" não cabe no cache: é construída a cada uso e só conta como falta
+    assert construcoes == ["a", "b", "c", "c"]
+    assert registro.estatisticas()["combinacoes"] == {
+        "acertos": 2, "faltas": 4, "tamanho": 2, "mais_comuns": [("a", 3), ("b", 1)],
+    }
+    registro.zerar_estatisticas()
+    assert registro.estatisticas()["combinacoes"] == {"acertos": 0, "faltas": 0, "tamanho": 2, "mais_comuns": []}
+
+
+def test_padroes_do_layout(registro):
+    casos = [
+        (contrato("1", "Competencia", "1"), ("00010", "00001", "00001")),
+        (contrato("2", "Competencia", "3"), ("XXXXX", "00001", "00002")),
+        (contrato("3", "Caixa", "4"), ("00072", "     ", "00003")),
+        (contrato("9", "Caixa", "6"), ("", "     ", "6")),
+    ]
+    for entrada, esperado in casos:
+        linha = next(lambda_csv3.gerar_linhas(entrada))
+        assert (linha[MARCACAO], linha[REGIME], linha[MOTIVO]) == esperado
+
+    estatisticas = registro.estatisticas()
+    assert estatisticas["mapeamentos"]["motivo_baixa_contrato"]["acertos"] == 3
+    assert estatisticas["mapeamentos"]["motivo_baixa_contrato"]["faltas"] == 1
+    assert estatisticas["mapeamentos"]["marcacao_contrato"]["faltas"] == 1
+    assert estatisticas["combinacoes"]["tamanho"] == 4
+
+
+def test_mapeamentos_da_configuracao(registro, tmp_path):
+    arquivo = tmp_path / "mapeamentos.json"
+    arquivo.write_text(json.dumps({
+        "motivo_baixa_contrato": {"tabela": {"6": "00006"}, "padrao": "99999"},
+        "marcacao_contrato": {"tabela": {"9": "00090"}},
+        "regime_apropriacao": {"tabela": {"Caixa": "00002"}, "padrao": "00001"},
+    }), encoding="utf-8")
+    lambda_csv3.usar_mapeamentos(RegistroMapeamentos.de_arquivo(arquivo))
+
+    linha = next(lambda_csv3.gerar_linhas(contrato("9", "Caixa", "6")))
+    assert (linha[MARCACAO], linha[REGIME], linha[MOTIVO]) == ("00090", "00002", "00006")
+    linha = next(lambda_csv3.gerar_linhas(contrato("1", "Competencia", "1")))
+    assert (linha[MARCACAO], linha[REGIME], linha[MOTIVO]) == ("1", "00001", "99999")
+
+    # Sem argumento, volta aos padrões
+    assert lambda_csv3.usar_mapeamentos()["marcacao_contrato"]("1") == "00010"
@@ -0,0 +1,152 @@
+import copy
+import importlib.util
+from decimal import Decimal
+
+import pytest
+
+import instrumentacao
+import lambda_csv2
+import numerico
+from leitor_contratos import ler_contratos
+from modelo import AMORTIZACAO, PAGAMENTO, extrair_agregados, normalizar_contrato
+from numerico import centavos, formatar_centavos, resumir_lote
+
+
+@pytest.fixture(params=["python", pytest.param("numpy", marks=pytest.mark.skipif(
+    importlib.util.find_spec("numpy") is None, reason="numpy não instalado"))])
+def backend(request, monkeypatch):
+    """
+    Roda o teste com o estágio numérico em Python puro e, se houver, com NumPy.
+    """
+    numpy = None
+    if request.param == "numpy":
+        import numpy
+    monkeypatch.setattr(numerico, "_numpy", numpy)
+    monkeypatch.setattr(numerico, "_numpy_verificado", True)
+    return request.param
+
+
+@pytest.mark.parametrize("valor, esperado", [
+    ("5674.48", 567448), ("100", 10000), ("-0.5", -50), ("+7.1", 710), ("5.", 500), (".05", 5), ("-0", 0),
+])
+def test_centavos(valor, esperado):
+    assert centavos(valor) == esperado
+
+
+@pytest.mark.parametrize("valor", ["10.005", "1e3", " 12", "+-5", "1_000", "٣", ".", "", "abc"])
+def test_centavos_rejeita_o_que_nao_e_exato(valor):
+    with pytest.raises(ValueError):
+        centavos(valor)
+
+
+def contratos_com_valores_incomuns(entrada):
+    contratos = [copy.deepcopy(c) for c in ler_contratos(entrada)]
+    contratos[0].setdefault("pagamentos_realizados", []).append(
+        {"data_pagamento": "2024-02-28", "valor_pago": "10.005"})
+    contratos[1]["dados_historicos_saldo_devedor"][0]["valor_saldo_devedor"] = "99999999.995"
+    contratos[2]["dados_historicos_saldo_devedor"][0]["valor_saldo_devedor"] = "1e9"
+    contratos[3]["dados_historicos_saldo_devedor"][-1]["valor_saldo_devedor"] = " 7"
+    return contratos
+
+
+def test_saldo_fora_do_formato_segue_pela_comparacao_decimal(entrada_pequena, backend):
+    lote = [normalizar_contrato(c) for c in contratos_com_valores_incomuns(entrada_pequena)[:4]]
+    resumo = resumir_lote(lote)
+    assert resumo.indice_maior_saldo[0] is not None
+    assert resumo.indice_maior_saldo[1:4] == [None, None, None]
+
+
+def test_todos_os_modos_geram_o_mesmo_csv(entrada_pequena, tmp_path, backend):
+    contratos = contratos_com_valores_incomuns(entrada_pequena)
+
+    lambda_csv2.escrever_csv(tmp_path / "sequencial.csv", contratos)
+    lambda_csv2.escrever_csv(tmp_path / "paralelo.csv", contratos, processos=2)
+    instrumentacao.ativar()
+    try:
+        lambda_csv2.escrever_csv(tmp_path / "instrumentado.csv", contratos)
+    finally:
+        instrumentacao.desativar()
+
+    sequencial = (tmp_path / "sequencial.csv").read_bytes()
+    assert (tmp_path / "paralelo.csv").read_bytes() == sequencial
+    assert (tmp_path / "instrumentado.csv").read_bytes() == sequencial
+    assert b";Pagamento;2024-02-28;10.005\r\n" in sequencial
+    assert b";1e9;" in sequencial
+
+
+@pytest.mark.parametrize("saldo", ["abc", "NaN"])
+def test_saldo_nao_numerico_falha_como_em_gerar_linhas(entrada_pequena, backend, saldo):
+    contrato = copy.deepcopy(next(ler_contratos(entrada_pequena)))
+    contrato["dados_historicos_saldo_devedor"][0]["valor_saldo_devedor"] = saldo
+    with pytest.raises(ValueError, match="saldo devedor não numérico"):
+        list(lambda_csv2.gerar_linhas(contrato))
+    with pytest.raises(ValueError, match="saldo devedor não numérico"):
+        list(lambda_csv2.gerar_linhas_lote([contrato]))
+
+
+def total_decimal(contrato, tipo):
+    return sum((Decimal(e.valor) for e in contrato.eventos if e.tipo == tipo), Decimal(0))
+
+
+def test_resumo_confere_com_decimal(entrada_pequena, backend):
+    contratos = contratos_com_valores_incomuns(entrada_pequena)
+    contratos[4]["dados_historicos_saldo_devedor"] = []
+    lote = [normalizar_contrato(c) for c in contratos]
+
+    resumo = resumir_lote(lote)
+
+    for i, contrato in enumerate(lote):
+        agregados = extrair_agregados(contrato)
+        if resumo.indice_maior_saldo[i] is not None:
+            assert resumo.indice_maior_saldo[i] == (contrato.saldos.index(agregados.maior_saldo)
+                                                    if contrato.saldos else -1)
+            assert resumo.maior_saldo[i] == (agregados.valor_maior_saldo * 100 if contrato.saldos else None)
+        for total, tipo in ((resumo.total_pagamentos[i], PAGAMENTO), (resumo.total_amortizacoes[i], AMORTIZACAO)):
+            if i == 0 and tipo == PAGAMENTO:
+                assert total is None  # "10.005" não é um valor em centavos
+            else:
+                assert total == total_decimal(contrato, tipo) * 100
+    assert resumo.indice_maior_saldo[4] == -1
+
+
+def contrato_com_saldos(entrada, valores):
+    contrato = copy.deepcopy(next(ler_contratos(entrada)))
+    contrato["dados_historicos_saldo_devedor"] = [
+        {"data_referencia": f"2024-01-{n:02d}", "valor_saldo_devedor": valor} for n, valor in enumerate(valores, 1)]
+    return normalizar_contrato(contrato)
+
+
+def test_empate_fica_com_o_primeiro(entrada_pequena, backend):
+    contrato = contrato_com_saldos(entrada_pequena, ["5", "7.00", "7", "-1"])
+    resumo = resumir_lote([contrato])
+    assert (resumo.indice_maior_saldo, resumo.maior_saldo) == ([1], [700])
+
+
+def test_formatar_centavos(backend):
+    assert formatar_centavos([567448, -50, 0, 7, None, -123456789]) == [
+        "5674.48", "-0.50", "0.00", "0.07", "", "-1234567.89"]
+    assert formatar_centavos([]) == []
+
+
+def test_lote_segue_o_numpy_quando_disponivel(backend):
+    assert numerico.contratos_por_lote() == (
+        numerico.CONTRATOS_POR_LOTE if backend == "python" else numerico.CONTRATOS_POR_LOTE_NUMPY)
+
+
+@pytest.mark.parametrize("valores", [
+    ["5674.48", "100", "-0.5", "+7.1", "5.", ".05", "-0"],
+    ["10.005", "1e3", " 12", "+-5", "1_000", "٣", ".", "", "abc", "-"],
+])
+def test_centavos_numpy_igual_ao_python(valores):
+    np = pytest.importorskip("numpy")
+    convertidos, invalido = numerico._centavos_numpy(np, valores)
+    for valor, centavo, fora in zip(valores, convertidos.tolist(), invalido.tolist()):
+        try:
+            assert (centavo, fora) == (centavos(valor), False)
+        except ValueError:
+            assert fora
+
+
+def test_valores_grandes_demais_para_int64_seguem_em_python(entrada_pequena, backend):
+    contrato = contrato_com_saldos(entrada_pequena, ["123456789012345678901.23", "1.00"])
+    assert resumir_lote([contrato]).maior_saldo == [12345678901234567890123]
@@ -0,0 +1,130 @@
+import asyncio
+import json
+
+import pytest
+
+import lambda_csv3
+import pipeline_async
+from leitor_contratos import ler_contratos
+from pipeline_async import DestinoLocal, FonteLocal, converter, processar_objeto_async
+from s3_local import S3Local
+
+TAMANHO_BLOCO = 64 * 1024
+BLOCOS_EM_FILA = 2
+
+
+class FilaMedida(asyncio.Queue):
+    """
+    Fila que registra o maior número de blocos que chegou a guardar.
+    """
+    filas = []
+
+    def __init__(self, maxsize=0):
+        super().__init__(maxsize)
+        self.maximo = 0
+        FilaMedida.filas.append(self)
+
+    def put_nowait(self, item):
+        super().put_nowait(item)
+        self.maximo = max(self.maximo, self.qsize())
+
+
+class FonteContada(FonteLocal):
+    def __init__(self, dados):
+        super().__init__(dados)
+        self.bytes_lidos = 0
+
+    async def read(self, tamanho):
+        bloco = await super().read(tamanho)
+        self.bytes_lidos += len(bloco)
+        return bloco
+
+
+class DestinoRetido(DestinoLocal):
+    """
+    Destino que não aceita nada até ser liberado, como um upload parado.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.liberado = asyncio.Event()
+
+    async def write(self, dados):
+        await self.liberado.wait()
+        await super().write(dados)
+
+
+def esperado(entrada) -> bytes:
+    destino = entrada.parent / "esperado.csv"
+    if not destino.exists():
+        lambda_csv3.escrever_csv(destino, ler_contratos(entrada))
+    return destino.read_bytes()
+
+
+def test_destino_parado_segura_a_leitura(entrada_grande, monkeypatch):
+    monkeypatch.setattr(FilaMedida, "filas", [])
+    monkeypatch.setattr(pipeline_async.asyncio, "Queue", FilaMedida)
+    documento = entrada_grande.read_bytes()
+
+    async def cenario():
+        fonte = FonteContada(documento)
+        destino = DestinoRetido()
+        tarefa = asyncio.ensure_future(converter(fonte, destino, tamanho_bloco=TAMANHO_BLOCO,
+                                                 blocos_em_fila=BLOCOS_EM_FILA))
+        # Espera a leitura parar: com o destino retido, as filas enchem e a fonte deixa de ser lida
+        lidos = -1
+        while fonte.bytes_lidos != lidos:
+            lidos = fonte.bytes_lidos
+            await asyncio.sleep(0.3)
+        assert not tarefa.done()
+        destino.liberado.set()
+        return lidos, await tarefa, destino
+
+    lidos, estatisticas, destino = asyncio.run(cenario())
+
+    assert [fila.maximo for fila in FilaMedida.filas] == [BLOCOS_EM_FILA, BLOCOS_EM_FILA]
+    assert lidos < len(documento) / 4
+    assert estatisticas["bytes_lidos"] == len(documento)
+    assert destino.fechado
+    assert destino.conteudo.getvalue() == esperado(entrada_grande)
+
+
+def test_processar_objeto_async_no_s3_local(entrada_pequena, tmp_path):
+    s3 = S3Local(tmp_path / "s3")
+    origem = s3._caminho("entrada", "dados/contratos.json")
+    origem.parent.mkdir(parents=True)
+    origem.write_bytes(entrada_pequena.read_bytes())
+
+    estatisticas = asyncio.run(processar_objeto_async(s3, "entrada", "dados/contratos.json",
+                                                      "saida", "dados/contratos.csv"))
+
+    assert s3._caminho("saida", "dados/contratos.csv").read_bytes() == esperado(entrada_pequena)
+    assert estatisticas["linhas_escritas"] > 0
+
+
+def test_falha_na_leitura_interrompe_o_pipeline():
+    class FonteQuebrada:
+        async def read(self, tamanho):
+            raise OSError("conexão perdida")
+
+    destino = DestinoLocal()
+    with pytest.raises(OSError, match="conexão perdida"):
+        asyncio.run(converter(FonteQuebrada(), destino))
+    assert not destino.fechado
+
+
+def test_dados_depois_da_lista_de_contratos_nao_travam_o_pipeline(entrada_pequena):
+    documento = json.loads(entrada_pequena.read_bytes())
+    documento["anexo"] = "x" * (3 << 20)
+    dados = json.dumps(documento).encode("utf-8")
+    destino = DestinoLocal()
+
+    async def cenario():
+        return await asyncio.wait_for(converter(FonteLocal(dados), destino, tamanho_bloco=TAMANHO_BLOCO,
+                                                blocos_em_fila=BLOCOS_EM_FILA), 30)
+
+    estatisticas = asyncio.run(cenario())
+
+    assert destino.fechado
+    assert destino.conteudo.getvalue() == esperado(entrada_pequena)
+    assert estatisticas["bytes_lidos"] < len(dados)
@@ -0,0 +1,116 @@
+import csv
+import gzip
+import io
+
+import pytest
+
+from saida_csv import EscritorLotes, abrir_escritor, formato_destino
+
+CABECALHO = ["cod_contrato", "obs", "valor"]
+
+
+def linhas(quantidade):
+    return [[str(i), f"texto; com \"aspas\" {i}", f"{i}.50"] for i in range(quantidade)]
+
+
+def csv_esperado(linhas_, cabecalho=CABECALHO) -> bytes:
+    texto = io.StringIO(newline="")
+    writer = csv.writer(texto, delimiter=";")
+    if cabecalho is not None:
+        writer.writerow(cabecalho)
+    writer.writerows(linhas_)
+    return texto.getvalue().encode("utf-8")
+
+
+@pytest.mark.parametrize("quantidade, tamanho_lote, descargas", [
+    (0, 4, 0),
+    (3, 4, 1),
+    (4, 4, 1),
+    (5, 4, 2),
+    (12, 4, 3),
+    (13, 1, 13),
+])
+def test_descargas_por_lote(quantidade, tamanho_lote, descargas):
+    for uma_a_uma in (False, True):
+        destino = io.BytesIO()
+        with EscritorLotes(destino, CABECALHO, tamanho_lote=tamanho_lote) as escritor:
+            if uma_a_uma:
+                for linha in linhas(quantidade):
+                    escritor.escrever(linha)
+            else:
+                escritor.escrever_varias(iter(linhas(quantidade)))
+            # Só lotes cheios foram gravados até aqui
+            assert escritor.descargas == quantidade // tamanho_lote
+            assert escritor.linhas_escritas == quantidade // tamanho_lote * tamanho_lote
+
+        assert destino.getvalue() == csv_esperado(linhas(quantidade))
+        assert escritor.estatisticas() == {
+            "linhas_escritas": quantidade, "bytes_escritos": len(destino.getvalue()), "descargas": descargas,
+        }
+
+
+def test_escrever_varias_completa_o_lote_pendente():
+    destino = io.BytesIO()
+    escritor = EscritorLotes(destino, None, tamanho_lote=4)
+    escritor.escrever_varias(linhas(3))
+    assert escritor.descargas == 0
+    escritor.escrever_varias(linhas(6))
+    # 3 pendentes + 6 novas: dois lotes de 4 gravados, uma linha ainda no lote
+    assert (escritor.descargas, escritor.linhas_escritas) == (2, 8)
+    escritor.fechar()
+    assert destino.getvalue() == csv_esperado(linhas(3) + linhas(6), cabecalho=None)
+    assert escritor.estatisticas()["descargas"] == 3
+
+
+def test_bytes_escritos_acompanham_as_descargas():
+    destino = io.BytesIO()
+    escritor = EscritorLotes(destino, CABECALHO, tamanho_lote=2)
+    escritor.descarregar()
+    assert escritor.bytes_escritos == len(csv_esperado([]))
+    escritor.escrever_varias(linhas(3))
+    assert escritor.bytes_escritos == len(csv_esperado(linhas(2)))
+    escritor.fechar()
+    assert escritor.bytes_escritos == len(destino.getvalue()) == len(csv_esperado(linhas(3)))
+    # O fluxo recebido pronto continua aberto
+    assert not destino.closed
+
+
+def test_arquivo_compactado_conta_o_csv_sem_compressao(tmp_path):
+    with EscritorLotes(tmp_path / "saida.csv.gz", CABECALHO, tamanho_lote=3) as escritor:
+        escritor.escrever_varias(linhas(10))
+
+    conteudo = gzip.decompress((tmp_path / "saida.csv.gz").read_bytes())
+    assert conteudo == csv_esperado(linhas(10))
+    assert escritor.bytes_escritos == len(conteudo)
+    assert escritor.descargas == 4
+
+
+def test_delimitador_e_encoding(tmp_path):
+    with EscritorLotes(tmp_path / "saida.csv", ["a", "b"], delimitador=",", encoding="latin-1") as escritor:
+        escritor.escrever(["ação", "x,y"])
+    assert (tmp_path / "saida.csv").read_bytes() == 'a,b\r\nação,"x,y"\r\n'.encode("latin-1")
+    assert escritor.bytes_escritos == (tmp_path / "saida.csv").stat().st_size == 17
+
+
+@pytest.mark.parametrize("destino, formato, esperado", [
+    ("saida.csv", None, "csv"),
+    ("saida.csv.gz", None, "csv"),
+    ("saida.PARQUET", None, "parquet"),
+    ("saida.feather", None, "arrow"),
+    ("saida.dat.zst", None, "fixo"),
+    ("saida.txt", None, "csv"),
+    ("saida.csv", "arrow", "arrow"),
+    (io.BytesIO(), None, "csv"),
+])
+def test_formato_destino(destino, formato, esperado):
+    assert formato_destino(destino, formato) == esperado
+
+
+def test_formato_invalido(tmp_path):
+    with pytest.raises(ValueError, match="Formato de saída desconhecido: xlsx"):
+        formato_destino("saida.csv", "xlsx")
+    with pytest.raises(ValueError, match="Parquet e Arrow já são compactados"):
+        abrir_escritor(tmp_path / "saida.parquet.gz", CABECALHO)
+    with pytest.raises(ValueError, match="não tem registro de largura fixa"):
+        abrir_escritor(tmp_path / "saida.dat", CABECALHO)
+    assert isinstance(abrir_escritor(io.BytesIO(), CABECALHO), EscritorLotes)
@@ -0,0 +1,44 @@
+import io
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import lambda_csv3
+from leitor_contratos import ler_contratos
+from saida_fixa import Campo, EscritorLarguraFixa, LayoutRegistro
+
+LAYOUT = LayoutRegistro([Campo("VALOR", 6, "numero"), Campo("SIGLA", 3)])
+
+
+def gravar(*linhas) -> bytes:
+    destino = io.BytesIO()
+    with EscritorLarguraFixa(destino, LAYOUT) as escritor:
+        escritor.escrever_varias(linhas)
+    return destino.getvalue()
+
+
+def test_numero_com_sinal_completa_com_zeros_depois_do_sinal():
+    assert gravar(["-12", "a"], ["12", "b"], ["+7", "c"]) == b"-00012a  \r\n000012b  \r\n+00007c  \r\n"
+
+
+def test_numero_com_sinal_maior_que_o_campo():
+    with pytest.raises(ValueError, match="não cabe no campo VALOR"):
+        gravar(["-123456", "a"])
+
+
+def test_lambda_csv3_so_importa_saida_fixa_para_o_formato_fixo():
+    raiz = Path(__file__).resolve().parent.parent
+    codigo = "import sys, lambda_csv3; print('saida_fixa' in sys.modules)"
+    resultado = subprocess.run([sys.executable, "-c", codigo], cwd=raiz, capture_output=True, text=True, check=True)
+    assert resultado.stdout.strip() == "False"
+
+
+def test_lambda_csv3_gera_registros_de_largura_fixa(entrada_pequena, tmp_path):
+    estatisticas = lambda_csv3.escrever_csv(tmp_path / "contratos.dat", ler_contratos(entrada_pequena))
+
+    registros = (tmp_path / "contratos.dat").read_bytes()
+    tamanho = lambda_csv3.registro_largura_fixa().tamanho
+    assert len(registros) == estatisticas["linhas_escritas"] * tamanho
+    assert registros[tamanho - 2:tamanho] == b"\r\n"
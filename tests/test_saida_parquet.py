@@ -0,0 +1,65 @@
+import importlib
+
+import pytest
+
+from leitor_contratos import ler_contratos
+from saida_parquet import _CONVERSORES, TIPOS
+
+LAYOUTS = ["lambda_csv2", "lambda_csv3"]
+
+
+def colunas(modulo):
+    # lambda_csv3 nomeia as colunas tipadas à parte do cabeçalho legado do CSV
+    return getattr(modulo, "COLUNAS", modulo.CABECALHO)
+
+
+def linhas(modulo, entrada):
+    return [linha for contrato in ler_contratos(entrada) for linha in modulo.gerar_linhas(contrato)]
+
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+def test_esquema_tem_um_nome_e_um_tipo_por_valor_da_linha(layout, entrada_pequena):
+    modulo = importlib.import_module(layout)
+    nomes = colunas(modulo)
+    assert len(nomes) == len(set(nomes)) == len(modulo.TIPOS_COLUNAS)
+    assert set(modulo.TIPOS_COLUNAS) <= set(TIPOS)
+    assert all(" " not in nome for nome in nomes)
+
+    for linha in linhas(modulo, entrada_pequena):
+        assert len(linha) == len(nomes)
+        for valor, tipo in zip(linha, modulo.TIPOS_COLUNAS):
+            _CONVERSORES[tipo](valor)
+
+
+@pytest.mark.parametrize("formato", ["parquet", "arrow"])
+@pytest.mark.parametrize("layout", LAYOUTS)
+def test_saida_colunar_tipada(layout, formato, entrada_pequena, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    modulo = importlib.import_module(layout)
+    destino = tmp_path / f"contratos.{formato}"
+    estatisticas = modulo.escrever_csv(destino, ler_contratos(entrada_pequena))
+
+    if formato == "parquet":
+        tabela = pyarrow.parquet.read_table(destino)
+    else:
+        with pyarrow.ipc.open_file(destino) as leitor:
+            tabela = leitor.read_all()
+
+    nomes = colunas(modulo)
+    assert tabela.column_names == nomes
+    esperados = {"texto": pa.string(), "data": pa.date32(), "decimal": pa.decimal128(18, 2), "inteiro": pa.int64()}
+    for campo, tipo in zip(tabela.schema, modulo.TIPOS_COLUNAS):
+        if tipo == "codigo":
+            assert pa.types.is_dictionary(campo.type)
+        else:
+            assert campo.type == esperados[tipo]
+
+    geradas = linhas(modulo, entrada_pequena)
+    assert tabela.num_rows == len(geradas) == estatisticas["linhas_escritas"]
+    lidas = tabela.to_pylist()
+    for linha, lida in zip(geradas, lidas):
+        assert [lida[nome] for nome in nomes] == [
+            _CONVERSORES[tipo](valor) for valor, tipo in zip(linha, modulo.TIPOS_COLUNAS)]
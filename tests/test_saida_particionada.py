@@ -0,0 +1,87 @@
+import csv
+import io
+from urllib.parse import unquote
+
+import pytest
+
+import lambda_csv2
+import lambda_csv3
+from compressao import abrir_entrada
+from leitor_contratos import ler_contratos
+from saida_particionada import VALOR_VAZIO, EscritorParticionado, Particionamento
+
+
+def ler_partes(diretorio):
+    """
+    {caminho relativo da parte: linhas do CSV, com o cabeçalho}
+    """
+    partes = {}
+    for parte in sorted(diretorio.rglob("part-*")):
+        with abrir_entrada(parte) as arquivo:
+            texto = io.TextIOWrapper(arquivo, "utf-8", newline="")
+            partes[parte.relative_to(diretorio).as_posix()] = list(csv.reader(texto, delimiter=";"))
+    return partes
+
+
+def particao(caminho: str):
+    return {nome: unquote(valor) for nome, valor in (nivel.split("=") for nivel in caminho.split("/")[:-1])}
+
+
+@pytest.mark.parametrize("modulo, colunas", [
+    (lambda_csv3, ("SIGLA", "COD_FSCR_OPCR")),
+    (lambda_csv3, ("NUM_CTRT",)),
+    (lambda_csv3, ("COD_SITU_OPCR", "COD_REGR_APRO_REACT_OPCR")),
+    (lambda_csv2, ("sigla", "tipo_registro")),
+])
+def test_cada_particao_tem_so_as_linhas_dos_seus_valores(entrada_pequena, tmp_path, modulo, colunas):
+    nomes = getattr(modulo, "COLUNAS", modulo.CABECALHO)
+    indices = [nomes.index(c) for c in colunas]
+    esperado = tmp_path / "unico.csv"
+    modulo.escrever_csv(esperado, ler_contratos(entrada_pequena))
+    with open(esperado, newline="", encoding="utf-8") as arquivo:
+        cabecalho, *linhas = list(csv.reader(arquivo, delimiter=";"))
+
+    estatisticas = modulo.escrever_csv(tmp_path / "particoes", ler_contratos(entrada_pequena),
+                                       particionamento=Particionamento(colunas))
+
+    partes = ler_partes(tmp_path / "particoes")
+    assert estatisticas["particoes"] == len(partes) > 1
+    gravadas = []
+    for caminho, (primeira, *conteudo) in partes.items():
+        assert primeira == cabecalho
+        valores = particao(caminho)
+        for linha in conteudo:
+            assert [valores[c.lower()] for c in colunas] == [linha[i] or VALOR_VAZIO for i in indices]
+        gravadas += conteudo
+    assert sorted(gravadas) == sorted(linhas)
+
+
+def test_coluna_desconhecida(tmp_path):
+    with pytest.raises(ValueError, match="NUM_CTRT"):
+        EscritorParticionado(tmp_path, lambda_csv3.CABECALHO, Particionamento(("NUM_CTRT",)))
+
+
+def test_particao_fechada_e_reaberta_para_acrescimo(tmp_path):
+    linhas = [[sigla, str(n)] for n in range(6) for sigla in ("A", "B", "C")]
+    with EscritorParticionado(tmp_path, ["sigla", "n"], Particionamento(("sigla",), max_abertos=2),
+                              tamanho_lote=2) as escritor:
+        escritor.escrever_varias(linhas)
+    estatisticas = escritor.estatisticas()
+
+    assert estatisticas["reaberturas"] > 0
+    assert estatisticas["linhas_escritas"] == len(linhas)
+    assert ler_partes(tmp_path) == {
+        f"sigla={sigla}/part-0001.csv": [["sigla", "n"]] + [[sigla, str(n)] for n in range(6)]
+        for sigla in ("A", "B", "C")
+    }
+
+
+def test_nova_parte_ao_atingir_o_limite(tmp_path):
+    particionamento = Particionamento(("sigla",), max_linhas=4, max_abertos=1, compressao="gzip")
+    with EscritorParticionado(tmp_path, ["sigla", "n"], particionamento) as escritor:
+        escritor.escrever_varias([[sigla, str(n)] for n in range(5) for sigla in ("A", "")])
+
+    partes = ler_partes(tmp_path)
+    assert sorted(partes) == [f"sigla={valor}/part-{n:04d}.csv.gz" for valor in ("A", VALOR_VAZIO) for n in (1, 2)]
+    assert partes["sigla=A/part-0002.csv.gz"] == [["sigla", "n"], ["A", "4"]]
+    assert escritor.estatisticas()["partes"] == 4
@@ -0,0 +1,153 @@
+import copy
+import gzip
+import io
+import json
+import random
+
+import pytest
+
+import lambda_csv3
+from leitor_contratos import ler_contratos
+from validacao import (ESQUEMA_CONTRATO, Lista, Objeto, Quarentena, Texto, compilar, esquema_contrato, exigir,
+                       filtrar_validos)
+
+VALIDAR = compilar(esquema_contrato(valores=True))
+
+
+def detalhada(validar):
+    return validar.__globals__["_detalhar"]
+
+
+@pytest.fixture(scope="module")
+def contratos(entrada_pequena):
+    return list(ler_contratos(entrada_pequena))[:50]
+
+
+def alterar(contrato, caminho, valor=None, remover=False):
+    contrato = copy.deepcopy(contrato)
+    *pais, ultimo = caminho
+    alvo = contrato
+    for chave in pais:
+        alvo = alvo[chave]
+    if remover:
+        del alvo[ultimo]
+    else:
+        alvo[ultimo] = valor
+    return contrato
+
+
+@pytest.mark.parametrize("caminho, valor, remover, motivo", [
+    (("cod_contrato",), None, True, "cod_contrato: campo obrigatório ausente"),
+    (("dados_historicos_saldo_devedor", 0, "valor_saldo_devedor"), None, True,
+     "dados_historicos_saldo_devedor[0].valor_saldo_devedor: campo obrigatório ausente"),
+    (("sigla",), 5, False, "sigla: esperado texto"),
+    (("dados_da_operacao",), [], False, "dados_da_operacao: esperado objeto"),
+    (("parcelas",), {}, False, "parcelas: esperada lista"),
+    (("dados_historicos_taxa",), "2024-01-01", False, "dados_historicos_taxa: esperada lista"),
+    (("dados_historicos_saldo_devedor", 0, "valor_saldo_devedor"), "12,50", False,
+     "dados_historicos_saldo_devedor[0].valor_saldo_devedor: valor '12,50' fora do formato"),
+    (("parcelas", 0, "num_parcela"), "1a", False, "parcelas[0].num_parcela: valor '1a' fora do formato"),
+    (("pagamentos_realizados",), [{"data_pagamento": "2024-01-01", "valor_pago": 10}], False,
+     "pagamentos_realizados[0].valor_pago: esperado texto"),
+    (("parcelas",), [{"valor|": "1.00"}], False, "parcelas[0]: falta numero_parcela ou num_parcela"),
+])
+def test_cada_tipo_de_falha(contratos, caminho, valor, remover, motivo):
+    contrato = next(c for c in contratos if c.get("parcelas") and c.get("pagamentos_realizados") is not None)
+    assert VALIDAR(contrato) is None
+    invalido = alterar(contrato, caminho, valor, remover)
+    assert VALIDAR(invalido) == motivo
+    assert detalhada(VALIDAR)(invalido) == motivo
+
+
+def test_o_que_o_modelo_aceita_passa(contratos):
+    contrato = contratos[0]
+    # Histórico de um só registro como objeto, histórico nulo, chaves desconhecidas e opcionais ausentes
+    variantes = [
+        alterar(contrato, ("dados_historicos_taxa",), contrato["dados_historicos_taxa"][0]),
+        alterar(contrato, ("dados_historicos_valor",), None),
+        alterar(contrato, ("campo_novo",), {"qualquer": [1, 2]}),
+        alterar(contrato, ("dados_do_produto",), None, remover=True),
+    ]
+    for variante in variantes:
+        assert VALIDAR(variante) is None
+        assert detalhada(VALIDAR)(variante) is None
+
+
+def test_exigir_grupo_de_chaves(contratos):
+    sem_operacao = alterar(contratos[0], ("dados_da_operacao",), None, remover=True)
+    assert compilar(ESQUEMA_CONTRATO)(sem_operacao) is None
+    assert lambda_csv3.validar_contrato(sem_operacao) == "contrato: falta dados_da_operacao"
+    assert lambda_csv3.validar_contrato(alterar(contratos[0], ("dados_da_operacao",), {})) == \
+        "contrato: falta dados_da_operacao"
+
+
+def test_caminho_rapido_e_detalhado_concordam(contratos):
+    validar = compilar(exigir(esquema_contrato(valores=True), ("parcelas",)))
+    sorteio = random.Random(7)
+    substitutos = [None, "", "x", "1.234", "-5", 3, 1.5, [], {}, [{}], {"a": 1}, True]
+    casos = 0
+    for contrato in contratos:
+        for _ in range(40):
+            caminhos = []
+
+            def percorrer(valor, caminho):
+                caminhos.append(caminho)
+                filhos = valor.items() if isinstance(valor, dict) else (
+                    enumerate(valor) if isinstance(valor, list) else ())
+                for chave, filho in filhos:
+                    percorrer(filho, caminho + (chave,))
+
+            percorrer(contrato, ())
+            caminho = sorteio.choice(caminhos[1:])
+            remover = isinstance(caminho[-1], str) and sorteio.random() < 0.3
+            alterado = alterar(contrato, caminho, sorteio.choice(substitutos), remover)
+            assert validar(alterado) == detalhada(validar)(alterado), caminho
+            casos += validar(alterado) is not None
+    assert casos > 100
+
+
+def test_esquema_invalido():
+    with pytest.raises(ValueError, match="Esquema inválido"):
+        compilar(Objeto({"a": int}))
+    with pytest.raises(ValueError, match="Chave não suportada"):
+        compilar(Objeto({'a"b': Texto()}))
+    assert compilar(Objeto({"a": Lista(Texto(r"\d+"))}))({"a": ["1", "x"]}) == "a[1]: valor 'x' fora do formato"
+
+
+def test_quarentena_grava_motivo_e_contrato(contratos, tmp_path):
+    invalidos = [
+        alterar(contratos[1], ("sigla",), 5),
+        alterar(contratos[2], ("dados_historicos_saldo_devedor", 0, "valor_saldo_devedor"), "abc"),
+        alterar(contratos[3], ("dados_historicos_saldo_devedor", 1, "valor_saldo_devedor"), "1e9"),
+        ["não é objeto"],
+    ]
+    entrada = [contratos[0], *invalidos, contratos[4]]
+
+    with Quarentena(tmp_path / "quarentena.ndjson.gz") as quarentena:
+        validos = list(filtrar_validos(entrada, VALIDAR, quarentena))
+
+    assert validos == [contratos[0], contratos[4]]
+    registros = [json.loads(linha) for linha in gzip.decompress((tmp_path / "quarentena.ndjson.gz").read_bytes())
+                 .splitlines()]
+    assert [r["contrato"] for r in registros] == invalidos
+    assert [r["cod_contrato"] for r in registros] == [c["cod_contrato"] for c in invalidos[:3]] + [None]
+    assert registros[0]["motivo"] == "sigla: esperado texto"
+    assert quarentena.estatisticas() == {
+        "contratos_em_quarentena": 4,
+        "motivos_quarentena": {
+            "sigla": 1, "dados_historicos_saldo_devedor[].valor_saldo_devedor": 2, "contrato": 1,
+        },
+    }
+
+
+def test_escrever_csv_com_quarentena(contratos, tmp_path):
+    entrada = list(contratos)
+    entrada[5] = alterar(entrada[5], ("dados_historicos_taxa",), 7)
+    rejeitados = io.BytesIO()
+
+    estatisticas = lambda_csv3.escrever_csv(tmp_path / "saida.csv", entrada, quarentena=Quarentena(rejeitados))
+    lambda_csv3.escrever_csv(tmp_path / "esperado.csv", entrada[:5] + entrada[6:])
+
+    assert (tmp_path / "saida.csv").read_bytes() == (tmp_path / "esperado.csv").read_bytes()
+    assert estatisticas["contratos_em_quarentena"] == 1
+    assert json.loads(rejeitados.getvalue())["motivo"] == "dados_historicos_taxa: esperada lista"
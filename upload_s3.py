@@ -0,0 +1,85 @@
+import io
+from typing import Dict, List
+
+# Tamanho de cada parte enviada ao S3. O mínimo do S3 é 5 MiB (exceto a última parte).
+TAMANHO_PARTE = 8 * 1024 * 1024
+
+
+class UploadMultipart(io.RawIOBase):
+    """
+    Fluxo binário de escrita que envia os dados ao S3 em partes, à medida que são escritos.
+    Só uma parte fica em memória; nada é gravado em disco.
+
+    Se o total não chegar a uma parte, o objeto é enviado com um único put_object.
+    Em caso de erro dentro do bloco `with`, o upload multipart é abortado.
+    """
+
+    def __init__(self, cliente, bucket: str, chave: str, tamanho_parte: int = TAMANHO_PARTE):
+        self._cliente = cliente
+        self.bucket = bucket
+        self.chave = chave
+        self._tamanho_parte = tamanho_parte
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._partes: List[Dict] = []
+        self.bytes_enviados = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, dados) -> int:
+        self._buffer += dados
+        while len(self._buffer) >= self._tamanho_parte:
+            parte = bytes(self._buffer[:self._tamanho_parte])
+            del self._buffer[:self._tamanho_parte]
+            self._enviar_parte(parte)
+        return len(dados)
+
+    def _enviar_parte(self, parte: bytes) -> None:
+        if self._upload_id is None:
+            resposta = self._cliente.create_multipart_upload(Bucket=self.bucket, Key=self.chave)
+            self._upload_id = resposta["UploadId"]
+
+        numero = len(self._partes) + 1
+        resposta = self._cliente.upload_part(
+            Bucket=self.bucket, Key=self.chave, UploadId=self._upload_id, PartNumber=numero, Body=parte
+        )
+        self._partes.append({"PartNumber": numero, "ETag": resposta["ETag"]})
+        self.bytes_enviados += len(parte)
+
+    def close(self) -> None:
+        """
+        Envia o que falta e conclui o upload.
+        """
+        if self.closed:
+            return
+        try:
+            if self._upload_id is None:
+                self._cliente.put_object(Bucket=self.bucket, Key=self.chave, Body=bytes(self._buffer))
+                self.bytes_enviados += len(self._buffer)
+            else:
+                if self._buffer:
+                    self._enviar_parte(bytes(self._buffer))
+                self._cliente.complete_multipart_upload(
+                    Bucket=self.bucket, Key=self.chave, UploadId=self._upload_id,
+                    MultipartUpload={"Parts": self._partes},
+                )
+            self._buffer.clear()
+        finally:
+            super().close()
+
+    def abortar(self) -> None:
+        """
+        Cancela o upload, descartando as partes já enviadas.
+        """
+        if self._upload_id is not None:
+            self._cliente.abort_multipart_upload(Bucket=self.bucket, Key=self.chave, UploadId=self._upload_id)
+            self._upload_id = None
+        self._buffer.clear()
+        super().close()
+
+    def __exit__(self, tipo, *exc) -> None:
+        if tipo is not None:
+            self.abortar()
+        else:
+            self.close()
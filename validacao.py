@@ -0,0 +1,362 @@
+"""
+Validação dos contratos antes da geração das linhas.
+
+O esquema é declarado uma vez (Objeto, Lista, Texto) e compilado em uma função Python
+específica para ele, com todas as chaves, tipos e formatos escritos em linha. Cada contrato
+custa apenas as comparações do próprio esquema, sem percorrer a declaração a cada chamada.
+
+Contratos inválidos vão para a quarentena, um arquivo NDJSON com o motivo e o contrato
+original, e o processamento segue com os demais.
+"""
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import backend_json
+from compressao import abrir_saida
+from saida_csv import Destino
+
+# Função gerada por `compilar`: None para um contrato válido, senão o motivo da rejeição
+Validador = Callable[[Any], Optional[str]]
+
+# Valor de uma chave ausente no código gerado (None é um valor possível no JSON)
+_AUSENTE = object()
+
+
+class Texto(NamedTuple):
+    """
+    Valor texto; com `formato`, a expressão regular que o valor inteiro precisa casar.
+    `atalho` é um método de str que, verdadeiro, já garante o formato e dispensa a expressão
+    regular no caso comum (ex.: "isdecimal" para inteiros sem sinal).
+    """
+    formato: Optional[str] = None
+    atalho: Optional[str] = None
+
+
+class Lista(NamedTuple):
+    """
+    Lista de itens do mesmo esquema. Com `aceita_objeto`, um único item pode vir como objeto
+    e a chave pode vir nula, como nos históricos lidos por modelo.como_lista.
+    """
+    item: Any
+    aceita_objeto: bool = False
+
+
+class Objeto(NamedTuple):
+    """
+    Objeto com os `campos` conhecidos (chaves não declaradas são ignoradas). As chaves em
+    `obrigatorios` precisam estar presentes; de cada grupo em `um_de`, ao menos uma precisa
+    estar presente e não vazia.
+    """
+    campos: Dict[str, Any]
+    obrigatorios: Tuple[str, ...] = ()
+    um_de: Tuple[Tuple[str, ...], ...] = ()
+
+
+# Só os números convertidos na geração das linhas têm formato conferido; datas e códigos
+# são copiados como estão e basta que sejam texto.
+TEXTO = Texto()
+INTEIRO = Texto(r"[+-]?\d+", atalho="isdecimal")
+DECIMAL = Texto(r"[+-]?\d+(?:\.\d{1,2})?")
+
+
+def _historico(campos: Dict[str, Any], obrigatorios: Tuple[str, ...] = ()) -> Lista:
+    return Lista(Objeto(campos, obrigatorios), aceita_objeto=True)
+
+
+def esquema_contrato(valores: bool = False) -> Objeto:
+    """
+    Esquema do que modelo.normalizar_contrato lê de cada contrato, nos dois formatos de entrada.
+    Chaves acessadas diretamente são obrigatórias; as marcações precisam da chave "marcacao"
+    (sem ela a marcação sairia vazia, por exemplo com o erro de digitação "marccao").
+    Com `valores`, confere também o formato dos números que o layout converte (número da
+    parcela, saldos, pagamentos e amortizações); sem ele, basta que sejam texto.
+    """
+    inteiro, decimal = (INTEIRO, DECIMAL) if valores else (TEXTO, TEXTO)
+    return Objeto(
+        campos={
+            "cod_contrato": TEXTO,
+            "sigla": TEXTO,
+            "data_hora-processamento_dados": TEXTO,
+            "dados_do_produto": Objeto({"cprodlin": TEXTO}),
+            "dados_da_operacao": Objeto({
+                "regime_apropriacao": TEXTO,
+                "motivo_baixa_contrato": TEXTO,
+                "data_implantacao": TEXTO,
+                "data_liquidacao": TEXTO,
+                "data_ulitma_atualizacao": TEXTO,
+            }),
+            "parcelas": Lista(Objeto(
+                {"num_parcela": inteiro, "numero_parcela": inteiro, "valor|": TEXTO},
+                um_de=(("numero_parcela", "num_parcela"),),
+            )),
+            "valor": Lista(Objeto({"saldo": decimal, "data_processamento": TEXTO}, ("saldo",))),
+            "dados_historicos_saldo_devedor": _historico(
+                {"valor_saldo_devedor": decimal, "data_referencia": TEXTO}, ("valor_saldo_devedor",)),
+            "dados_historicos_marcacao_contrato": _historico(
+                {"marcacao": TEXTO, "data_referencia": TEXTO, "hist_atual": TEXTO}, ("marcacao", "data_referencia")),
+            "dados_historicos_alteracao_produto": _historico(
+                {"cprodlin": TEXTO, "data_referencia": TEXTO, "hist_atual": TEXTO}),
+            "dados_historicos_taxa": _historico({"data_referencia": TEXTO}, ("data_referencia",)),
+            "dados_historicos_valor": _historico({"data_referencia": TEXTO}, ("data_referencia",)),
+            "pagamentos_realizados": Lista(Objeto(
+                {"data_pagamento": TEXTO, "valor_pago": decimal}, ("data_pagamento", "valor_pago"))),
+            "amortizacoes": Lista(Objeto(
+                {"data_amortizacao": TEXTO, "valor_amortizado": decimal}, ("data_amortizacao", "valor_amortizado"))),
+        },
+        obrigatorios=("cod_contrato", "sigla"),
+    )
+
+
+ESQUEMA_CONTRATO = esquema_contrato()
+
+
+def exigir(esquema: Objeto, *grupos: Tuple[str, ...]) -> Objeto:
+    """
+    Cópia do esquema em que, de cada grupo de chaves, ao menos uma precisa estar presente e não vazia
+    (ex.: exigir(ESQUEMA_CONTRATO, ("parcelas",)) para um layout que não aceita contrato sem parcelas).
+    """
+    return esquema._replace(um_de=esquema.um_de + grupos)
+
+
+class _Gerador:
+    """
+    Escreve o código da função de validação, um bloco por nó do esquema.
+    """
+
+    def __init__(self):
+        self.linhas: List[str] = []
+        self.constantes: Dict[str, Any] = {"_AUSENTE": _AUSENTE}
+        self._variaveis = 0
+
+    def _variavel(self, prefixo: str) -> str:
+        self._variaveis += 1
+        return f"{prefixo}{self._variaveis}"
+
+    def _emitir(self, nivel: int, linha: str) -> None:
+        self.linhas.append("    " * nivel + linha)
+
+    def _rejeitar(self, nivel: int, caminho: str, motivo: str) -> None:
+        self._emitir(nivel, f'return f"{caminho or "contrato"}: {motivo}"')
+
+    def no(self, esquema: Any, var: str, caminho: str, nivel: int) -> None:
+        if isinstance(esquema, Texto):
+            self._texto(esquema, var, caminho, nivel)
+        elif isinstance(esquema, Lista):
+            self._lista(esquema, var, caminho, nivel)
+        elif isinstance(esquema, Objeto):
+            self._objeto(esquema, var, caminho, nivel)
+        else:
+            raise ValueError(f"Esquema inválido em {caminho or 'contrato'}: {esquema!r}")
+
+    def _texto(self, esquema: Texto, var: str, caminho: str, nivel: int) -> None:
+        self._emitir(nivel, f"if type({var}) is not str:")
+        self._rejeitar(nivel + 1, caminho, "esperado texto")
+        if esquema.formato is not None:
+            casar = self._variavel("_formato")
+            self.constantes[casar] = re.compile(esquema.formato).fullmatch
+            self._emitir(nivel, f"if {casar}({var}) is None:")
+            self._rejeitar(nivel + 1, caminho, f"valor {{{var}!r}} fora do formato")
+
+    def _lista(self, esquema: Lista, var: str, caminho: str, nivel: int) -> None:
+        if esquema.aceita_objeto:
+            self._emitir(nivel, f"if type({var}) is dict:")
+            self._emitir(nivel + 1, f"{var} = ({var},)")
+            self._emitir(nivel, f"elif {var} is None:")
+            self._emitir(nivel + 1, f"{var} = ()")
+            self._emitir(nivel, f"elif type({var}) is not list:")
+        else:
+            self._emitir(nivel, f"if type({var}) is not list:")
+        self._rejeitar(nivel + 1, caminho, "esperada lista")
+
+        indice, item = self._variavel("i"), self._variavel("v")
+        self._emitir(nivel, f"for {indice}, {item} in enumerate({var}):")
+        self.no(esquema.item, item, f"{caminho}[{{{indice}}}]", nivel + 1)
+
+    def _objeto(self, esquema: Objeto, var: str, caminho: str, nivel: int) -> None:
+        self._emitir(nivel, f"if type({var}) is not dict:")
+        self._rejeitar(nivel + 1, caminho, "esperado objeto")
+
+        variaveis = {}
+        for chave, filho in esquema.campos.items():
+            if not isinstance(chave, str) or any(c in chave for c in '{}"\\'):
+                raise ValueError(f"Chave não suportada no esquema: {chave!r}")
+            valor = variaveis[chave] = self._variavel("v")
+            caminho_filho = f"{caminho}.{chave}" if caminho else chave
+            self._emitir(nivel, f"{valor} = {var}.get({chave!r}, _AUSENTE)")
+            if chave in esquema.obrigatorios:
+                self._emitir(nivel, f"if {valor} is _AUSENTE:")
+                self._rejeitar(nivel + 1, caminho_filho, "campo obrigatório ausente")
+                self.no(filho, valor, caminho_filho, nivel)
+            else:
+                self._emitir(nivel, f"if {valor} is not _AUSENTE:")
+                self.no(filho, valor, caminho_filho, nivel + 1)
+
+        for chave in esquema.obrigatorios:
+            if chave not in esquema.campos:
+                self._emitir(nivel, f"if {chave!r} not in {var}:")
+                self._rejeitar(nivel + 1, f"{caminho}.{chave}" if caminho else chave, "campo obrigatório ausente")
+
+        for grupo in esquema.um_de:
+            # Chaves declaradas já foram lidas acima; as demais são lidas aqui
+            presentes = [
+                f"({variaveis[chave]} is not _AUSENTE and {variaveis[chave]})" if chave in variaveis
+                else f"{var}.get({chave!r})"
+                for chave in grupo
+            ]
+            self._emitir(nivel, f"if not ({' or '.join(presentes)}):")
+            self._rejeitar(nivel + 1, caminho, f"falta {' ou '.join(grupo)}")
+
+
+class _GeradorRapido(_Gerador):
+    """
+    Escreve o caminho rápido: as mesmas verificações, mas os campos texto de cada objeto são
+    conferidos numa única condição e não há mensagem. Qualquer falha devolve o resultado da
+    validação detalhada, que também decide os casos em que o caminho rápido é conservador.
+    """
+
+    def _rejeitar(self, nivel: int, caminho: str, motivo: str) -> None:
+        self._emitir(nivel, "return _detalhar(contrato)")
+
+    def _condicao_texto(self, esquema: Texto, chave: str, var: str, obrigatorio: bool) -> str:
+        """
+        Expressão verdadeira quando o campo texto é inválido (ausente, se obrigatório).
+        """
+        if esquema.formato is None:
+            # Ausente vira None (falha) se obrigatório e "" (passa) se opcional
+            return f"type({var}.get({chave!r}{'' if obrigatorio else ', _TEXTO'})) is not str"
+        casar = self._variavel("_formato")
+        self.constantes[casar] = re.compile(esquema.formato).fullmatch
+        valor = self._variavel("w")
+        fora = f"{casar}({valor}) is None"
+        if esquema.atalho is not None:
+            fora = f"(not {valor}.{esquema.atalho}() and {fora})"
+        if obrigatorio:
+            return f"type({valor} := {var}.get({chave!r})) is not str or {fora}"
+        return (f"(({valor} := {var}.get({chave!r}, _AUSENTE)) is not _AUSENTE"
+                f" and (type({valor}) is not str or {fora}))")
+
+    def _lista(self, esquema: Lista, var: str, caminho: str, nivel: int) -> None:
+        self._emitir(nivel, f"if type({var}) is not list:")
+        if esquema.aceita_objeto:
+            self._emitir(nivel + 1, f"if type({var}) is dict:")
+            self._emitir(nivel + 2, f"{var} = ({var},)")
+            self._emitir(nivel + 1, f"elif {var} is None:")
+            self._emitir(nivel + 2, f"{var} = ()")
+            self._emitir(nivel + 1, "else:")
+            self._rejeitar(nivel + 2, caminho, "")
+        else:
+            self._rejeitar(nivel + 1, caminho, "")
+
+        item = self._variavel("v")
+        self._emitir(nivel, f"for {item} in {var}:")
+        self.no(esquema.item, item, caminho, nivel + 1)
+
+    def _objeto(self, esquema: Objeto, var: str, caminho: str, nivel: int) -> None:
+        condicoes = [f"type({var}) is not dict"]
+        compostos = []
+        for chave, filho in esquema.campos.items():
+            obrigatorio = chave in esquema.obrigatorios
+            if isinstance(filho, Texto):
+                condicoes.append(self._condicao_texto(filho, chave, var, obrigatorio))
+            else:
+                compostos.append((chave, filho, obrigatorio))
+        condicoes += [f"{chave!r} not in {var}" for chave in esquema.obrigatorios if chave not in esquema.campos]
+        # Um objeto vazio ({}) num histórico de um só registro conta como vazio aqui e como
+        # presente na validação detalhada, que decide o caso
+        condicoes += [f"not ({' or '.join(f'{var}.get({chave!r})' for chave in grupo)})" for grupo in esquema.um_de]
+
+        self._emitir(nivel, f"if {' or '.join(condicoes)}:")
+        self._rejeitar(nivel + 1, caminho, "")
+
+        for chave, filho, obrigatorio in compostos:
+            valor = self._variavel("v")
+            self._emitir(nivel, f"{valor} = {var}.get({chave!r}, _AUSENTE)")
+            if obrigatorio:
+                self._emitir(nivel, f"if {valor} is _AUSENTE:")
+                self._rejeitar(nivel + 1, caminho, "")
+                self.no(filho, valor, caminho, nivel)
+            else:
+                self._emitir(nivel, f"if {valor} is not _AUSENTE:")
+                self.no(filho, valor, caminho, nivel + 1)
+
+
+def _gerar(gerador: _Gerador, esquema: Objeto, assinatura: str) -> str:
+    gerador.linhas.append(f"def {assinatura}:")
+    gerador.no(esquema, "contrato", "", 1)
+    gerador.linhas.append("    return None")
+    return "\n".join(gerador.linhas) + "\n"
+
+
+def compilar(esquema: Objeto) -> Validador:
+    """
+    Gera e compila a função que valida um contrato contra o esquema: um caminho rápido, que
+    só confere, e a validação detalhada, chamada apenas para os contratos que falharem nele
+    para dar o motivo. O código gerado fica em `validar.fonte`.
+    """
+    detalhada, rapida = _Gerador(), _GeradorRapido()
+    # No caminho rápido, os nomes usados em toda verificação viram variáveis locais
+    fonte = (_gerar(detalhada, esquema, "_detalhar(contrato)") + "\n\n" + _gerar(
+        rapida, esquema,
+        "validar(contrato, type=type, str=str, dict=dict, list=list, _AUSENTE=_AUSENTE, _TEXTO=_TEXTO)"))
+
+    namespace = {**detalhada.constantes, **rapida.constantes, "_TEXTO": ""}
+    exec(compile(fonte, "<validacao>", "exec"), namespace)
+    validar = namespace["validar"]
+    validar.fonte = fonte
+    return validar
+
+
+class Quarentena:
+    """
+    Arquivo NDJSON com os contratos rejeitados: uma linha por contrato, com cod_contrato,
+    o motivo e o contrato como foi lido. O destino pode ser um caminho (compactado conforme
+    a extensão) ou um fluxo binário aberto.
+    """
+
+    def __init__(self, destino: Destino):
+        if isinstance(destino, (str, Path)):
+            self._arquivo = abrir_saida(destino)
+            self._fechar_arquivo = True
+        else:
+            self._arquivo = destino
+            self._fechar_arquivo = False
+        self.contratos = 0
+        self.motivos: Dict[str, int] = {}
+
+    def registrar(self, contrato: Any, motivo: str) -> None:
+        cod_contrato = contrato.get("cod_contrato") if isinstance(contrato, dict) else None
+        self._arquivo.write(backend_json.dumps_compacto(
+            {"cod_contrato": cod_contrato, "motivo": motivo, "contrato": contrato}) + b"\n")
+        self.contratos += 1
+        # Agrupa pelo campo, sem os índices das listas
+        campo = re.sub(r"\[\d+\]", "[]", motivo.partition(":")[0])
+        self.motivos[campo] = self.motivos.get(campo, 0) + 1
+
+    def fechar(self) -> None:
+        if self._fechar_arquivo:
+            self._arquivo.close()
+        else:
+            self._arquivo.flush()
+
+    def estatisticas(self) -> Dict:
+        return {"contratos_em_quarentena": self.contratos, "motivos_quarentena": dict(self.motivos)}
+
+    def __enter__(self) -> "Quarentena":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.fechar()
+
+
+def filtrar_validos(contratos: Iterable[Any], validar: Validador, quarentena: Quarentena) -> Iterator[Any]:
+    """
+    Repassa os contratos válidos e manda os inválidos para a quarentena.
+    """
+    registrar = quarentena.registrar
+    for contrato in contratos:
+        motivo = validar(contrato)
+        if motivo is None:
+            yield contrato
+        else:
+            registrar(contrato, motivo)